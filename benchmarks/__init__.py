@@ -0,0 +1 @@
+"""Benchmarks that run BiasBouncer against a local stand-in for the OpenAI API."""
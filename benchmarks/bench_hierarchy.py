@@ -0,0 +1,112 @@
+"""Compares routing prompt size and latency of a flat Team Manager against role-based sub-managers.
+
+A routing decision costs one model call per manager on the path from the Team
+Manager down to a specialist. Each call's prompt holds that manager's instructions
+plus one handoff tool per child, which is what grows with team size.
+
+    python -m benchmarks.bench_hierarchy --sizes 10 30 60 100 --fanout 8
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from agents import handoff
+from openai import OpenAI
+
+from benchmarks.fake_openai import FakeOpenAI
+from biasbouncer import engine
+from biasbouncer.history import count_tokens
+
+ROLE_FAMILIES = [
+    "Data Analyst", "Financial Analyst", "Policy Researcher", "Market Researcher", "UX Designer",
+    "Software Engineer", "Legal Counsel", "Ethics Reviewer", "Marketing Strategist", "Risk Auditor",
+]
+TASK = "Assess the hiring pipeline for demographic bias and propose fixes."
+
+
+def build_team(size, fanout, seed=7):
+    """Returns a TeamState with `size` SDK agents and managers built with the given fan-out."""
+    rng = random.Random(seed)
+    state = engine.TeamState(max_fanout=fanout)
+    engine.create_team(state, [
+        {"name": f"Agent {i + 1}", "role": f"{rng.choice(ROLE_FAMILIES)}", "description": f"- Covers area {i + 1}"}
+        for i in range(size)
+    ])
+    engine.create_agents(state)
+    return state
+
+
+def routing_request(manager):
+    """Returns the chat request a manager's routing decision would send."""
+    tools = []
+    for child in manager.handoffs:
+        spec = handoff(child)
+        tools.append({
+            "type": "function",
+            "function": {"name": spec.tool_name, "description": spec.tool_description, "parameters": spec.input_json_schema},
+        })
+    return {
+        "model": "gpt-4o",
+        "messages": [{"role": "system", "content": manager.instructions}, {"role": "user", "content": TASK}],
+        "tools": tools,
+    }
+
+
+def request_tokens(request):
+    return count_tokens(json.dumps(request["messages"]) + json.dumps(request["tools"]))
+
+
+def routing_paths(manager, path=()):
+    """Yields each manager path from the top-level manager down to a specialist."""
+    path = path + (manager,)
+    for child in manager.handoffs:
+        if child.handoffs:
+            yield from routing_paths(child, path)
+        else:
+            yield path
+
+
+def measure(state, client, samples):
+    paths = list(routing_paths(state.manager_agent))
+    tokens = {id(m): request_tokens(routing_request(m)) for path in paths for m in path}
+    path_tokens = [sum(tokens[id(m)] for m in path) for path in paths]
+    latencies = []
+    for path in random.Random(0).sample(paths, min(samples, len(paths))):
+        start = time.perf_counter()
+        for manager in path:
+            client.chat.completions.create(**routing_request(manager))
+        latencies.append(time.perf_counter() - start)
+    return {
+        "depth": max(len(path) for path in paths),
+        "max_manager_prompt_tokens": max(tokens.values()),
+        "mean_path_prompt_tokens": round(statistics.mean(path_tokens)),
+        "mean_routing_latency_s": round(statistics.mean(latencies), 3),
+    }
+
+
+def run(sizes, fanout, samples=5, latency=0.05, prompt_latency_per_1k=0.25):
+    results = []
+    with FakeOpenAI(latency=latency, token_delay=0, prompt_latency_per_1k=prompt_latency_per_1k) as fake:
+        client = OpenAI(api_key="fake", base_url=fake.base_url, max_retries=0)
+        for size in sizes:
+            for label, size_fanout in (("flat", None), ("hierarchical", fanout)):
+                results.append({"team_size": size, "mode": label, **measure(build_team(size, size_fanout), client, samples)})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 30, 60, 100])
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--samples", type=int, default=5, help="Routing paths timed per configuration.")
+    parser.add_argument("--prompt-latency-per-1k", type=float, default=0.25,
+                        help="Simulated seconds of prompt processing per 1,000 prompt tokens.")
+    args = parser.parse_args()
+    for row in run(args.sizes, args.fanout, args.samples, prompt_latency_per_1k=args.prompt_latency_per_1k):
+        print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
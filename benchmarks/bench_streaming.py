@@ -0,0 +1,52 @@
+"""Measures time-to-first-token and time-to-first-member for streamed vs. blocking completions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_streaming --team-size 8 --token-delay 0.01
+"""
+import argparse
+import json
+
+from openai import OpenAI
+
+from benchmarks.fake_openai import FakeOpenAI
+from biasbouncer.completions import complete_chat
+from biasbouncer.engine import TOOLS
+from biasbouncer.prompts import MAIN_SYSTEM_PROMPT
+
+
+def run(team_size=8, latency=0.3, token_delay=0.01, repeat=3):
+    """Returns timing stats for the clarifying turn and the create_team turn, both modes."""
+    results = {}
+    with FakeOpenAI(latency=latency, token_delay=token_delay, team_size=team_size) as fake:
+        client = OpenAI(api_key="fake", base_url=fake.base_url, max_retries=0)
+        prompts = {
+            "clarifying_turn": "I need help reviewing a hiring process.",
+            "create_team": "Please create the team now.",
+        }
+        for label, prompt in prompts.items():
+            messages = [{"role": "system", "content": MAIN_SYSTEM_PROMPT}, {"role": "user", "content": prompt}]
+            for stream in (False, True):
+                runs = [
+                    complete_chat(client, stream=stream, model="gpt-4o", messages=messages, tools=TOOLS, tool_choice="auto").stats()
+                    for _ in range(repeat)
+                ]
+                results[f"{label}/{'stream' if stream else 'blocking'}"] = {
+                    key: min((r[key] for r in runs if r[key] is not None), default=None)
+                    for key in runs[0]
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--team-size", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds before the first byte.")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="Seconds between streamed chunks.")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.team_size, args.latency, args.token_delay, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
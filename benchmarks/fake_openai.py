@@ -0,0 +1,187 @@
+"""A deterministic local stand-in for the Chat Completions endpoint, with optional streaming.
+
+Replies are chosen from the request instead of a model:
+- if `create_team` is offered and the last user message mentions a team, it calls `create_team`;
+- if `update_agent_details` is offered and the last user message asks for a change, it calls that;
+- otherwise it answers with a short canned text reply.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EDIT_WORDS = ("change", "rename", "update", "make", "rewrite")
+
+
+def fake_team(size):
+    """Returns `size` deterministic team members shaped like create_team arguments."""
+    return [
+        {
+            "name": f"Specialist {i + 1}",
+            "role": f"Research Analyst {i + 1}",
+            "description": (
+                f"- Investigates area {i + 1} of the task in depth\n"
+                f"- Gathers sources, compares viewpoints and checks for bias\n"
+                f"- Delivers a concise written brief for area {i + 1}"
+            ),
+            "epilogue": f"A team of {size} specialists covering complementary areas.",
+        }
+        for i in range(size)
+    ]
+
+
+def prompt_tokens(body):
+    """Estimates a request's prompt tokens (~4 characters per token), tools included."""
+    chars = sum(len(str(m.get("content") or "")) for m in body["messages"])
+    if body.get("tools"):
+        chars += len(json.dumps(body["tools"]))
+    return chars // 4
+
+
+def _chunk_text(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class FakeOpenAI:
+    """Runs the fake API on a background thread; use `base_url` as the client's base URL."""
+
+    def __init__(self, latency=0.2, token_delay=0.005, team_size=6, chunk_chars=8, prompt_latency_per_1k=0.0, port=0):
+        self.latency = latency
+        # Extra time to first byte per 1,000 prompt tokens, to model prompt processing cost
+        self.prompt_latency_per_1k = prompt_latency_per_1k
+        self.token_delay = token_delay
+        self.team_size = team_size
+        self.chunk_chars = chunk_chars
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def reply_for(self, request):
+        """Returns (content, tool_calls) for a request body."""
+        offered = {tool["function"]["name"] for tool in request.get("tools") or []}
+        if request.get("tool_choice") == "none":
+            offered = set()
+        last_user = next(
+            (m.get("content") or "" for m in reversed(request["messages"]) if m["role"] == "user"), ""
+        ).lower()
+
+        if "create_team" in offered and "team" in last_user:
+            arguments = json.dumps({"team_members": fake_team(self.team_size)})
+            return None, [{"id": "call_team", "name": "create_team", "arguments": arguments}]
+        if "update_agent_details" in offered and any(word in last_user for word in EDIT_WORDS):
+            arguments = json.dumps({
+                "index": 0,
+                "name": "Specialist 1",
+                "role": "Lead Research Analyst",
+                "description": "- Leads the research\n- Reviews sources\n- Signs off the final brief",
+            })
+            return None, [{"id": "call_edit", "name": "update_agent_details", "arguments": arguments}]
+        return "Could you tell me a little more about the goal and the audience for this team?", []
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with fake._lock:
+                    fake.request_count += 1
+                time.sleep(fake.latency + fake.prompt_latency_per_1k * prompt_tokens(body) / 1000)
+                content, tool_calls = fake.reply_for(body)
+                if body.get("stream"):
+                    self._stream(body, content, tool_calls)
+                else:
+                    self._respond(body, content, tool_calls)
+
+            def _base(self, body, kind):
+                return {"id": "chatcmpl-fake", "object": kind, "created": int(time.time()), "model": body["model"]}
+
+            def _usage(self, body, content, tool_calls):
+                prompt = prompt_tokens(body)
+                completion = len(content or "".join(c["arguments"] for c in tool_calls)) // 4
+                return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+            def _respond(self, body, content, tool_calls):
+                time.sleep(fake.token_delay * len(content or "".join(c["arguments"] for c in tool_calls)) / fake.chunk_chars)
+                message = {"role": "assistant", "content": content}
+                if tool_calls:
+                    message["tool_calls"] = [
+                        {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+                        for c in tool_calls
+                    ]
+                payload = self._base(body, "chat.completion")
+                payload["choices"] = [{
+                    "index": 0,
+                    "message": message,
+                    "finish_reason": "tool_calls" if tool_calls else "stop",
+                }]
+                payload["usage"] = self._usage(body, content, tool_calls)
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_event(self, payload):
+                self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode())
+                self.wfile.flush()
+
+            def _delta(self, body, delta, finish_reason=None):
+                payload = self._base(body, "chat.completion.chunk")
+                payload["choices"] = [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+                return payload
+
+            def _stream(self, body, content, tool_calls):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                self._send_event(self._delta(body, {"role": "assistant", "content": None if tool_calls else ""}))
+                if content:
+                    for piece in _chunk_text(content, fake.chunk_chars):
+                        time.sleep(fake.token_delay)
+                        self._send_event(self._delta(body, {"content": piece}))
+                for index, call in enumerate(tool_calls):
+                    self._send_event(self._delta(body, {"tool_calls": [{
+                        "index": index, "id": call["id"], "type": "function",
+                        "function": {"name": call["name"], "arguments": ""},
+                    }]}))
+                    for piece in _chunk_text(call["arguments"], fake.chunk_chars):
+                        time.sleep(fake.token_delay)
+                        self._send_event(self._delta(body, {"tool_calls": [{
+                            "index": index, "function": {"arguments": piece},
+                        }]}))
+                self._send_event(self._delta(body, {}, "tool_calls" if tool_calls else "stop"))
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    payload = self._base(body, "chat.completion.chunk")
+                    payload["choices"] = []
+                    payload["usage"] = self._usage(body, content, tool_calls)
+                    self._send_event(payload)
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
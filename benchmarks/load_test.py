@@ -0,0 +1,235 @@
+"""Runs many concurrent sessions in one process against the fake API and reports throughput and memory per session.
+
+Each simulated session goes through the create and edit flows on its own TeamState,
+history managers and scheduled client, like one Streamlit session: a clarifying turn,
+the create_team -> create_agents turn, edit-chat update_agent_details round trips and
+follow-up questions, padded with earlier messages. Sessions are registered with a
+SessionRegistry while they run and stay registered after, so the report covers memory
+while they are all live and after they are evicted to the session store, and how long
+an evicted session takes to reload.
+With --max-live-sessions, sessions past the cap are evicted as others finish, which
+shows how far eviction bounds RSS growth (freed memory is reused rather than returned
+to the OS, so RSS does not shrink after a final eviction).
+
+    python -m benchmarks.load_test --sessions 200 --concurrency 32 -o load_results.json
+    python -m benchmarks.load_test --sessions 200 --concurrency 32 --max-live-sessions 20
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks.fake_openai import FakeOpenAI
+from biasbouncer import engine
+from biasbouncer.client_pool import ClientPool, ScheduledClient
+from biasbouncer.engine import TeamState
+from biasbouncer.history import HistoryManager
+from biasbouncer.scheduler import RequestScheduler
+from biasbouncer.sessions import SessionRegistry, deep_sizeof
+from biasbouncer.store import SessionStore
+from biasbouncer.tracing import percentile
+
+CLARIFYING_PROMPT = "I need help reviewing how fair our hiring process is."
+TEAM_PROMPT = "That's everything, please create the team now."
+EDIT_PROMPT = "Please rename this agent and make them lead the research."
+QA_PROMPT = "Which of these agents should look at the interview stage first?"
+
+
+def rss_bytes():
+    """Returns the process's resident set size from /proc/self/statm, or None where that is unavailable."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class SimulatedSession:
+    """One session's objects, as the app keeps them in st.session_state."""
+
+    def __init__(self, openai_client, scheduler, max_fanout):
+        self.session_id = uuid.uuid4().hex
+        self.client = ScheduledClient(openai_client, scheduler, self.session_id)
+        self.state = TeamState(max_fanout=max_fanout)
+        self.history_manager = HistoryManager()
+        self.agent_history_managers = {}
+        self.turn_latencies = []
+
+    def turn(self, run):
+        start = time.perf_counter()
+        run()
+        self.turn_latencies.append(time.perf_counter() - start)
+
+    def run_flow(self, store, registry, edits, qa_turns, history_messages, stream):
+        # Busy for the whole flow, as the app is for each run, so eviction never empties a state mid-flow
+        with registry.running(self.session_id, self.state, self.agent_history_managers):
+            self._run_turns(edits, qa_turns, history_messages, stream)
+            engine.sync_agents(self.state)
+            store.save(self.session_id, self.state)
+
+    def _run_turns(self, edits, qa_turns, history_messages, stream):
+        client, state = self.client, self.state
+        chat = lambda prompt: engine.chat_turn(state, client, prompt, history_manager=self.history_manager, stream=stream)
+        self.turn(lambda: chat(CLARIFYING_PROMPT))
+        self.turn(lambda: chat(TEAM_PROMPT))
+        if not state.agents_created:
+            raise RuntimeError("create_team did not create any agents")
+        for edit in range(edits):
+            index = edit % len(state.team_details)
+            manager = self.agent_history_managers.setdefault(index, HistoryManager())
+            self.turn(lambda: engine.edit_turn(state, client, index, EDIT_PROMPT, history_manager=manager, stream=stream))
+        for i in range(history_messages):
+            role = "user" if i % 2 == 0 else "assistant"
+            state.chat_history.append({"role": role, "content": f"Earlier message {i}: " + "lorem ipsum " * 20})
+        for _ in range(qa_turns):
+            self.turn(lambda: chat(QA_PROMPT))
+
+
+def summarize(values):
+    return {
+        "mean": statistics.mean(values),
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "max": max(values),
+    }
+
+
+def run(sessions=50, concurrency=16, latency=0.05, token_delay=0.0, team_size=6, edits=2, qa_turns=2, history_messages=40,
+        stream=True, max_fanout=10, max_live_sessions=None, reload_samples=20):
+    """Runs `sessions` flows on `concurrency` threads, then evicts them all and reloads a sample."""
+    with tempfile.TemporaryDirectory() as workdir, FakeOpenAI(latency=latency, token_delay=token_delay, team_size=team_size) as fake:
+        store = SessionStore(os.path.join(workdir, "store.sqlite3"))
+        # The fake API has no rate limits; the default budgets would turn the run into a throttling test
+        scheduler = RequestScheduler(requests_per_minute=1_000_000, tokens_per_minute=1_000_000_000)
+        openai_client = ClientPool().get("fake", base_url=fake.base_url)
+        registry = SessionRegistry(store, idle_seconds=3600, max_sessions=max_live_sessions, min_idle_seconds=0, check_interval_s=0)
+
+        # A warm-up session loads modules, pools and caches so they are not billed to the measured sessions
+        SimulatedSession(openai_client, scheduler, max_fanout).run_flow(store, SessionRegistry(store), edits, qa_turns, history_messages, stream)
+        gc.collect()
+        rss_before = rss_bytes()
+
+        simulated = [SimulatedSession(openai_client, scheduler, max_fanout) for _ in range(sessions)]
+        calls = fake.request_count
+        errors = []
+        lock = threading.Lock()
+
+        def run_one(session):
+            try:
+                session.run_flow(store, registry, edits, qa_turns, history_messages, stream)
+                registry.evict_idle()
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(run_one, simulated))
+        elapsed = time.perf_counter() - start
+        api_calls = fake.request_count - calls
+
+        gc.collect()
+        rss_live = rss_bytes()
+        live_memory = registry.memory()
+        state_bytes = [
+            deep_sizeof((s.state, s.agent_history_managers, s.history_manager)) for s in simulated if not s.state.evicted
+        ]
+        evicted_during_run = registry.stats()["evicted_sessions"]
+
+        # Drop the sessions' own history managers too, as the app does when it reloads an evicted session
+        registry.evict_idle(now=time.monotonic() + registry.idle_seconds + 1, force=True)
+        for session in simulated:
+            session.history_manager = None
+        gc.collect()
+        rss_evicted = rss_bytes()
+
+        reload_times = []
+        for session in simulated[:reload_samples]:
+            start_reload = time.perf_counter()
+            state = store.load_session(session.session_id, max_fanout=max_fanout)
+            reload_times.append(time.perf_counter() - start_reload)
+            if state is None or not state.agents_created:
+                errors.append(f"session {session.session_id} did not reload")
+
+    turns = [latency_s for session in simulated for latency_s in session.turn_latencies]
+    per_session = lambda rss: (rss - rss_before) / sessions if rss is not None and rss_before is not None else None
+    return {
+        "config": {
+            "sessions": sessions, "concurrency": concurrency, "latency": latency, "token_delay": token_delay,
+            "team_size": team_size, "edits": edits, "qa_turns": qa_turns, "history_messages": history_messages,
+            "stream": stream, "max_fanout": max_fanout, "max_live_sessions": max_live_sessions,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "elapsed_s": elapsed,
+        "throughput": {
+            "sessions_per_s": sessions / elapsed,
+            "turns_per_s": len(turns) / elapsed,
+            "api_calls_per_s": api_calls / elapsed,
+        },
+        "turn_latency_s": summarize(turns) if turns else None,
+        "memory": {
+            "rss_per_session_bytes": per_session(rss_live),
+            "rss_per_session_after_eviction_bytes": per_session(rss_evicted),
+            # Each session's objects on their own, and with objects shared between sessions counted once
+            "state_bytes_per_session": statistics.mean(state_bytes) if state_bytes else None,
+            "unique_bytes_per_session": live_memory["bytes_per_session"],
+            "live_bytes_after_eviction": registry.memory()["live_bytes"],
+        },
+        "evicted_during_run": evicted_during_run,
+        "reload_s": summarize(reload_times) if reload_times else None,
+        "api_calls": api_calls,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=16, help="Sessions running at once.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before the first byte of each response.")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed chunks.")
+    parser.add_argument("--team-size", type=int, default=6)
+    parser.add_argument("--edits", type=int, default=2, help="Edit-chat round trips per session.")
+    parser.add_argument("--qa-turns", type=int, default=2, help="Follow-up questions per session after the team exists.")
+    parser.add_argument("--history-messages", type=int, default=40, help="Earlier messages added to each session's chat.")
+    parser.add_argument("--no-stream", action="store_true", help="Use blocking completions.")
+    parser.add_argument("--max-live-sessions", type=int, help="Evict the least recently finished sessions past this many.")
+    parser.add_argument("-o", "--output", default="load_results.json")
+    args = parser.parse_args()
+
+    results = run(
+        sessions=args.sessions, concurrency=args.concurrency, latency=args.latency, token_delay=args.token_delay,
+        team_size=args.team_size, edits=args.edits, qa_turns=args.qa_turns, history_messages=args.history_messages,
+        stream=not args.no_stream, max_live_sessions=args.max_live_sessions,
+    )
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    throughput, memory = results["throughput"], results["memory"]
+    print(f"{args.sessions} sessions in {results['elapsed_s']:.1f} s: {throughput['sessions_per_s']:.1f} sessions/s, "
+          f"{throughput['turns_per_s']:.1f} turns/s, p95 turn {results['turn_latency_s']['p95'] * 1000:.0f} ms", file=sys.stderr)
+    if memory["rss_per_session_bytes"] is not None:
+        print(f"RSS per session: {memory['rss_per_session_bytes'] / 1024:.0f} KiB live, "
+              f"{memory['rss_per_session_after_eviction_bytes'] / 1024:.0f} KiB after eviction", file=sys.stderr)
+    print(f"state per session: {memory['state_bytes_per_session'] / 1024:.0f} KiB, "
+          f"{memory['unique_bytes_per_session'] / 1024:.0f} KiB unshared · reload p95 {results['reload_s']['p95'] * 1000:.1f} ms",
+          file=sys.stderr)
+    if results["errors"]:
+        print(f"{len(results['errors'])} errors, first: {results['errors'][0]}", file=sys.stderr)
+    print(f"results: {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
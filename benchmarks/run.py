@@ -0,0 +1,187 @@
+"""Runs the app's conversation flow against the fake API and reports per-phase latency, memory and API calls.
+
+Each session is driven through Streamlit's AppTest, exactly as a user would:
+the clarifying turn, the create_team -> create_agents turn, an edit-dialog
+update_agent_details round trip, and reruns and a turn on a long chat history.
+Results are written as JSON so runs can be compared.
+
+    python -m benchmarks.run --sessions 3 --latency 0.2 --token-delay 0.005 -o bench_results.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.fake_openai import FakeOpenAI
+from biasbouncer import tracing
+
+APP_PATH = str(Path(__file__).resolve().parent.parent / "streamlit_app.py")
+CLARIFYING_PROMPT = "I need help reviewing how fair our hiring process is."
+TEAM_PROMPT = "That's everything, please create the team now."
+EDIT_PROMPT = "Please rename this agent and make them lead the research."
+LONG_HISTORY_PROMPT = "Can you summarise where we are?"
+
+
+class Session:
+    """One simulated browser session, with a timer that records each phase."""
+
+    def __init__(self, fake, secrets, stream, cache, timeout):
+        self.fake = fake
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        for key, value in secrets.items():
+            self.app.secrets[key] = value
+        self.app.session_state["stream_responses"] = stream
+        self.app.session_state["cache_responses"] = cache
+        self.phases = {}
+
+    def phase(self, name, action):
+        calls = self.fake.request_count
+        start = time.perf_counter()
+        action()
+        elapsed = time.perf_counter() - start
+        if self.app.exception:
+            raise RuntimeError(f"{name} failed: {self.app.exception[0].message}")
+        self.phases[name] = {"latency_s": elapsed, "api_calls": self.fake.request_count - calls}
+
+    def chat_input(self, placeholder_prefix):
+        return next(c for c in self.app.chat_input if c.proto.placeholder.startswith(placeholder_prefix))
+
+    def run_flow(self, history_messages, reruns):
+        app = self.app
+        self.phase("initial_render", app.run)
+        self.phase("clarifying_turn", lambda: self.chat_input("Describe").set_value(CLARIFYING_PROMPT).run())
+        self.phase("create_team", lambda: self.chat_input("Describe").set_value(TEAM_PROMPT).run())
+        if not app.session_state["team_state"].agents_created:
+            raise RuntimeError("create_team did not create any agents")
+        self.phase("open_edit_dialog", lambda: app.button(key="edit_btn_0").click().run())
+        self.phase("edit_round_trip", lambda: self.chat_input("Ask AI").set_value(EDIT_PROMPT).run())
+        self.phase("close_edit_dialog", lambda: next(b for b in app.button if b.label.startswith("Apply")).click().run())
+
+        state = app.session_state["team_state"]
+        for i in range(history_messages):
+            role = "user" if i % 2 == 0 else "assistant"
+            state.chat_history.append({"role": role, "content": f"Earlier message {i}: " + "lorem ipsum " * 20})
+        rerun_times = []
+        for _ in range(reruns):
+            start = time.perf_counter()
+            app.run()
+            rerun_times.append(time.perf_counter() - start)
+        self.phases["long_history_rerun"] = {"latency_s": statistics.median(rerun_times), "api_calls": 0}
+        self.phase("long_history_turn", lambda: self.chat_input("Describe").set_value(LONG_HISTORY_PROMPT).run())
+        self.phases["long_history_turn"]["prompt_tokens"] = app.session_state["last_prompt_tokens"]
+
+
+def summarize(values):
+    return {
+        "mean": statistics.mean(values),
+        "min": min(values),
+        "max": max(values),
+    }
+
+
+def run(sessions=3, latency=0.2, token_delay=0.005, team_size=6, history_messages=200, reruns=3, stream=True, cache=False,
+        memory_sessions=2, timeout=60):
+    """Times `sessions` full flows, then measures memory over `memory_sessions` more with tracemalloc.
+
+    tracemalloc slows Python down several times over, so it only runs in the second pass.
+    """
+    tracing.tracer.reset()
+    with tempfile.TemporaryDirectory() as workdir, FakeOpenAI(latency=latency, token_delay=token_delay, team_size=team_size) as fake:
+        os.environ["OPENAI_BASE_URL"] = fake.base_url
+        secrets = {
+            "OPENAI_API_KEY": "fake",
+            "SESSION_STORE_PATH": os.path.join(workdir, "store.sqlite3"),
+            "RESPONSE_CACHE_PATH": os.path.join(workdir, "cache.sqlite3"),
+            "TRACE_PROMETHEUS_PATH": os.path.join(workdir, "metrics.prom"),
+            # The fake API has no rate limits; the default budgets would turn the run into a throttling test
+            "OPENAI_REQUESTS_PER_MINUTE": 1_000_000,
+            "OPENAI_TOKENS_PER_MINUTE": 1_000_000_000,
+        }
+        per_session = []
+        for _ in range(sessions):
+            session = Session(fake, secrets, stream, cache, timeout)
+            session.run_flow(history_messages, reruns)
+            per_session.append(session.phases)
+        total_calls = fake.request_count
+        spans = tracing.tracer.summary()
+
+        # Sessions stay alive so each one's memory is measured on top of the ones before it
+        live, memory = [], []
+        tracemalloc.start()
+        for _ in range(memory_sessions):
+            gc.collect()
+            before = tracemalloc.get_traced_memory()[0]
+            session = Session(fake, secrets, stream, cache, timeout)
+            session.run_flow(history_messages, reruns)
+            live.append(session)
+            gc.collect()
+            memory.append(tracemalloc.get_traced_memory()[0] - before)
+        tracemalloc.stop()
+
+    phases = {}
+    for name in per_session[0]:
+        rows = [phases_by_name[name] for phases_by_name in per_session]
+        phases[name] = {
+            "latency_s": summarize([row["latency_s"] for row in rows]),
+            "api_calls": summarize([row["api_calls"] for row in rows]),
+        }
+        if "prompt_tokens" in rows[0]:
+            phases[name]["prompt_tokens"] = summarize([row["prompt_tokens"] for row in rows])
+    return {
+        "config": {
+            "sessions": sessions, "latency": latency, "token_delay": token_delay, "team_size": team_size,
+            "history_messages": history_messages, "reruns": reruns, "stream": stream, "cache": cache,
+            "memory_sessions": memory_sessions,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "streamlit": streamlit.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "phases": phases,
+        "memory_per_session_bytes": summarize(memory) if memory else None,
+        "api_calls_total": total_calls,
+        "spans": spans,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first byte of each response.")
+    parser.add_argument("--token-delay", type=float, default=0.005, help="Seconds between streamed chunks.")
+    parser.add_argument("--team-size", type=int, default=6)
+    parser.add_argument("--history-messages", type=int, default=200, help="Messages added before the long-history phases.")
+    parser.add_argument("--reruns", type=int, default=3, help="Plain reruns timed on the long history.")
+    parser.add_argument("--no-stream", action="store_true", help="Use blocking completions.")
+    parser.add_argument("--cache", action="store_true", help="Leave the response cache on (off by default so every call hits the API).")
+    parser.add_argument("--memory-sessions", type=int, default=2, help="Extra sessions run under tracemalloc; 0 skips it.")
+    parser.add_argument("-o", "--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = run(
+        sessions=args.sessions, latency=args.latency, token_delay=args.token_delay, team_size=args.team_size,
+        history_messages=args.history_messages, reruns=args.reruns, stream=not args.no_stream, cache=args.cache,
+        memory_sessions=args.memory_sessions,
+    )
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    for name, phase in results["phases"].items():
+        print(f"{name:20} {phase['latency_s']['mean'] * 1000:8.1f} ms  {phase['api_calls']['mean']:4.1f} API calls", file=sys.stderr)
+    if results["memory_per_session_bytes"]:
+        print(f"memory per session: {results['memory_per_session_bytes']['mean'] / 1024:.0f} KiB", file=sys.stderr)
+    print(f"{results['api_calls_total']} API calls · results: {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
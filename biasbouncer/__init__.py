@@ -0,0 +1 @@
+"""Core building blocks for the BiasBouncer Streamlit app."""
@@ -0,0 +1,158 @@
+"""Generates teams for a JSONL file of prompts without the Streamlit UI.
+
+Each input line is either a JSON string or an object with a "prompt" key and an
+optional "id". Each output line holds the prompt, the generated team and every
+agent's instructions:
+
+    python -m biasbouncer.batch prompts.jsonl -o teams.jsonl --concurrency 16 --rpm 500
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from openai import AsyncOpenAI
+
+from biasbouncer import engine
+from biasbouncer.completions import message_from_response
+from biasbouncer.prompts import MAIN_SYSTEM_PROMPT
+
+BATCH_INSTRUCTION = "Do not ask clarifying questions. Create the team now based on this request."
+
+
+class AsyncRateLimiter:
+    """Spaces request starts evenly so no more than `per_minute` begin in any minute."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_start - now
+            self._next_start = max(now, self._next_start) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def read_prompts(path):
+    """Yields (id, prompt, error) triples from a JSONL file.
+
+    A line that is not valid JSON or has no prompt yields its line number, None and
+    the reason, so one bad line is reported instead of stopping the whole batch.
+    """
+    with open(path, encoding="utf-8") as prompts_file:
+        for line_number, line in enumerate(prompts_file, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, None, f"Line {line_number} is not valid JSON ({e})."
+                continue
+            if isinstance(record, str):
+                yield line_number, record, None
+            elif isinstance(record, dict) and isinstance(record.get("prompt"), str):
+                yield record.get("id", line_number), record["prompt"], None
+            else:
+                yield line_number, None, f'Line {line_number} has no "prompt" string.'
+
+
+async def generate_team(client, prompt_id, prompt, model):
+    """Asks the model for a team for one prompt and returns the output record."""
+    state = engine.TeamState(build_sdk_agents=False)
+    state.chat_history.append({"role": "user", "content": prompt})
+    start = time.perf_counter()
+    response = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": MAIN_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{prompt}\n\n{BATCH_INSTRUCTION}"},
+        ],
+        tools=engine.TOOLS,
+        tool_choice={"type": "function", "function": {"name": "create_team"}},
+    )
+    message = message_from_response(response)
+    tool_results = engine.run_tool_calls(state, message.tool_calls or [])
+    team_result = next((result for result in tool_results if result.name == "create_team"), None)
+    if team_result is None:
+        raise ValueError("The model did not call create_team.")
+    if team_result.content.startswith("Error") or not state.team_details:
+        raise ValueError(team_result.content)
+    return {
+        "id": prompt_id,
+        "prompt": prompt,
+        "team": state.team_details,
+        "agents": [
+            {"name": agent["name"], "role": agent["role"], "instructions": agent["instructions"]}
+            for agent in state.agent_objects
+        ],
+        "usage": message.usage,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+    }
+
+
+async def run_batch(client, prompts, output, model="gpt-4o", concurrency=8, requests_per_minute=None):
+    """Generates a team per prompt with bounded concurrency and writes records as they finish.
+
+    `prompts` are `read_prompts` triples; lines that could not be read are written as
+    error records. Returns the number of prompts that failed.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = AsyncRateLimiter(requests_per_minute)
+    failures = 0
+
+    async def worker(prompt_id, prompt, error):
+        nonlocal failures
+        if error is not None:
+            failures += 1
+            output.write(json.dumps({"id": prompt_id, "prompt": None, "error": error}, ensure_ascii=False) + "\n")
+            output.flush()
+            return
+        async with semaphore:
+            await limiter.acquire()
+            try:
+                record = await generate_team(client, prompt_id, prompt, model)
+            except Exception as e:
+                failures += 1
+                record = {"id": prompt_id, "prompt": prompt, "error": str(e)}
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+
+    await asyncio.gather(*(worker(*prompt) for prompt in prompts))
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate BiasBouncer teams for a JSONL file of prompts.")
+    parser.add_argument("prompts", help="JSONL file of prompts.")
+    parser.add_argument("-o", "--output", default="-", help="Output JSONL file (default: stdout).")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum requests in flight.")
+    parser.add_argument("--rpm", type=int, default=None, help="Maximum requests started per minute.")
+    parser.add_argument("--base-url", default=None, help="Alternative API base URL.")
+    args = parser.parse_args(argv)
+
+    client = AsyncOpenAI(base_url=args.base_url)
+    prompts = list(read_prompts(args.prompts))
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        failures = asyncio.run(run_batch(client, prompts, output, args.model, args.concurrency, args.rpm))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(
+        f"Generated {len(prompts) - failures}/{len(prompts)} teams in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""One pooled OpenAI client per API key, wrapped per session so calls go through the scheduler."""
+import asyncio
+import hashlib
+import threading
+from contextvars import ContextVar
+
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
+
+from biasbouncer.scheduler import estimate_body_tokens, estimate_tokens
+
+# The session an async client's requests are queued under; set per team run
+current_session = ContextVar("current_session", default=None)
+
+
+def key_fingerprint(api_key):
+    """Returns a short hash that identifies an API key without exposing it."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class ClientPool:
+    """Keeps a single OpenAI client, and so a single HTTP connection pool, per API key."""
+
+    def __init__(self, timeout=60.0):
+        self.timeout = timeout
+        self._clients = {}
+        self._async_clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, api_key, base_url=None):
+        pool_key = (key_fingerprint(api_key), base_url)
+        with self._lock:
+            if pool_key not in self._clients:
+                # Retries are handled by the scheduler, which can also back off fairly
+                self._clients[pool_key] = OpenAI(api_key=api_key, base_url=base_url, max_retries=0, timeout=self.timeout)
+            return self._clients[pool_key]
+
+    def get_async(self, api_key, scheduler, base_url=None):
+        """Returns the pooled AsyncOpenAI client for a key, for the Agents SDK.
+
+        Every HTTP request it sends, retries included, first waits for the key's
+        scheduler under `current_session`, so agent runs share the RPM/TPM budgets and
+        fair queueing with chat turns. The client keeps its own 429 backoff, since the
+        SDK makes the calls.
+        """
+        pool_key = (key_fingerprint(api_key), base_url)
+        with self._lock:
+            if pool_key not in self._async_clients:
+                http_client = DefaultAsyncHttpxClient(event_hooks={"request": [_scheduled_request(scheduler)]})
+                self._async_clients[pool_key] = AsyncOpenAI(
+                    api_key=api_key, base_url=base_url, timeout=self.timeout, http_client=http_client
+                )
+            return self._async_clients[pool_key]
+
+    def __len__(self):
+        return len(self._clients) + len(self._async_clients)
+
+
+def _scheduled_request(scheduler):
+    async def wait_for_budget(request):
+        # acquire blocks, so it waits on a worker thread rather than the event loop
+        await asyncio.to_thread(scheduler.acquire, current_session.get(), estimate_body_tokens(request.content))
+    return wait_for_budget
+
+
+class _ScheduledCompletions:
+    def __init__(self, completions, scheduler, session_id):
+        self._completions = completions
+        self._scheduler = scheduler
+        self._session_id = session_id
+
+    def create(self, **request):
+        return self._scheduler.call(
+            self._session_id, lambda: self._completions.create(**request), estimate_tokens(request)
+        )
+
+
+class _ScheduledChat:
+    def __init__(self, chat, scheduler, session_id):
+        self.completions = _ScheduledCompletions(chat.completions, scheduler, session_id)
+
+
+class ScheduledClient:
+    """A per-session view of a pooled client whose chat completions are queued by the scheduler."""
+
+    def __init__(self, client, scheduler, session_id):
+        self._client = client
+        self.session_id = session_id
+        self.chat = _ScheduledChat(client.chat, scheduler, session_id)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
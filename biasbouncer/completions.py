@@ -0,0 +1,254 @@
+"""Chat completion calls with optional token streaming and incremental team parsing."""
+import json
+import re
+import time
+from dataclasses import dataclass, field
+
+from biasbouncer import tracing
+
+_TEAM_MEMBERS_RE = re.compile(r'"team_members"\s*:\s*\[')
+
+
+@dataclass
+class FunctionCall:
+    name: str = ""
+    arguments: str = ""
+
+
+@dataclass
+class ToolCall:
+    id: str = ""
+    type: str = "function"
+    function: FunctionCall = field(default_factory=FunctionCall)
+
+
+@dataclass
+class ChatMessage:
+    """An assistant message shaped like the SDK's ChatCompletionMessage, plus timings."""
+    content: str | None = None
+    tool_calls: list | None = None
+    usage: dict | None = None
+    first_token_s: float | None = None
+    first_member_s: float | None = None
+    elapsed_s: float = 0.0
+    # Time spent in the on_text/on_member callbacks, which is page rendering rather than the model
+    callback_s: float = 0.0
+    cached: bool = False
+
+    def stats(self):
+        """Returns the timing fields as a plain dict."""
+        return {
+            "first_token_s": self.first_token_s,
+            "first_member_s": self.first_member_s,
+            "elapsed_s": self.elapsed_s,
+            "cached": self.cached,
+        }
+
+
+class TeamMemberParser:
+    """Extracts each completed `team_members` object from partial create_team arguments."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._start = None
+        self._done = False
+
+    def feed(self, fragment):
+        """Appends an argument fragment and returns the members it completed."""
+        self._buffer += fragment
+        if self._done:
+            return []
+        if self._pos is None:
+            match = _TEAM_MEMBERS_RE.search(self._buffer)
+            if not match:
+                return []
+            self._pos = match.end()
+
+        members = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer):
+            char = buffer[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                if self._depth == 0 and char == "{":
+                    self._start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0:
+                    # Closing bracket of the team_members array itself
+                    self._done = True
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    try:
+                        members.append(json.loads(buffer[self._start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._start = None
+            i += 1
+        self._pos = i
+        return members
+
+
+def _usage_dict(usage):
+    if usage is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+    }
+
+
+def message_from_response(response):
+    """Converts a non-streamed ChatCompletion into a ChatMessage."""
+    message = response.choices[0].message
+    tool_calls = None
+    if message.tool_calls:
+        tool_calls = [
+            ToolCall(
+                id=call.id,
+                type=call.type,
+                function=FunctionCall(name=call.function.name, arguments=call.function.arguments),
+            )
+            for call in message.tool_calls
+        ]
+    return ChatMessage(content=message.content, tool_calls=tool_calls, usage=_usage_dict(response.usage))
+
+
+def consume_stream(chunks, on_text=None, on_member=None, start=None):
+    """Assembles streamed chunks into a ChatMessage, reporting text and team members as they arrive."""
+    start = time.perf_counter() if start is None else start
+    message = ChatMessage()
+    content_parts = []
+    calls = {}
+    parsers = {}
+    member_count = 0
+
+    for chunk in chunks:
+        if getattr(chunk, "usage", None):
+            message.usage = _usage_dict(chunk.usage)
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            if message.first_token_s is None:
+                message.first_token_s = time.perf_counter() - start
+            content_parts.append(delta.content)
+            if on_text:
+                callback_start = time.perf_counter()
+                on_text("".join(content_parts))
+                message.callback_s += time.perf_counter() - callback_start
+
+        for call_delta in delta.tool_calls or []:
+            if message.first_token_s is None:
+                message.first_token_s = time.perf_counter() - start
+            call = calls.setdefault(call_delta.index, ToolCall())
+            if call_delta.id:
+                call.id = call_delta.id
+            if call_delta.function is None:
+                continue
+            if call_delta.function.name:
+                call.function.name += call_delta.function.name
+            fragment = call_delta.function.arguments
+            if not fragment:
+                continue
+            call.function.arguments += fragment
+            if call.function.name != "create_team":
+                continue
+            parser = parsers.setdefault(call_delta.index, TeamMemberParser())
+            for member in parser.feed(fragment):
+                if message.first_member_s is None:
+                    message.first_member_s = time.perf_counter() - start
+                if on_member:
+                    callback_start = time.perf_counter()
+                    on_member(member, member_count)
+                    message.callback_s += time.perf_counter() - callback_start
+                member_count += 1
+
+    message.content = "".join(content_parts) or None
+    message.tool_calls = [calls[index] for index in sorted(calls)] or None
+    message.elapsed_s = time.perf_counter() - start
+    return message
+
+
+def replay_message(message, on_text=None, on_member=None):
+    """Sends a finished message through the streaming callbacks in one go."""
+    if message.content and on_text:
+        on_text(message.content)
+    if not on_member:
+        return
+    position = 0
+    for call in message.tool_calls or []:
+        if call.function.name != "create_team":
+            continue
+        try:
+            members = json.loads(call.function.arguments).get("team_members", [])
+        except ValueError:
+            continue
+        for member in members:
+            on_member(member, position)
+            position += 1
+
+
+def complete_chat(client, stream=False, on_text=None, on_member=None, cache=None, **request):
+    """Runs a chat completion and returns a ChatMessage, streaming tokens when `stream` is set.
+
+    While streaming, `on_text(text_so_far)` is called as content arrives and
+    `on_member(member, position)` is called as soon as each `create_team` member's
+    JSON object is complete. With a `cache`, identical requests are answered
+    without calling the API and replayed through the same callbacks.
+    """
+    with tracing.span("llm.chat", model=request.get("model"), stream=stream, cache="off" if cache is None else "miss") as span:
+        message = _complete_chat(client, stream, on_text, on_member, cache, request)
+        # Replayed replies cost no tokens
+        usage = {} if message.cached else message.usage or {}
+        span.set(
+            cache="hit" if message.cached else None,
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            first_token_s=message.first_token_s,
+            tool_calls=len(message.tool_calls or []),
+        )
+        return message
+
+
+def _complete_chat(client, stream, on_text, on_member, cache, request):
+    start = time.perf_counter()
+    key = cache.key_for(request) if cache is not None else None
+    if key is not None:
+        message = cache.get(key)
+        if message is not None:
+            message.first_token_s = time.perf_counter() - start
+            if any(call.function.name == "create_team" for call in message.tool_calls or []):
+                message.first_member_s = message.first_token_s
+            if stream:
+                replay_message(message, on_text, on_member)
+            message.elapsed_s = time.perf_counter() - start
+            return message
+
+    if stream:
+        chunks = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **request)
+        message = consume_stream(chunks, on_text=on_text, on_member=on_member, start=start)
+    else:
+        message = message_from_response(client.chat.completions.create(**request))
+        message.elapsed_s = time.perf_counter() - start
+
+    if key is not None:
+        cache.set(key, message)
+    return message
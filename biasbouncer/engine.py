@@ -0,0 +1,538 @@
+"""UI-free team operations over an explicit TeamState, shared by the Streamlit app and the batch CLI."""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from functools import lru_cache
+from dataclasses import dataclass, field
+
+from biasbouncer import research, routing, tracing
+from biasbouncer.completions import complete_chat
+from biasbouncer.hierarchy import chunk, group_by_role, role_key
+from biasbouncer.prompts import AGENT_INSTRUCTIONS_TEMPLATE, EDIT_SYSTEM_PROMPT, MAIN_SYSTEM_PROMPT
+from biasbouncer.tool_registry import ToolRegistry, tool_messages
+
+try:
+    from agents import Agent
+    AGENTS_SDK_AVAILABLE = True
+except ImportError:
+    AGENTS_SDK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+MANAGER_INSTRUCTIONS = "You coordinate the team of specialist agents and determine which agent should handle each task based on their expertise."
+SUB_MANAGER_INSTRUCTIONS = "You lead the {focus} part of a larger team and determine which of your agents should handle each task based on their expertise."
+
+# Schemas for the AI tools
+TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "create_team",
+            "description": "Creates a team of AI agents with specified names, roles, and descriptions.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "team_members": {
+                        "type": "array",
+                        "description": "A list of team members.",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string", "description": "The name of the team member."},
+                                "role": {"type": "string", "description": "The specific role or job title of the member."},
+                                "description": {"type": "string", "description": "A detailed, multi-point description formatted as a markdown bulleted list."},
+                                "epilogue": {"type": "string", "description": "A brief 2-3 sentence description of the team that has been created, with team names and roles specified along with their intended team dynamics."}
+                            }, "required": ["name", "role", "description", "epilogue"]
+                        }
+                    }
+                }, "required": ["team_members"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "update_agent_details",
+            "description": "Updates the details for a single agent.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer", "description": "The index of the agent to update."},
+                    "name": {"type": "string", "description": "The new name of the team member."},
+                    "role": {"type": "string", "description": "The new role of the team member."},
+                    "description": {"type": "string", "description": "The new detailed description of the team member, as a markdown bulleted list."}
+                }, "required": ["index", "name", "role", "description"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_agents",
+            "description": "Creates actual AI agent objects based on the team details that have been defined.",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        }
+    }
+]
+# Edit chats may only change the agent being edited
+EDIT_TOOL_NAMES = ("update_agent_details",)
+
+
+@dataclass
+class TeamState:
+    """Everything one conversation owns: chat, team, per-agent edit chats and built agents."""
+    chat_history: list = field(default_factory=list)
+    team_details: list = field(default_factory=list)
+    agent_chat_histories: dict = field(default_factory=dict)
+    agents_created: bool = False
+    agent_objects: list = field(default_factory=list)
+    manager_agent: object = None
+    task_results: dict = field(default_factory=dict)
+    # Indices of members edited since their agent was last built
+    dirty_agents: set = field(default_factory=set)
+    # Member index -> (manager Agent, position in its handoffs), for patching a single handoff
+    handoff_slots: dict = field(default_factory=dict)
+    # Most handoffs any one manager routes between; larger teams get role-based sub-managers
+    max_fanout: int | None = None
+    # Batch runs only need the instructions, not live SDK Agent objects
+    build_sdk_agents: bool = True
+    # Identifies the current team in the session store; a new one is issued per create_team
+    team_id: str | None = None
+    # Set for teams restored from the store until their SDK Agents are built on first use
+    sdk_agents_pending: bool = False
+    # Set when a SessionRegistry saved this state to the store and released it; reload before use
+    evicted: bool = False
+
+
+# --- Team Operations ---
+def create_team(state, team_members):
+    """Stores the generated team member details in the state."""
+    state.team_details = team_members
+    state.team_id = uuid.uuid4().hex
+    state.agents_created = False  # Reset agent creation status
+    state.sdk_agents_pending = False
+    state.agent_chat_histories = {i: [] for i in range(len(team_members))}
+    state.task_results = {}
+    return f"Successfully created a team with {len(team_members)} members."
+
+
+def update_agent_details(state, index, name, role, description):
+    """Updates the details of a specific agent in the state and marks its agent for a rebuild.
+
+    Tool calls for different members may run concurrently, so this only writes its own
+    member; call `sync_agents` afterwards to rebuild the dirty agents once.
+    """
+    if 0 <= index < len(state.team_details):
+        state.team_details[index] = {"name": name, "role": role, "description": description}
+        mark_agent_dirty(state, index)
+        return "Agent details updated successfully."
+    return "Error: Invalid agent index."
+
+
+def member_fingerprint(name, role, description):
+    """Hashes the member details an agent is built from."""
+    payload = json.dumps([name, role, description], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+# Instructions, edit prompts and specialist Agents are immutable once built, so sessions with
+# the same member share one copy instead of each holding their own
+@lru_cache(maxsize=1024)
+def agent_instructions(name, role, description):
+    """Combines role and description into comprehensive agent instructions."""
+    return AGENT_INSTRUCTIONS_TEMPLATE.format(name=name, role=role, description=description)
+
+
+@lru_cache(maxsize=1024)
+def sdk_agent(name, role, instructions):
+    """Builds the SDK Agent for a specialist, or returns None if it cannot be created.
+
+    Managers only ever replace entries in their own handoff lists, never mutate a
+    specialist, so the same Agent is safely shared by every team that has this member.
+    """
+    if not AGENTS_SDK_AVAILABLE:
+        return None
+    try:
+        return Agent(
+            name=name,
+            instructions=instructions,
+            handoff_description=f"Specialist agent for {role}",
+            tools=research.agent_tools(),
+        )
+    except Exception as e:
+        logger.warning("Could not create SDK agent for %s: %s", name, e)
+        return None
+
+
+def create_single_agent(name, role, description, build_sdk=True):
+    """Creates a single agent record, with an SDK Agent object when the SDK is available."""
+    instructions = agent_instructions(name, role, description)
+    agent = sdk_agent(name, role, instructions) if build_sdk else None
+    return {
+        "name": name,
+        "role": role,
+        "instructions": instructions,
+        "agent_object": agent,
+        "sdk_created": agent is not None,
+        "fingerprint": member_fingerprint(name, role, description),
+    }
+
+
+@tracing.traced("engine.create_agents")
+def create_agents(state):
+    """Creates agents for every team member, plus a Team Manager when the SDK is available."""
+    if not state.team_details:
+        return "Error: No team details found. Please create a team first."
+
+    state.agent_objects = [
+        create_single_agent(member["name"], member["role"], member["description"], state.build_sdk_agents)
+        for member in state.team_details
+    ]
+    state.agents_created = True
+    state.sdk_agents_pending = False
+    state.dirty_agents = set()
+
+    if any(agent["sdk_created"] for agent in state.agent_objects):
+        try:
+            build_manager(state)
+            return f"Successfully created {len(state.agent_objects)} AI agents with a Team Manager for coordination."
+        except Exception as e:
+            return f"Created {len(state.agent_objects)} agent configurations. Manager creation failed: {str(e)}"
+
+    state.manager_agent = None
+    state.handoff_slots = {}
+    return f"Successfully created {len(state.agent_objects)} agent configurations (SDK agents will be created when the Agents SDK is properly installed)."
+
+
+def _unique_name(name, used):
+    candidate, suffix = name, 2
+    while candidate in used:
+        candidate, suffix = f"{name} {suffix}", suffix + 1
+    used.add(candidate)
+    return candidate
+
+
+def build_manager(state):
+    """Builds the Team Manager over the current SDK agents and records each agent's handoff slot.
+
+    Teams larger than `state.max_fanout` are grouped by role under sub-managers (and,
+    for very large teams, further levels of managers), so every manager's prompt only
+    describes at most `max_fanout` handoffs. A fan-out below 2 could never shrink the
+    tree, so it is treated as 2.
+    """
+    state.manager_agent = None
+    state.handoff_slots = {}
+    sdk_indices = [i for i, agent in enumerate(state.agent_objects) if agent["sdk_created"]]
+    if not sdk_indices:
+        return None
+    agents = [state.agent_objects[i]["agent_object"] for i in sdk_indices]
+    fanout = max(state.max_fanout, 2) if state.max_fanout else None
+
+    if not fanout or len(agents) <= fanout:
+        state.manager_agent = Agent(name="Team Manager", instructions=MANAGER_INSTRUCTIONS, handoffs=agents)
+        state.handoff_slots = {index: (state.manager_agent, position) for position, index in enumerate(sdk_indices)}
+        return state.manager_agent
+
+    used_names = {agent.name for agent in agents} | {"Team Manager"}
+    roles = [state.agent_objects[i]["role"] for i in sdk_indices]
+    nodes = []
+    for labels, positions in group_by_role(roles, fanout):
+        focus = " and ".join(label.title() for label in labels)
+        lead = Agent(
+            name=_unique_name(f"{focus} Lead", used_names),
+            instructions=SUB_MANAGER_INSTRUCTIONS.format(focus=focus),
+            handoff_description=f"Leads the specialists for: {', '.join(roles[p] for p in positions)}",
+            handoffs=[agents[p] for p in positions],
+        )
+        for slot, position in enumerate(positions):
+            state.handoff_slots[sdk_indices[position]] = (lead, slot)
+        nodes.append(lead)
+
+    while len(nodes) > fanout:
+        nodes = [
+            Agent(
+                name=_unique_name(f"Division {n + 1} Manager", used_names),
+                instructions=SUB_MANAGER_INSTRUCTIONS.format(focus=", ".join(node.name for node in group)),
+                handoff_description=f"Oversees: {', '.join(node.name for node in group)}",
+                handoffs=group,
+            )
+            for n, group in enumerate(chunk(nodes, fanout))
+        ]
+
+    state.manager_agent = Agent(name="Team Manager", instructions=MANAGER_INSTRUCTIONS, handoffs=nodes)
+    return state.manager_agent
+
+
+def mark_agent_dirty(state, index):
+    """Flags a member whose details changed so its agent is rebuilt on the next sync."""
+    if state.agents_created:
+        state.dirty_agents.add(index)
+
+
+def sync_agents(state):
+    """Rebuilds only the dirty agents whose details really changed, patching manager handoffs in place.
+
+    Returns the indices that were rebuilt.
+    """
+    if not state.dirty_agents:
+        return []
+    with tracing.span("engine.sync_agents", dirty=len(state.dirty_agents)) as span:
+        rebuilt = _rebuild_dirty_agents(state)
+        span.set(rebuilt=len(rebuilt))
+    return rebuilt
+
+
+def _rebuild_dirty_agents(state):
+    rebuilt = []
+    while state.dirty_agents:
+        index = state.dirty_agents.pop()
+        if not (state.agents_created and 0 <= index < len(state.agent_objects) <= len(state.team_details)):
+            continue
+        member = state.team_details[index]
+        old = state.agent_objects[index]
+        if old.get("fingerprint") == member_fingerprint(member["name"], member["role"], member["description"]):
+            continue
+        # Restored teams build every SDK Agent together on first use
+        build_sdk = state.build_sdk_agents and not state.sdk_agents_pending
+        new = create_single_agent(member["name"], member["role"], member["description"], build_sdk)
+        state.agent_objects[index] = new
+        rebuilt.append(index)
+
+        slot = state.handoff_slots.get(index)
+        # Under role leads, a member whose role family changed belongs under another lead
+        regroup = slot is not None and slot[0] is not state.manager_agent and role_key(old["role"]) != role_key(member["role"])
+        if slot and new["sdk_created"] and not regroup:
+            manager, position = slot
+            manager.handoffs[position] = new["agent_object"]
+        elif slot or new["sdk_created"]:
+            # The agent joined or left the SDK-backed set or changed role family, so the hierarchy changes shape
+            build_manager(state)
+    return rebuilt
+
+
+def restore_team(state, team_id, team_members, agents, agent_chat_histories):
+    """Loads a stored team into the state without any API calls.
+
+    Agent records come back from their stored instructions; their SDK Agents and the
+    manager are only built by `ensure_sdk_agents` when the team is first run.
+    """
+    state.team_id = team_id
+    state.team_details = team_members
+    state.agent_chat_histories = {i: agent_chat_histories.get(i, []) for i in range(len(team_members))}
+    state.task_results = {}
+    state.dirty_agents = set()
+    state.manager_agent = None
+    state.handoff_slots = {}
+    state.agent_objects = [
+        {**agent, "agent_object": None, "sdk_created": False} for agent in agents
+    ]
+    state.agents_created = bool(agents)
+    state.sdk_agents_pending = state.agents_created and state.build_sdk_agents and AGENTS_SDK_AVAILABLE
+
+
+@tracing.traced("engine.ensure_sdk_agents")
+def ensure_sdk_agents(state):
+    """Builds SDK Agents and the manager for a restored team from its stored instructions, once."""
+    if not state.sdk_agents_pending:
+        return False
+    state.sdk_agents_pending = False
+    for agent in state.agent_objects:
+        agent["agent_object"] = sdk_agent(agent["name"], agent["role"], agent["instructions"])
+        agent["sdk_created"] = agent["agent_object"] is not None
+    build_manager(state)
+    return True
+
+
+# --- Tool Dispatch ---
+def _create_team_tool(state, team_members):
+    content = create_team(state, team_members)
+    state.chat_history.append({"role": "assistant", "content": {"type": "team_creation"}})
+    # Automatically create agents after team creation
+    return f"{content} {create_agents(state)}"
+
+
+registry = ToolRegistry()
+registry.register(
+    TOOLS[0],
+    _create_team_tool,
+    resources=lambda args: {"team"},
+    dedupe_key=lambda args: "team",
+    # create_team already builds the agents
+    supersedes=("create_agents",),
+)
+registry.register(
+    TOOLS[1],
+    update_agent_details,
+    resources=lambda args: {f"team:{args['index']}"},
+    dedupe_key=lambda args: args["index"],
+)
+registry.register(
+    TOOLS[2],
+    lambda state: create_agents(state),
+    resources=lambda args: {"team"},
+    dedupe_key=lambda args: "agents",
+)
+EDIT_TOOLS = registry.schemas(EDIT_TOOL_NAMES)
+
+
+def run_tool_calls(state, tool_calls, agent_index=None):
+    """Executes the model's tool calls against the state and returns a ToolResult per call.
+
+    `create_team` also builds the agents and adds a team marker to the chat history.
+    When `agent_index` is given (edit chats), only `update_agent_details` is allowed
+    and it is pinned to that agent.
+    """
+    if agent_index is None:
+        results = registry.dispatch(state, tool_calls)
+    else:
+        results = registry.dispatch(
+            state,
+            tool_calls,
+            overrides={"update_agent_details": {"index": agent_index}},
+            allowed=EDIT_TOOL_NAMES,
+        )
+    sync_agents(state)
+    return results
+
+
+def _decide(router, request_class, model):
+    """Lets `router` pick the model when there is one; otherwise uses `model` as given."""
+    if router is None:
+        return routing.RouteDecision(request_class, model)
+    return router.choose(request_class)
+
+
+def _complete(client, router, decision, **request):
+    """Calls the decision's model and records that one call's latency, failure and usage with the router.
+
+    Cache hits are not recorded, and time spent in streaming callbacks is left out, so
+    the router's fallback thresholds see only the model's own latency.
+    """
+    start = time.perf_counter()
+    try:
+        message = complete_chat(client, model=decision.model, **request)
+    except Exception:
+        if router is not None:
+            router.record(decision, time.perf_counter() - start, failed=True)
+        raise
+    if router is not None and not message.cached:
+        router.record(decision, message.elapsed_s - message.callback_s, usage=message.usage)
+    return message
+
+
+def _calls_tool(message, name):
+    return any(call.function.name == name for call in message.tool_calls or [])
+
+
+def _respond_with_tools(state, client, api_messages, tools, decision, router=None, agent_index=None, escalate_to=None,
+                        **completion_options):
+    """Calls the decision's model, runs any tool calls and sends all results back in a single follow-up turn.
+
+    If the reply calls create_team and `escalate_to` names a different model, the reply
+    is discarded and redone on that model before any tool runs.
+    Returns (first message, tool results, final reply text).
+    """
+    first_options = dict(completion_options)
+    if escalate_to is not None and escalate_to.model != decision.model:
+        # Members streamed from a reply that may be redone would be shown twice
+        first_options.pop("on_member", None)
+    else:
+        escalate_to = None
+    response_message = _complete(
+        client, router, decision, messages=api_messages, tools=tools, tool_choice="auto", **first_options
+    )
+    if escalate_to is not None and _calls_tool(response_message, "create_team"):
+        decision = escalate_to
+        response_message = _complete(
+            client, router, decision, messages=api_messages, tools=tools, tool_choice="auto", **completion_options
+        )
+    if not response_message.tool_calls:
+        return response_message, [], response_message.content
+
+    tool_results = run_tool_calls(state, response_message.tool_calls, agent_index)
+    # Team members were already shown while the first response streamed
+    completion_options.pop("on_member", None)
+    follow_up = _complete(
+        client,
+        router,
+        decision,
+        messages=api_messages + tool_messages(response_message, tool_results),
+        tools=tools,
+        tool_choice="none",
+        **completion_options,
+    )
+    reply = follow_up.content or " ".join(result.content for result in tool_results)
+    return response_message, tool_results, reply
+
+
+# --- Conversation Turns ---
+@tracing.traced("turn.chat")
+def chat_turn(state, client, prompt, history_manager=None, model="gpt-4o", router=None, **completion_options):
+    """Runs one main-chat turn: records the prompt, calls the model and applies its tool calls.
+
+    With a `router`, the model is chosen from the kind of turn instead of `model`.
+    Returns the first assistant ChatMessage and the list of ToolResults. Extra keyword
+    arguments (stream, on_text, on_member, cache) are passed to `complete_chat`.
+    """
+    history = [msg for msg in state.chat_history if isinstance(msg["content"], str)]
+    request_class = routing.classify_chat_turn(
+        prompt, bool(state.team_details), sum(msg["role"] == "user" for msg in history)
+    )
+    state.chat_history.append({"role": "user", "content": prompt})
+    history.append(state.chat_history[-1])
+    if history_manager is not None:
+        api_messages = history_manager.build(MAIN_SYSTEM_PROMPT, history)
+    else:
+        api_messages = [{"role": "system", "content": MAIN_SYSTEM_PROMPT}] + [
+            {"role": msg["role"], "content": msg["content"]} for msg in history
+        ]
+
+    decision = _decide(router, request_class, model)
+    # A faster route's reply that builds the team anyway is redone on the team-creation route
+    escalate_to = _decide(router, routing.TEAM_CREATION, model) if request_class != routing.TEAM_CREATION else None
+    response_message, tool_results, reply = _respond_with_tools(
+        state, client, api_messages, TOOLS, decision, router, escalate_to=escalate_to, **completion_options
+    )
+    if reply:
+        state.chat_history.append({"role": "assistant", "content": reply})
+    return response_message, tool_results
+
+
+def agent_details_block(member):
+    """Formats an agent's current details as context for the edit chat."""
+    return f"Current Agent Details:\nName: {member['name']}\nRole: {member['role']}\nDescription:\n{member['description']}"
+
+
+@lru_cache(maxsize=1024)
+def edit_system_prompt(name, role, description):
+    """Returns the edit chat's system prompt for a member."""
+    return f"{EDIT_SYSTEM_PROMPT}\n\n{agent_details_block({'name': name, 'role': role, 'description': description})}"
+
+
+@tracing.traced("turn.edit")
+def edit_turn(state, client, agent_index, prompt, history_manager=None, model="gpt-4o", router=None, **completion_options):
+    """Runs one edit-chat turn for a single agent and applies any update it makes.
+
+    Returns the first assistant ChatMessage and the list of ToolResults.
+    """
+    agent_history = state.agent_chat_histories.setdefault(agent_index, [])
+    agent_history.append({"role": "user", "content": prompt})
+    member = state.team_details[agent_index]
+    system_prompt = edit_system_prompt(member["name"], member["role"], member["description"])
+    if history_manager is not None:
+        edit_api_messages = history_manager.build(system_prompt, agent_history)
+    else:
+        edit_api_messages = [{"role": "system", "content": system_prompt}] + agent_history
+
+    decision = _decide(router, routing.classify_edit_turn(prompt), model)
+    response_message, tool_results, reply = _respond_with_tools(
+        state, client, edit_api_messages, EDIT_TOOLS, decision, router, agent_index=agent_index, **completion_options
+    )
+    agent_history.append({"role": "assistant", "content": reply or ""})
+    return response_message, tool_results
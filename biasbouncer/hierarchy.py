@@ -0,0 +1,50 @@
+"""Groups team members by role into sub-teams so no manager routes between too many handoffs."""
+import re
+from collections import OrderedDict
+
+# Words that say little about what a role actually does
+ROLE_STOPWORDS = {
+    "a", "an", "and", "of", "the", "for", "to", "in", "on", "with", "ai", "agent",
+    "senior", "junior", "lead", "chief", "head", "principal", "associate", "specialist", "expert",
+}
+
+
+def role_key(role):
+    """Returns the word that best identifies a role's family, e.g. "Data Analyst" -> "analyst"."""
+    words = [word for word in re.findall(r"[a-z]+", role.lower()) if word not in ROLE_STOPWORDS]
+    return words[-1] if words else "general"
+
+
+def group_by_role(roles, max_fanout):
+    """Packs member positions into sub-teams of at most `max_fanout`, keeping role families together.
+
+    `roles` is a list of role strings; returns a list of (labels, positions) tuples.
+    Families larger than `max_fanout` are split, and small families share a sub-team.
+    """
+    families = OrderedDict()
+    for position, role in enumerate(roles):
+        families.setdefault(role_key(role), []).append(position)
+
+    chunks = []
+    for label, positions in families.items():
+        for start in range(0, len(positions), max_fanout):
+            chunks.append((label, positions[start:start + max_fanout]))
+
+    # First-fit decreasing keeps the number of sub-teams, and so the top-level fan-out, small
+    sub_teams = []
+    for label, positions in sorted(chunks, key=lambda chunk: -len(chunk[1])):
+        for labels, members in sub_teams:
+            if len(members) + len(positions) <= max_fanout:
+                labels.append(label)
+                members.extend(positions)
+                break
+        else:
+            sub_teams.append(([label], list(positions)))
+    for _, members in sub_teams:
+        members.sort()
+    return [(labels, members) for labels, members in sorted(sub_teams, key=lambda team: team[1][0])]
+
+
+def chunk(items, max_fanout):
+    """Splits items into consecutive groups of at most `max_fanout`."""
+    return [items[start:start + max_fanout] for start in range(0, len(items), max_fanout)]
@@ -0,0 +1,153 @@
+"""Token-budgeted prompt building with incremental token counts and a rolling summary."""
+import logging
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing tokens the chat format adds around each message's content
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+SUMMARIZER_PROMPT = (
+    "Condense the conversation below into a short bulleted summary. Keep the user's goals, "
+    "constraints, decisions and any team member names, roles and requested changes. "
+    "Merge it with the existing summary if one is given."
+)
+
+_encodings = {}
+
+
+def count_tokens(text, model="gpt-4o"):
+    """Counts tokens with tiktoken when installed, otherwise estimates ~4 characters per token."""
+    if not text:
+        return 0
+    if not TIKTOKEN_AVAILABLE:
+        return len(text) // 4 + 1
+    if model not in _encodings:
+        try:
+            _encodings[model] = tiktoken.encoding_for_model(model)
+        except KeyError:
+            _encodings[model] = tiktoken.get_encoding("o200k_base")
+    return len(_encodings[model].encode(text))
+
+
+def extractive_summary(previous, messages, max_chars=2000):
+    """Folds messages into the summary by keeping the opening of each, without an API call."""
+    lines = [previous] if previous else []
+    for message in messages:
+        text = " ".join(message["content"].split())
+        lines.append(f"- {message['role']}: {text[:200]}{'...' if len(text) > 200 else ''}")
+    summary = "\n".join(lines)
+    # Keep the most recent part when the summary outgrows its budget
+    return summary[-max_chars:]
+
+
+def model_summarizer(client, model="gpt-4o-mini"):
+    """Returns a summarizer that asks `model` to fold turns, falling back to the extractive one."""
+    def summarize(previous, messages):
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        if previous:
+            transcript = f"Existing summary:\n{previous}\n\nNew turns:\n{transcript}"
+        try:
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": SUMMARIZER_PROMPT},
+                    {"role": "user", "content": transcript},
+                ],
+            )
+            return response.choices[0].message.content or extractive_summary(previous, messages)
+        except Exception as e:
+            logger.warning("History summarization failed, using extractive summary: %s", e)
+            return extractive_summary(previous, messages)
+    return summarize
+
+
+class HistoryManager:
+    """Builds prompts from an append-only chat history within a token budget.
+
+    Token counts are kept per message and only computed for newly appended turns.
+    When the history no longer fits, the oldest turns are folded into a rolling
+    summary, which is cached until more turns have to be folded.
+    """
+
+    def __init__(self, budget_tokens=8000, keep_recent=6, summarize=None, model="gpt-4o", refill_ratio=0.5):
+        self.budget_tokens = budget_tokens
+        self.keep_recent = keep_recent
+        self.summarize = summarize or extractive_summary
+        self.model = model
+        # After folding, the verbatim tail is trimmed to this share of its budget so
+        # the summary is not rewritten on every turn
+        self.refill_ratio = refill_ratio
+        self.last_prompt_tokens = 0
+        self._system = (None, 0)
+        self.reset()
+
+    def reset(self):
+        self._counts = []
+        self._total_tokens = 0
+        self._tail = None
+        self._folded = 0
+        self._folded_tokens = 0
+        self._summary = ""
+        self._summary_tokens = 0
+
+    @property
+    def summarized_turns(self):
+        return self._folded
+
+    def _sync(self, history):
+        synced = len(self._counts)
+        if synced > len(history) or (synced and history[synced - 1] is not self._tail):
+            self.reset()
+            synced = 0
+        for message in history[synced:]:
+            tokens = count_tokens(message["content"], self.model) + MESSAGE_OVERHEAD_TOKENS
+            self._counts.append(tokens)
+            self._total_tokens += tokens
+        if history:
+            self._tail = history[-1]
+
+    def _system_tokens(self, system_prompt):
+        if self._system[0] != system_prompt:
+            self._system = (system_prompt, count_tokens(system_prompt, self.model) + MESSAGE_OVERHEAD_TOKENS)
+        return self._system[1]
+
+    def _fold_until(self, history, cut):
+        self._summary = self.summarize(self._summary, history[self._folded:cut])
+        self._summary_tokens = count_tokens(SUMMARY_PREFIX + self._summary, self.model) + MESSAGE_OVERHEAD_TOKENS
+        self._folded_tokens += sum(self._counts[self._folded:cut])
+        self._folded = cut
+
+    def build(self, system_prompt, history):
+        """Returns API messages for `history` under the budget, summarizing older turns if needed."""
+        self._sync(history)
+        system_tokens = self._system_tokens(system_prompt)
+        tail_tokens = self._total_tokens - self._folded_tokens
+        protected = max(self._folded, len(history) - self.keep_recent)
+
+        if system_tokens + self._summary_tokens + tail_tokens > self.budget_tokens and protected > self._folded:
+            target = (self.budget_tokens - system_tokens - self._summary_tokens) * self.refill_ratio
+            cut = len(history)
+            kept = 0
+            while cut > self._folded and kept + self._counts[cut - 1] <= target:
+                cut -= 1
+                kept += self._counts[cut]
+            self._fold_until(history, min(max(cut, self._folded + 1), protected))
+            tail_tokens = self._total_tokens - self._folded_tokens
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if self._summary:
+            messages.append({"role": "system", "content": SUMMARY_PREFIX + self._summary})
+        messages.extend({"role": m["role"], "content": m["content"]} for m in history[self._folded:])
+
+        self.last_prompt_tokens = system_tokens + self._summary_tokens + tail_tokens
+        logger.info(
+            "Prompt size: %d tokens (%d turns verbatim, %d summarized)",
+            self.last_prompt_tokens, len(history) - self._folded, self._folded,
+        )
+        return messages
@@ -0,0 +1,220 @@
+"""Web research for agents: cached, coalesced and concurrent searches over a pluggable backend."""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlunsplit
+
+from biasbouncer import tracing
+
+try:
+    from duckduckgo_search import DDGS
+    DDGS_AVAILABLE = True
+except ImportError:
+    DDGS_AVAILABLE = False
+
+try:
+    from agents import function_tool
+    AGENTS_SDK_AVAILABLE = True
+except ImportError:
+    AGENTS_SDK_AVAILABLE = False
+
+MAX_QUERIES_PER_CALL = 5
+
+
+@dataclass
+class SearchResult:
+    title: str
+    url: str
+    snippet: str = ""
+
+
+class DuckDuckGoBackend:
+    """Searches with duckduckgo-search; any callable `(query, max_results) -> [SearchResult]` can replace it."""
+
+    def __init__(self, region="wt-wt", safesearch="moderate", timeout=10):
+        if not DDGS_AVAILABLE:
+            raise RuntimeError("duckduckgo-search is not installed. Run: pip install duckduckgo-search")
+        self.region = region
+        self.safesearch = safesearch
+        self.timeout = timeout
+
+    def __call__(self, query, max_results):
+        hits = DDGS(timeout=self.timeout).text(query, region=self.region, safesearch=self.safesearch, max_results=max_results)
+        return [SearchResult(hit.get("title", ""), hit.get("href", ""), hit.get("body", "")) for hit in hits or []]
+
+
+def normalize_query(query):
+    """Lower-cases a query and collapses whitespace and surrounding punctuation, so near-identical queries share results."""
+    return re.sub(r"\s+", " ", query.lower()).strip(" \t\n?.!,;:\"'")
+
+
+def normalize_url(url):
+    """Drops the fragment, trailing slash and "www." so the same page is only listed once."""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    return urlunsplit((parts.scheme.lower(), host, parts.path.rstrip("/"), parts.query, ""))
+
+
+class ResearchService:
+    """Runs searches on a thread pool, sharing in-flight and recently completed results between callers.
+
+    Identical (normalized) queries already running are joined instead of re-sent, and
+    finished results are kept for `ttl_seconds` in a size-bounded LRU. Failed searches
+    are not cached.
+    """
+
+    def __init__(self, backend=None, ttl_seconds=3600, max_entries=512, max_workers=4, max_results=5):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_results = max_results
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research")
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # normalized query -> (stored_at, results)
+        self._in_flight = {}  # normalized query -> Future
+        self.searches = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.backend_calls = 0
+        self.errors = 0
+
+    @property
+    def available(self):
+        return self.backend is not None or DDGS_AVAILABLE
+
+    def _backend(self):
+        if self.backend is None:
+            self.backend = DuckDuckGoBackend()
+        return self.backend
+
+    def submit(self, query):
+        """Returns a Future of the results for `query`, served from cache or an identical in-flight search when possible."""
+        key = normalize_query(query)
+        with self._lock:
+            self.searches += 1
+            cached = self._cache.get(key)
+            if cached is not None and time.monotonic() - cached[0] < self.ttl_seconds:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                future = Future()
+                future.set_result(cached[1])
+                return future
+            if key in self._in_flight:
+                self.coalesced += 1
+                return self._in_flight[key]
+            future = self._executor.submit(self._search, key)
+            self._in_flight[key] = future
+        return future
+
+    def _search(self, key):
+        with tracing.span("research.search", query=key) as span:
+            try:
+                with self._lock:
+                    self.backend_calls += 1
+                results = list(self._backend()(key, self.max_results))
+                span.set(results=len(results))
+            except Exception:
+                with self._lock:
+                    self.errors += 1
+                    del self._in_flight[key]
+                raise
+        with self._lock:
+            self._cache[key] = (time.monotonic(), results)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            del self._in_flight[key]
+        return results
+
+    def research(self, queries):
+        """Searches every query concurrently and returns (results, failures).
+
+        Results are deduplicated by URL, in query order. A failed query does not discard
+        the others' results; it is listed in `failures` as (query, error message).
+        """
+        futures = [self.submit(query) for query in queries]
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result())
+            except Exception as e:
+                outcomes.append(e)
+        return split_failures(queries, outcomes)
+
+    async def research_async(self, queries):
+        """Like `research`, without blocking the event loop the agents run on."""
+        futures = [asyncio.wrap_future(self.submit(query)) for query in queries]
+        return split_failures(queries, await asyncio.gather(*futures, return_exceptions=True))
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "searches": self.searches,
+                "cache_hits": self.cache_hits,
+                "coalesced": self.coalesced,
+                "backend_calls": self.backend_calls,
+                "errors": self.errors,
+                "cached_queries": len(self._cache),
+            }
+
+
+def split_failures(queries, outcomes):
+    """Returns the deduplicated results of the queries that succeeded and (query, error) for the rest."""
+    failures = [(query, str(outcome) or type(outcome).__name__) for query, outcome in zip(queries, outcomes)
+                if isinstance(outcome, BaseException)]
+    return dedupe([outcome for outcome in outcomes if not isinstance(outcome, BaseException)]), failures
+
+
+def dedupe(result_lists):
+    """Flattens per-query results, keeping the first result for each URL."""
+    seen, merged = set(), []
+    for results in result_lists:
+        for result in results:
+            key = normalize_url(result.url)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(result)
+    return merged
+
+
+def format_results(results, failures=()):
+    """Formats search results as a compact markdown list for the model, noting any queries that failed."""
+    lines = [f"- [{result.title}]({result.url}): {result.snippet}" for result in results] or ["No results found."]
+    lines += [f"Search failed for {query!r}: {error}" for query, error in failures]
+    return "\n".join(lines)
+
+
+# Shared by every agent in the process; assign `service.backend` to use another search backend
+service = ResearchService()
+
+
+def research_tool(research_service):
+    """Builds the `web_research` function tool agents call, backed by `research_service`."""
+
+    @function_tool(name_override="web_research")
+    async def web_research(queries: list[str]) -> str:
+        """Searches the web for current information.
+
+        Args:
+            queries: One to five short, focused search queries. They are searched concurrently.
+        """
+        results, failures = await research_service.research_async(queries[:MAX_QUERIES_PER_CALL])
+        return format_results(results, failures)
+
+    return web_research
+
+
+web_research_tool = research_tool(service) if AGENTS_SDK_AVAILABLE else None
+
+
+def agent_tools():
+    """Returns the tools to give each specialist agent; empty when no search backend is available."""
+    return [web_research_tool] if web_research_tool is not None and service.available else []
@@ -0,0 +1,201 @@
+"""Content-addressed cache for chat completions, with an in-memory LRU and a SQLite tier."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from biasbouncer.completions import ChatMessage, FunctionCall, ToolCall
+
+
+def request_key(model, messages, tools=None, tool_choice=None):
+    """Returns a stable hash of everything that determines a completion's content."""
+    payload = json.dumps(
+        {"model": model, "messages": messages, "tools": tools, "tool_choice": tool_choice},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def dump_message(message):
+    """Serializes the cacheable parts of a ChatMessage to JSON."""
+    return json.dumps({
+        "content": message.content,
+        "tool_calls": [
+            {"id": call.id, "type": call.type, "name": call.function.name, "arguments": call.function.arguments}
+            for call in message.tool_calls or []
+        ],
+        "usage": message.usage,
+    })
+
+
+def load_message(data):
+    """Rebuilds a ChatMessage from `dump_message` output."""
+    payload = json.loads(data)
+    tool_calls = [
+        ToolCall(id=call["id"], type=call["type"], function=FunctionCall(call["name"], call["arguments"]))
+        for call in payload["tool_calls"]
+    ]
+    return ChatMessage(content=payload["content"], tool_calls=tool_calls or None, usage=payload["usage"], cached=True)
+
+
+class MemoryLRU:
+    """A thread-safe, size-bounded LRU of serialized messages."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            return self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """A SQLite-backed tier with a TTL and least-recently-used eviction above `max_bytes`."""
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Returns (data, created) for a live entry, or None."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return row
+
+    def set(self, key, data):
+        now = time.time()
+        size = len(data.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """Looks up completions in memory first, then on disk, and counts hits and misses.
+
+    Entries in both tiers expire `ttl_seconds` after the response was first stored.
+    """
+
+    def __init__(self, max_entries=256, disk_path=None, ttl_seconds=7 * 24 * 3600, max_bytes=64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        # key -> (serialized message, creation time)
+        self.memory = MemoryLRU(max_entries)
+        self.disk = DiskCache(disk_path, ttl_seconds, max_bytes) if disk_path else None
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def key_for(self, request):
+        """Returns the cache key for a chat.completions.create request."""
+        return request_key(request.get("model"), request.get("messages"), request.get("tools"), request.get("tool_choice"))
+
+    def get(self, key):
+        """Returns the cached ChatMessage for `key`, or None."""
+        entry = self.memory.get(key)
+        if entry is not None:
+            data, created = entry
+            if time.time() - created <= self.ttl_seconds:
+                self._count("memory_hits")
+                return load_message(data)
+            self.memory.pop(key)
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                # Keeps the original creation time, so a copy from disk expires with it
+                self.memory.set(key, entry)
+                self._count("disk_hits")
+                return load_message(entry[0])
+        self._count("misses")
+        return None
+
+    def set(self, key, message):
+        data = dump_message(message)
+        self.memory.set(key, (data, time.time()))
+        if self.disk is not None:
+            self.disk.set(key, data)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        """Returns hit/miss counters and the current in-memory size."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_entries": len(self.memory),
+        }
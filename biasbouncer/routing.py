@@ -0,0 +1,201 @@
+"""Picks a model per request class and falls back to a faster one when the primary is slow or failing."""
+import re
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+from biasbouncer.tracing import percentile
+
+CLARIFY = "clarify"
+TEAM_CREATION = "team_creation"
+# A new name or role for one agent
+AGENT_EDIT = "agent_edit"
+# Any other agent edit, such as rewriting the description
+AGENT_REWRITE = "agent_rewrite"
+QA = "qa"
+REQUEST_CLASSES = (CLARIFY, TEAM_CREATION, AGENT_EDIT, AGENT_REWRITE, QA)
+
+# USD per million (prompt, completion) tokens, for cost estimates only
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+# The main prompt asks at most two clarifying questions before building the team
+CLARIFYING_TURNS = 2
+TEAM_REQUEST_RE = re.compile(
+    r"\b(team|create|build|assemble|generate|make|set up|go ahead|proceed|ready|add|remove|replace|change|rename)\b",
+    re.IGNORECASE,
+)
+
+
+SINGLE_FIELD_EDIT_RE = re.compile(r"\b(re-?name|name|call (him|her|them|it)|role|title|job)\b", re.IGNORECASE)
+REWRITE_EDIT_RE = re.compile(
+    r"\b(description|describe|rewrite|redo|rework|expand|elaborate|details?|responsibilit\w*|bullets?|skills?|"
+    r"focus|everything|entire|whole|completely|also)\b",
+    re.IGNORECASE,
+)
+MAX_SINGLE_FIELD_EDIT_CHARS = 160
+
+
+def classify_chat_turn(prompt, has_team, previous_user_turns):
+    """Returns the request class of a main-chat turn from the prompt and where the conversation is.
+
+    Turns that ask for a team go to TEAM_CREATION. The model may still decide to build
+    the team on a CLARIFY or QA turn; the engine then redoes that reply on the
+    TEAM_CREATION route, so a wrong guess costs a call rather than a worse team.
+    """
+    if TEAM_REQUEST_RE.search(prompt):
+        return TEAM_CREATION
+    if has_team:
+        return QA
+    return TEAM_CREATION if previous_user_turns >= CLARIFYING_TURNS else CLARIFY
+
+
+def classify_edit_turn(prompt):
+    """Returns AGENT_EDIT for a short request to change one agent's name or role, else AGENT_REWRITE.
+
+    Anything that might touch the description is treated as a rewrite.
+    """
+    if (
+        len(prompt) <= MAX_SINGLE_FIELD_EDIT_CHARS
+        and SINGLE_FIELD_EDIT_RE.search(prompt)
+        and not REWRITE_EDIT_RE.search(prompt)
+    ):
+        return AGENT_EDIT
+    return AGENT_REWRITE
+
+
+@dataclass
+class Route:
+    model: str
+    # Faster model used while `model` is over either threshold; None never falls back
+    fallback: str | None = None
+    p95_threshold_s: float = 20.0
+    max_error_rate: float = 0.25
+
+
+DEFAULT_ROUTES = {
+    CLARIFY: Route("gpt-4o-mini"),
+    TEAM_CREATION: Route("gpt-4o", fallback="gpt-4o-mini", p95_threshold_s=30.0),
+    AGENT_EDIT: Route("gpt-4o-mini"),
+    AGENT_REWRITE: Route("gpt-4o", fallback="gpt-4o-mini", p95_threshold_s=20.0),
+    QA: Route("gpt-4o", fallback="gpt-4o-mini", p95_threshold_s=15.0),
+}
+
+
+@dataclass
+class RouteDecision:
+    request_class: str
+    model: str
+    fell_back: bool = False
+
+
+@dataclass
+class _RouteStats:
+    window: deque
+    calls: int = 0
+    errors: int = 0
+    fallbacks: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+
+
+class ModelRouter:
+    """Routes each request class to its model and keeps per-route latency, error and cost stats.
+
+    When a route's primary model has a p95 latency or error rate above the route's
+    thresholds over the last `window` calls (and at least `min_samples`), calls use
+    the fallback model for `cooldown_s`; the primary is then tried again on a fresh window.
+    """
+
+    def __init__(self, routes=None, window=50, min_samples=5, cooldown_s=120.0):
+        self.routes = {**DEFAULT_ROUTES, **(routes or {})}
+        self.window = window
+        self.min_samples = min_samples
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._stats = {}  # (request class, model) -> _RouteStats
+        self._degraded_until = {}  # request class -> monotonic time
+
+    @classmethod
+    def from_config(cls, config, **kwargs):
+        """Builds a router from `{request_class: model}` or `{request_class: {"model": ..., "fallback": ...}}`."""
+        routes = {}
+        for request_class, rule in (config or {}).items():
+            if request_class not in REQUEST_CLASSES:
+                raise ValueError(f"Unknown request class {request_class!r}; expected one of {', '.join(REQUEST_CLASSES)}.")
+            routes[request_class] = Route(rule) if isinstance(rule, str) else Route(**rule)
+        return cls(routes, **kwargs)
+
+    def _route_stats(self, request_class, model):
+        key = (request_class, model)
+        if key not in self._stats:
+            self._stats[key] = _RouteStats(deque(maxlen=self.window))
+        return self._stats[key]
+
+    def choose(self, request_class):
+        """Returns the RouteDecision for a request class."""
+        route = self.routes[request_class]
+        if not route.fallback:
+            return RouteDecision(request_class, route.model)
+        now = time.monotonic()
+        with self._lock:
+            if now < self._degraded_until.get(request_class, 0.0):
+                return RouteDecision(request_class, route.fallback, fell_back=True)
+            window = self._route_stats(request_class, route.model).window
+            if len(window) >= self.min_samples:
+                latencies = [latency for latency, _ in window]
+                error_rate = sum(failed for _, failed in window) / len(window)
+                if percentile(latencies, 0.95) > route.p95_threshold_s or error_rate > route.max_error_rate:
+                    self._degraded_until[request_class] = now + self.cooldown_s
+                    # The primary gets a clean slate when the cooldown ends
+                    window.clear()
+                    return RouteDecision(request_class, route.fallback, fell_back=True)
+        return RouteDecision(request_class, route.model)
+
+    def record(self, decision, latency_s, failed=False, usage=None):
+        """Records one model call made for `decision`: its latency, whether it failed and its token usage."""
+        prompt_tokens = (usage or {}).get("prompt_tokens", 0)
+        completion_tokens = (usage or {}).get("completion_tokens", 0)
+        with self._lock:
+            stats = self._route_stats(decision.request_class, decision.model)
+            stats.window.append((latency_s, failed))
+            stats.calls += 1
+            stats.errors += failed
+            stats.fallbacks += decision.fell_back
+            stats.prompt_tokens += prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost_usd += estimate_cost(decision.model, prompt_tokens, completion_tokens)
+
+    def stats(self):
+        """Returns one row per (request class, model) with latency percentiles, errors, tokens and cost."""
+        now = time.monotonic()
+        with self._lock:
+            rows = []
+            for (request_class, model), stats in sorted(self._stats.items()):
+                latencies = [latency for latency, _ in stats.window]
+                rows.append({
+                    "route": request_class,
+                    "model": model,
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "fallbacks": stats.fallbacks,
+                    "p50_s": percentile(latencies, 0.50),
+                    "p95_s": percentile(latencies, 0.95),
+                    "prompt_tokens": stats.prompt_tokens,
+                    "completion_tokens": stats.completion_tokens,
+                    "cost_usd": stats.cost_usd,
+                    "degraded": now < self._degraded_until.get(request_class, 0.0),
+                })
+            return rows
@@ -0,0 +1,180 @@
+"""Process-wide request scheduling: RPM/TPM budgets, fair queueing across sessions and retries."""
+import json
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+
+import openai
+
+from biasbouncer.tracing import percentile
+
+WINDOW_SECONDS = 60.0
+DEFAULT_COMPLETION_TOKENS = 1000
+
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+def estimate_tokens(request):
+    """Roughly estimates the tokens a chat request will consume (~4 characters per token)."""
+    prompt_chars = sum(len(str(message.get("content") or "")) for message in request.get("messages", []))
+    if request.get("tools"):
+        prompt_chars += len(json.dumps(request["tools"]))
+    completion = request.get("max_completion_tokens") or request.get("max_tokens") or DEFAULT_COMPLETION_TOKENS
+    return prompt_chars // 4 + completion
+
+
+def estimate_body_tokens(body):
+    """Roughly estimates the tokens of a raw JSON request body, such as the Responses API calls agents make."""
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        request = {}
+    request = request if isinstance(request, dict) else {}
+    completion = (
+        request.get("max_output_tokens") or request.get("max_completion_tokens") or request.get("max_tokens")
+        or DEFAULT_COMPLETION_TOKENS
+    )
+    return len(body or b"") // 4 + completion
+
+
+class RequestScheduler:
+    """Admits requests within requests- and tokens-per-minute budgets, round-robin across sessions.
+
+    Each session has its own FIFO queue; whenever budget frees up, the session that
+    has waited longest since its last grant goes next, so one busy session cannot
+    starve the others. `call` retries 429s, 5xx and connection errors with full-jitter
+    exponential backoff, re-queueing before each attempt.
+    """
+
+    def __init__(self, requests_per_minute=500, tokens_per_minute=30000, max_retries=5, base_delay=1.0, max_delay=30.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._request_log = deque()
+        self._token_log = deque()
+        self._window_tokens = 0
+        self._waits = deque(maxlen=1000)
+        self.granted = 0
+        self.retries = 0
+        self.throttled = 0
+
+    # --- Budget bookkeeping (call with the lock held) ---
+    def _prune(self, now):
+        while self._request_log and now - self._request_log[0] >= WINDOW_SECONDS:
+            self._request_log.popleft()
+        while self._token_log and now - self._token_log[0][0] >= WINDOW_SECONDS:
+            self._window_tokens -= self._token_log.popleft()[1]
+
+    def _has_budget(self, tokens):
+        if len(self._request_log) >= self.requests_per_minute:
+            return False
+        # A request larger than the whole budget may still run once the window is empty
+        return self._window_tokens + tokens <= self.tokens_per_minute or not self._token_log
+
+    def _seconds_until_budget(self, now):
+        starts = []
+        if self._request_log:
+            starts.append(self._request_log[0])
+        if self._token_log:
+            starts.append(self._token_log[0][0])
+        if not starts:
+            return 0.05
+        return max(0.01, WINDOW_SECONDS - (now - min(starts)))
+
+    def _is_next(self, session_id, ticket):
+        first_session, queue = next(iter(self._queues.items()))
+        return first_session == session_id and queue[0] is ticket
+
+    # --- Public API ---
+    def acquire(self, session_id, tokens):
+        """Blocks until it is this session's turn and the budgets allow `tokens` more.
+
+        Returns the token-window entry for the request, to pass to `record_usage`.
+        """
+        ticket = object()
+        with self._cond:
+            self._queues.setdefault(session_id, deque()).append(ticket)
+            queued_at = time.monotonic()
+            while True:
+                now = time.monotonic()
+                self._prune(now)
+                if self._is_next(session_id, ticket) and self._has_budget(tokens):
+                    break
+                self._cond.wait(timeout=self._seconds_until_budget(now))
+
+            queue = self._queues[session_id]
+            queue.popleft()
+            if queue:
+                self._queues.move_to_end(session_id)
+            else:
+                del self._queues[session_id]
+            self._request_log.append(now)
+            entry = [now, tokens]
+            self._token_log.append(entry)
+            self._window_tokens += tokens
+            self._waits.append(now - queued_at)
+            self.granted += 1
+            self._cond.notify_all()
+        return entry
+
+    def record_usage(self, entry, actual_tokens):
+        """Replaces a request's estimated tokens with the usage its response reported."""
+        with self._cond:
+            if self._token_log and entry[0] >= self._token_log[0][0]:
+                self._window_tokens += actual_tokens - entry[1]
+            entry[1] = actual_tokens
+            self._cond.notify_all()
+
+    def _backoff(self, attempt, error):
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        cap = min(self.max_delay, self.base_delay * 2 ** attempt)
+        return max(retry_after or 0.0, random.uniform(0, cap))
+
+    def call(self, session_id, fn, estimated_tokens):
+        """Runs `fn()` once admitted, retrying transient API errors with jittered backoff."""
+        for attempt in range(self.max_retries + 1):
+            entry = self.acquire(session_id, estimated_tokens)
+            try:
+                result = fn()
+            except RETRYABLE_ERRORS as e:
+                with self._cond:
+                    self.retries += 1
+                    if isinstance(e, openai.RateLimitError):
+                        self.throttled += 1
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt, e))
+                continue
+            usage = getattr(result, "usage", None)
+            if usage is not None and getattr(usage, "total_tokens", None):
+                self.record_usage(entry, usage.total_tokens)
+            return result
+
+    def stats(self):
+        """Returns queue depth, wait-time percentiles and retry counters."""
+        with self._cond:
+            self._prune(time.monotonic())
+            waits = list(self._waits)
+            return {
+                "queue_depth": sum(len(queue) for queue in self._queues.values()),
+                "waiting_sessions": len(self._queues),
+                "wait_p50_s": percentile(waits, 0.50),
+                "wait_p95_s": percentile(waits, 0.95),
+                "wait_max_s": max(waits, default=0.0),
+                "requests_last_minute": len(self._request_log),
+                "tokens_last_minute": self._window_tokens,
+                "granted": self.granted,
+                "retries": self.retries,
+                "throttled": self.throttled,
+            }
@@ -0,0 +1,187 @@
+"""Per-session memory accounting and eviction of idle sessions to the session store."""
+import dataclasses
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from types import FunctionType, MethodType, ModuleType
+
+from biasbouncer.engine import TeamState
+
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+_OPAQUE = (type, ModuleType, FunctionType, MethodType)
+
+
+def deep_sizeof(obj, seen=None):
+    """Returns the bytes held by `obj` and everything it contains, counting shared objects once.
+
+    Follows containers and dataclass instances (TeamState, SDK Agents); functions,
+    classes and modules are shared by the whole process and are not counted. Pass the
+    same `seen` set across calls to measure several objects without double counting.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen or isinstance(current, _OPAQUE) or callable(current) and not dataclasses.is_dataclass(current):
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, _CONTAINERS):
+            stack.extend(current)
+        elif dataclasses.is_dataclass(current) or hasattr(current, "__dict__"):
+            stack.append(vars(current))
+    return total
+
+
+@dataclasses.dataclass
+class _LiveSession:
+    session_id: str
+    state: TeamState
+    # Other per-session objects to drop on eviction, such as the edit-chat history managers
+    extras: dict
+    last_seen: float
+    # Runs in progress; a busy session is never evicted
+    busy: int = 0
+
+
+class SessionRegistry:
+    """Tracks live sessions process-wide and evicts the idle ones to the store.
+
+    Evicting saves a session's unsaved changes, then empties its TeamState in place and
+    marks it `evicted`, so whichever Streamlit session still holds it reloads it from
+    the store on its next run. Sessions whose browser tab is gone are released the same way.
+    Each TeamState is tracked on its own, so several browser tabs on the same session
+    link are evicted independently. Sessions inside `running` are never evicted, however long the run takes. `touch` and
+    `running` check for eviction and register the state in one step, so a state is
+    never registered again after it was emptied.
+    """
+
+    def __init__(self, store, idle_seconds=1800, max_sessions=None, min_idle_seconds=60, check_interval_s=30.0):
+        self.store = store
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        # Over `max_sessions`, only sessions idle this long are evicted, so a session that just ran keeps its state
+        self.min_idle_seconds = min_idle_seconds
+        self.check_interval_s = check_interval_s
+        self.evicted = 0
+        # (session id, id(state)) -> _LiveSession, least recently seen first; entries keep their state alive
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        # Signalled when evictions finish; `_evicting` holds the ids of states being saved and emptied
+        self._evicted_cond = threading.Condition(self._lock)
+        self._evicting = set()
+        self._last_check = 0.0
+
+    def _touch(self, session_id, state, extras):
+        """Registers the state unless it was evicted; call with the lock held. Returns the entry or None."""
+        while id(state) in self._evicting:
+            self._evicted_cond.wait()
+        if state.evicted:
+            return None
+        key = (session_id, id(state))
+        live = self._sessions.pop(key, None)
+        busy = live.busy if live is not None else 0
+        self._sessions[key] = live = _LiveSession(
+            session_id, state, extras if extras is not None else {}, time.monotonic(), busy
+        )
+        return live
+
+    def touch(self, session_id, state, extras=None):
+        """Records activity for a session, registering it if new.
+
+        Returns False, without registering it, if `state` was evicted; reload the session
+        from the store and touch it with the new state instead.
+        """
+        with self._lock:
+            return self._touch(session_id, state, extras) is not None
+
+    @contextmanager
+    def running(self, session_id, state, extras=None):
+        """Marks a session busy for the duration of a run, then records the run's end as its last activity.
+
+        Raises RuntimeError if `state` was evicted before the run started.
+        """
+        with self._lock:
+            live = self._touch(session_id, state, extras)
+            if live is None:
+                raise RuntimeError("This session was released from memory; reload the page to continue.")
+            live.busy += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                live = self._sessions.get((session_id, id(state)))
+                if live is not None:
+                    live.busy -= 1
+                    live.last_seen = time.monotonic()
+                    self._sessions.move_to_end((session_id, id(state)))
+
+    def evict_idle(self, now=None, force=False):
+        """Evicts sessions idle for longer than `idle_seconds`, then the least recently seen over `max_sessions`.
+
+        Busy sessions are skipped. Checks at most every `check_interval_s` unless `force` is set. Returns the evicted session ids.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not force and now - self._last_check < self.check_interval_s:
+                return []
+            self._last_check = now
+            idle = [
+                key for key, live in self._sessions.items() if not live.busy and now - live.last_seen > self.idle_seconds
+            ]
+            if self.max_sessions is not None:
+                over = len(self._sessions) - len(idle) - self.max_sessions
+                expired = set(idle)
+                idle += [
+                    key for key, live in self._sessions.items()
+                    if key not in expired and not live.busy and now - live.last_seen >= self.min_idle_seconds
+                ][:max(over, 0)]
+            evicted = [self._sessions.pop(key) for key in idle]
+            self._evicting.update(id(live.state) for live in evicted)
+        try:
+            for live in evicted:
+                self._evict(live)
+        finally:
+            with self._lock:
+                self._evicting.difference_update(id(live.state) for live in evicted)
+                self._evicted_cond.notify_all()
+        return [live.session_id for live in evicted]
+
+    def _evict(self, live):
+        self.store.save(live.session_id, live.state)
+        self.store.forget(live.session_id, live.state)
+        fresh = TeamState(max_fanout=live.state.max_fanout, build_sdk_agents=live.state.build_sdk_agents)
+        vars(live.state).update(vars(fresh))
+        live.state.evicted = True
+        live.extras.clear()
+        with self._lock:
+            self.evicted += 1
+
+    def _live_sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def session_bytes(self, session_id):
+        """Returns the memory held by a live session's states and extras, in all its tabs, or 0 if it is not live."""
+        sessions = [live for live in self._live_sessions() if live.session_id == session_id]
+        return deep_sizeof([(live.state, live.extras) for live in sessions]) if sessions else 0
+
+    def stats(self):
+        """Returns live and evicted session counts."""
+        with self._lock:
+            return {"live_sessions": len(self._sessions), "evicted_sessions": self.evicted}
+
+    def memory(self):
+        """Returns the memory held by all live sessions, shared objects counted once, and the mean per session.
+
+        Walks every live session's objects, so call it for diagnostics rather than on each run.
+        """
+        sessions = self._live_sessions()
+        total = deep_sizeof([(live.state, live.extras) for live in sessions])
+        return {"live_bytes": total, "bytes_per_session": total / len(sessions) if sessions else 0.0}
@@ -0,0 +1,253 @@
+"""Durable SQLite store for sessions, teams and per-agent edit chats, written incrementally."""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+
+from biasbouncer.engine import TeamState, restore_team
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS sessions ("
+    "id TEXT PRIMARY KEY, team_id TEXT, created REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS messages ("
+    "session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+    "PRIMARY KEY (session_id, seq))",
+    "CREATE TABLE IF NOT EXISTS teams ("
+    "id TEXT PRIMARY KEY, session_id TEXT NOT NULL, title TEXT NOT NULL, size INTEGER NOT NULL, "
+    "fingerprint TEXT NOT NULL, members TEXT NOT NULL, agents TEXT NOT NULL, "
+    "created REAL NOT NULL, updated REAL NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS teams_updated ON teams (updated)",
+    "CREATE INDEX IF NOT EXISTS teams_session ON teams (session_id, updated)",
+    "CREATE TABLE IF NOT EXISTS agent_messages ("
+    "team_id TEXT NOT NULL, agent_index INTEGER NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, "
+    "content TEXT NOT NULL, PRIMARY KEY (team_id, agent_index, seq))",
+)
+
+
+def team_fingerprint(state):
+    """Hashes the stored parts of a team: member details and the instructions built from them."""
+    payload = json.dumps(
+        [state.team_details, [agent["instructions"] for agent in state.agent_objects]],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def team_title(members):
+    """Returns a one-line label for a team, for listing saved teams."""
+    epilogue = members[0].get("epilogue", "") if members else ""
+    if epilogue:
+        return epilogue if len(epilogue) <= 120 else epilogue[:117] + "..."
+    names = ", ".join(member["name"] for member in members[:3])
+    return names + (f" and {len(members) - 3} more" if len(members) > 3 else "")
+
+
+class SessionStore:
+    """Persists TeamStates, writing only the messages and team records added or changed since the last save.
+
+    What is on disk is tracked per TeamState, since several browser tabs on the same
+    session link each hold their own state. When a state that did not write a session
+    last has changes to save, it rewrites the session's history whole, so the last tab
+    to save wins and rows from different tabs are never interleaved.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        self._conn.commit()
+        # session id -> {id(state): what that state knows is on disk: message count, team fingerprints, agent chat lengths}
+        self._saved = {}
+        # session id -> the marker of the state that last wrote it
+        self._writers = {}
+
+    def _marker(self, session_id, state):
+        markers = self._saved.setdefault(session_id, {})
+        marker = markers.get(id(state))
+        if marker is None or marker["state"]() is not state:
+            # Drop markers of states that are gone, so a reused id never inherits one
+            for key in [key for key, old in markers.items() if old["state"]() is None]:
+                del markers[key]
+            marker = markers[id(state)] = {
+                "state": weakref.ref(state), "synced": False, "messages": 0, "teams": {}, "agent_messages": {},
+            }
+        return marker
+
+    def save(self, session_id, state):
+        """Writes new chat messages, a changed team and new edit-chat messages. Returns the rows written."""
+        now = time.time()
+        written = 0
+        with self._lock:
+            marker = self._marker(session_id, state)
+            has_team = bool(state.team_id and state.team_details)
+            fingerprint = team_fingerprint(state) if has_team else None
+            new_messages = state.chat_history[marker["messages"]:]
+            changed = (
+                new_messages
+                or not marker["synced"]
+                or marker.get("team_id") != state.team_id
+                or has_team and (
+                    marker["teams"].get(state.team_id) != fingerprint
+                    or any(
+                        len(history) > marker["agent_messages"].get((state.team_id, index), 0)
+                        for index, history in state.agent_chat_histories.items()
+                    )
+                )
+            )
+            # A state taking over a session another state wrote since rewrites its history whole
+            rewrite = changed and self._writers.get(session_id) is not marker
+
+            # Chat history is append-only; anything shorter than what was saved means it was replaced
+            if rewrite or len(state.chat_history) < marker["messages"]:
+                self._conn.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                marker["messages"] = 0
+                new_messages = state.chat_history
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [
+                    (session_id, marker["messages"] + offset, message["role"], json.dumps(message["content"]))
+                    for offset, message in enumerate(new_messages)
+                ],
+            )
+            marker["messages"] = len(state.chat_history)
+            written += len(new_messages)
+
+            if has_team:
+                written += self._save_team(state, marker, fingerprint, rewrite, now, session_id)
+
+            # A state with nothing new, such as an idle tab's, leaves the session as the last writer left it
+            if changed:
+                self._conn.execute(
+                    "INSERT INTO sessions (id, team_id, created, updated) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(id) DO UPDATE SET team_id = excluded.team_id, updated = excluded.updated "
+                    "WHERE sessions.team_id IS NOT excluded.team_id",
+                    (session_id, state.team_id, now, now),
+                )
+                marker.update(synced=True, team_id=state.team_id)
+                self._writers[session_id] = marker
+            self._conn.commit()
+        return written
+
+    def _save_team(self, state, marker, fingerprint, rewrite, now, session_id):
+        written = 0
+        if marker["teams"].get(state.team_id) != fingerprint:
+            agents = [
+                {"name": agent["name"], "role": agent["role"], "instructions": agent["instructions"], "fingerprint": agent["fingerprint"]}
+                for agent in state.agent_objects
+            ] if state.agents_created else []
+            self._conn.execute(
+                "INSERT INTO teams (id, session_id, title, size, fingerprint, members, agents, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET title = excluded.title, "
+                "size = excluded.size, fingerprint = excluded.fingerprint, members = excluded.members, "
+                "agents = excluded.agents, updated = excluded.updated WHERE teams.session_id = excluded.session_id",
+                (
+                    state.team_id, session_id, team_title(state.team_details), len(state.team_details),
+                    fingerprint, json.dumps(state.team_details), json.dumps(agents), now, now,
+                ),
+            )
+            marker["teams"][state.team_id] = fingerprint
+            written += 1
+
+        for index, history in state.agent_chat_histories.items():
+            key = (state.team_id, index)
+            saved = 0 if rewrite else marker["agent_messages"].get(key, 0)
+            if rewrite:
+                self._conn.execute(
+                    "DELETE FROM agent_messages WHERE team_id = ? AND agent_index = ?", (state.team_id, index)
+                )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO agent_messages (team_id, agent_index, seq, role, content) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (state.team_id, index, saved + offset, message["role"], message["content"])
+                    for offset, message in enumerate(history[saved:])
+                ],
+            )
+            marker["agent_messages"][key] = len(history)
+            written += len(history) - saved
+        return written
+
+    def list_teams(self, session_id, limit=50):
+        """Returns summaries of a session's most recently updated teams, without their members.
+
+        Identical teams, such as a loaded copy and its original, are listed once, as the latest.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, session_id, title, size, MAX(updated) FROM teams WHERE session_id = ? "
+                "GROUP BY fingerprint ORDER BY MAX(updated) DESC LIMIT ?",
+                (session_id, limit),
+            ).fetchall()
+        return [
+            {"id": row[0], "session_id": row[1], "title": row[2], "size": row[3], "updated": row[4]}
+            for row in rows
+        ]
+
+    def load_team(self, state, team_id, session_id):
+        """Copies one of the session's stored teams into `state` under a new team id.
+
+        Edits are then saved to the copy, never back over the stored team. SDK agents
+        are rebuilt later, on first use. Returns False if the session has no such team.
+        """
+        return self._load_team(state, team_id, session_id, copy=True)
+
+    def _load_team(self, state, team_id, session_id, copy):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT members, agents, fingerprint FROM teams WHERE id = ? AND session_id = ?", (team_id, session_id)
+            ).fetchone()
+            if row is None:
+                return False
+            histories = {}
+            for index, role, content in self._conn.execute(
+                "SELECT agent_index, role, content FROM agent_messages WHERE team_id = ? ORDER BY agent_index, seq",
+                (team_id,),
+            ):
+                histories.setdefault(index, []).append({"role": role, "content": content})
+
+            restore_team(state, uuid.uuid4().hex if copy else team_id, json.loads(row[0]), json.loads(row[1]), histories)
+            if not copy:
+                # What was just read is already on disk
+                marker = self._marker(session_id, state)
+                marker["teams"][team_id] = row[2]
+                for index, history in state.agent_chat_histories.items():
+                    marker["agent_messages"][(team_id, index)] = len(history)
+        return True
+
+    def forget(self, session_id, state=None):
+        """Drops what is known to be saved for one of a session's states, or for all of them.
+
+        The next `load_session` records it again.
+        """
+        with self._lock:
+            if state is None:
+                self._saved.pop(session_id, None)
+                self._writers.pop(session_id, None)
+                return
+            marker = self._saved.get(session_id, {}).pop(id(state), None)
+            if marker is not None and self._writers.get(session_id) is marker:
+                del self._writers[session_id]
+
+    def load_session(self, session_id, max_fanout=None):
+        """Rebuilds a session's TeamState from the store, or returns None if it was never saved."""
+        # One lock for the whole read, so no other state's save lands between its parts
+        with self._lock:
+            row = self._conn.execute("SELECT team_id FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None:
+                return None
+            messages = self._conn.execute(
+                "SELECT role, content FROM messages WHERE session_id = ? ORDER BY seq", (session_id,)
+            ).fetchall()
+            state = TeamState(max_fanout=max_fanout)
+            state.chat_history = [{"role": role, "content": json.loads(content)} for role, content in messages]
+            if row[0]:
+                self._load_team(state, row[0], session_id, copy=False)
+            marker = self._marker(session_id, state)
+            marker.update(synced=True, messages=len(state.chat_history), team_id=row[0])
+            # What was just read is what is on disk, so this state can append to it
+            self._writers[session_id] = marker
+        return state
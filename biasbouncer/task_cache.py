@@ -0,0 +1,50 @@
+"""Memoizes agent task outputs by what produced them, so re-running a team only re-runs what changed."""
+import hashlib
+import json
+import threading
+
+from biasbouncer.response_cache import MemoryLRU
+
+
+def task_key(instructions, model, task, upstream=""):
+    """Hashes everything an agent's output depends on: its instructions, model, the task and upstream context."""
+    payload = json.dumps([instructions, model, task, upstream], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TaskResultCache:
+    """A size-bounded LRU of successful agent outputs, with hit/miss counters and explicit invalidation."""
+
+    def __init__(self, max_entries=512):
+        self.entries = MemoryLRU(max_entries)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        output = self.entries.get(key)
+        with self._lock:
+            if output is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return output
+
+    def set(self, key, output):
+        self.entries.set(key, output)
+
+    def invalidate(self, keys):
+        """Drops the given keys; returns how many were cached."""
+        return sum(self.entries.pop(key) is not None for key in keys)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.entries),
+        }
@@ -0,0 +1,212 @@
+"""Runs a task on every team agent concurrently and has the Team Manager synthesize the results."""
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+
+from biasbouncer import tracing
+from biasbouncer.client_pool import current_session
+from biasbouncer.task_cache import task_key
+
+try:
+    from agents import Runner
+    AGENTS_SDK_AVAILABLE = True
+except ImportError:
+    AGENTS_SDK_AVAILABLE = False
+
+SYNTHESIS_INSTRUCTIONS = """You are the Team Manager. Your specialists have each worked on the same task independently.
+Combine their contributions into one coherent answer for the user: keep the strongest points from each,
+reconcile disagreements explicitly, and note any perspective that is missing or looks biased."""
+
+
+@dataclass
+class AgentResult:
+    index: int
+    name: str
+    status: str = "pending"  # "done", "error", "timeout" or "cancelled"
+    output: str | None = None
+    error: str | None = None
+    elapsed_s: float = 0.0
+    cached: bool = False
+    # Task cache key for this output, for invalidating it later
+    cache_key: str | None = None
+
+
+@dataclass
+class TeamRunResult:
+    task: str
+    results: list = field(default_factory=list)
+    synthesis: str | None = None
+    elapsed_s: float = 0.0
+    synthesis_cached: bool = False
+    synthesis_cache_key: str | None = None
+    # Why the synthesis is missing when the specialists' results are all there is
+    synthesis_error: str | None = None
+
+    @property
+    def agent_time_s(self):
+        """Total time spent across agents, i.e. what a sequential run would have taken."""
+        return sum(result.elapsed_s for result in self.results)
+
+    def to_dict(self):
+        return {
+            "task": self.task,
+            "results": [asdict(result) for result in self.results],
+            "synthesis": self.synthesis,
+            "synthesis_cached": self.synthesis_cached,
+            "synthesis_cache_key": self.synthesis_cache_key,
+            "synthesis_error": self.synthesis_error,
+            "elapsed_s": self.elapsed_s,
+            "agent_time_s": self.agent_time_s,
+        }
+
+
+def agent_model(agent, run_config=None):
+    """Returns the model name an SDK Agent runs with, for cache keys."""
+    model = agent.model or getattr(run_config, "model", None) or "default"
+    return model if isinstance(model, str) else getattr(model, "model", type(model).__name__)
+
+
+async def run_agent(index, agent_obj, task, semaphore, timeout, run_config=None, cache=None, refresh=False):
+    """Runs one agent on the task under the shared semaphore and a per-agent timeout.
+
+    With a `cache`, an output already produced by the same instructions, model and task
+    is reused instead of running the agent; `refresh` skips the lookup but still stores.
+    """
+    result = AgentResult(index=index, name=agent_obj["name"])
+    if cache is not None:
+        result.cache_key = task_key(agent_obj["instructions"], agent_model(agent_obj["agent_object"], run_config), task)
+        output = None if refresh else cache.get(result.cache_key)
+        if output is not None:
+            result.status, result.output, result.cached = "done", output, True
+            return result
+    start = time.perf_counter()
+    with tracing.span("team.agent", agent=agent_obj["name"]) as span:
+        try:
+            async with semaphore:
+                run = await asyncio.wait_for(Runner.run(agent_obj["agent_object"], task, run_config=run_config), timeout)
+            result.status, result.output = "done", str(run.final_output)
+        except asyncio.TimeoutError:
+            result.status, result.error = "timeout", f"Timed out after {timeout:.0f}s."
+        except asyncio.CancelledError:
+            result.status, result.error = "cancelled", "Cancelled."
+            raise
+        except Exception as e:
+            result.status, result.error = "error", str(e)
+        finally:
+            result.elapsed_s = time.perf_counter() - start
+            span.set(status=result.status)
+            if result.status in ("error", "timeout"):
+                span.error = result.error
+    if cache is not None and result.status == "done":
+        cache.set(result.cache_key, result.output)
+    return result
+
+
+def synthesis_input(task, results):
+    """Builds the manager's input from the task and each specialist's output."""
+    sections = [f"Task: {task}"]
+    for result in results:
+        body = result.output if result.status == "done" else f"(no contribution: {result.error})"
+        sections.append(f"## {result.name}\n{body}")
+    return "\n\n".join(sections)
+
+
+async def run_team_task(agent_objects, task, manager_agent=None, max_concurrency=4, timeout=120, on_result=None, run_config=None,
+                        cache=None, refresh=False):
+    """Fans `task` out to every SDK agent at once and returns a TeamRunResult.
+
+    At most `max_concurrency` agents run at a time and each is cancelled after
+    `timeout` seconds. `on_result(result)` is called as each agent finishes, in
+    completion order. If the run itself is cancelled, unfinished agents are cancelled too.
+    A failed synthesis leaves `synthesis` as None, with the reason in `synthesis_error`.
+
+    With a TaskResultCache, only agents whose instructions, model or task changed
+    are run again; the synthesis is keyed on every specialist's output, so it is
+    redone whenever any of them changed.
+    """
+    if not AGENTS_SDK_AVAILABLE:
+        raise RuntimeError("The OpenAI Agents SDK is required to run team tasks.")
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pending = [
+        asyncio.create_task(run_agent(index, agent_obj, task, semaphore, timeout, run_config, cache, refresh))
+        for index, agent_obj in enumerate(agent_objects)
+        if agent_obj["sdk_created"]
+    ]
+    team_run = TeamRunResult(task=task)
+    try:
+        for finished in asyncio.as_completed(pending):
+            result = await finished
+            team_run.results.append(result)
+            if on_result:
+                on_result(result)
+    finally:
+        for running in pending:
+            running.cancel()
+    team_run.results.sort(key=lambda result: result.index)
+
+    if manager_agent is not None and any(result.status == "done" for result in team_run.results):
+        synthesizer = manager_agent.clone(instructions=SYNTHESIS_INSTRUCTIONS, handoffs=[])
+        manager_input = synthesis_input(task, team_run.results)
+        if cache is not None:
+            team_run.synthesis_cache_key = task_key(SYNTHESIS_INSTRUCTIONS, agent_model(synthesizer, run_config), task, manager_input)
+            team_run.synthesis = None if refresh else cache.get(team_run.synthesis_cache_key)
+            team_run.synthesis_cached = team_run.synthesis is not None
+        if team_run.synthesis is None:
+            with tracing.span("team.synthesis") as span:
+                try:
+                    run = await asyncio.wait_for(Runner.run(synthesizer, manager_input, run_config=run_config), timeout)
+                    team_run.synthesis = str(run.final_output)
+                except asyncio.TimeoutError:
+                    team_run.synthesis_error = span.error = f"Timed out after {timeout:.0f}s."
+                except Exception as e:
+                    # The specialists' results are still worth returning without a synthesis
+                    team_run.synthesis_error = span.error = str(e)
+            if cache is not None and team_run.synthesis is not None:
+                cache.set(team_run.synthesis_cache_key, team_run.synthesis)
+    team_run.elapsed_s = time.perf_counter() - start
+    return team_run
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def agent_loop():
+    """Returns the process-wide event loop team tasks run on, so pooled async clients keep their connections."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="team-runner", daemon=True).start()
+        return _loop
+
+
+async def _run_in_context(context, coro):
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+
+@tracing.traced("team.run_task")
+def run_team_task_sync(*args, on_result=None, session_id=None, **kwargs):
+    """Runs `run_team_task` on the shared agent loop and waits for it from synchronous code such as a Streamlit script.
+
+    `on_result` is called on the calling thread, so it can update the page. The
+    agents' API calls are queued by the scheduler under `session_id`.
+    """
+    finished = queue.SimpleQueue()
+    # The caller's context carries the current trace span to the agents' spans
+    context = contextvars.copy_context()
+    context.run(current_session.set, session_id)
+    coro = _run_in_context(context, run_team_task(*args, on_result=finished.put, **kwargs))
+    future = asyncio.run_coroutine_threadsafe(coro, agent_loop())
+    future.add_done_callback(lambda _: finished.put(None))
+    try:
+        while (result := finished.get()) is not None:
+            if on_result:
+                on_result(result)
+        return future.result()
+    finally:
+        future.cancel()
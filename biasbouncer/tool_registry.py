@@ -0,0 +1,183 @@
+"""A registry that validates, deduplicates and concurrently dispatches model tool calls."""
+import json
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from biasbouncer import tracing
+
+_JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool,
+}
+
+
+@dataclass
+class ToolResult:
+    tool_call_id: str
+    name: str
+    content: str
+
+
+@dataclass
+class ToolSpec:
+    schema: dict
+    handler: object
+    # Returns the state resources a call touches; calls with overlapping resources never run concurrently
+    resources: object = None
+    # Returns the key under which calls collapse; later calls with the same key replace earlier ones
+    dedupe_key: object = None
+    # Tools whose calls become redundant when this tool is called in the same response
+    supersedes: tuple = ()
+
+    @property
+    def name(self):
+        return self.schema["function"]["name"]
+
+
+def validate(value, schema, path="arguments"):
+    """Checks `value` against the subset of JSON Schema used by the tool definitions."""
+    expected = schema.get("type")
+    if expected and not isinstance(value, _JSON_TYPES[expected]):
+        return [f"{path} should be of type {expected}"]
+    if expected in ("integer", "number") and isinstance(value, bool):
+        return [f"{path} should be of type {expected}"]
+    errors = []
+    if expected == "object":
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key} is required")
+        for key, sub_schema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub_schema, f"{path}.{key}"))
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def _resources_overlap(first, second):
+    for a in first:
+        for b in second:
+            if a == b or a.startswith(b + ":") or b.startswith(a + ":"):
+                return True
+    return False
+
+
+@dataclass
+class _PlannedCall:
+    position: int
+    tool_call: object
+    spec: ToolSpec = None
+    args: dict = field(default_factory=dict)
+    result: str = None
+
+
+class ToolRegistry:
+    """Maps tool names to handlers and their JSON schemas."""
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._specs = {}
+
+    def register(self, schema, handler, resources=None, dedupe_key=None, supersedes=()):
+        spec = ToolSpec(schema, handler, resources, dedupe_key, tuple(supersedes))
+        self._specs[spec.name] = spec
+        return spec
+
+    def schemas(self, names=None):
+        """Returns the tool definitions to send to the model, optionally limited to `names`."""
+        return [spec.schema for name, spec in self._specs.items() if names is None or name in names]
+
+    def _plan(self, tool_calls, overrides, allowed):
+        planned = [_PlannedCall(position, call) for position, call in enumerate(tool_calls)]
+        for call in planned:
+            name = call.tool_call.function.name
+            call.spec = self._specs.get(name)
+            if call.spec is None or (allowed is not None and name not in allowed):
+                call.result = f"Error: Unknown tool {name}."
+                continue
+            try:
+                call.args = json.loads(call.tool_call.function.arguments or "{}")
+            except ValueError as e:
+                call.result = f"Error: Arguments for {name} are not valid JSON ({e})."
+                continue
+            if isinstance(call.args, dict):
+                call.args.update((overrides or {}).get(name, {}))
+            errors = validate(call.args, call.spec.schema["function"]["parameters"])
+            if errors:
+                call.result = f"Error: Invalid arguments for {name}: {'; '.join(errors)}."
+
+        valid = [call for call in planned if call.result is None]
+        called = {call.spec.name for call in valid}
+        latest = {}
+        for call in valid:
+            superseded_by = next((n for n in called if call.spec.name in self._specs[n].supersedes), None)
+            if superseded_by:
+                call.result = f"Skipped: already handled by {superseded_by} in this response."
+                continue
+            key_fn = call.spec.dedupe_key
+            key = (call.spec.name, key_fn(call.args) if key_fn else json.dumps(call.args, sort_keys=True))
+            if key in latest:
+                latest[key].result = "Skipped: replaced by a later identical or overlapping call."
+            latest[key] = call
+        return planned, [call for call in valid if call.result is None]
+
+    @staticmethod
+    def _waves(calls):
+        """Groups calls so each wave only holds calls whose resources do not overlap."""
+        waves, assigned = [], []
+        for call in calls:
+            resources = call.spec.resources(call.args) if call.spec.resources else {"*"}
+            wave = 0
+            for earlier, earlier_resources, earlier_wave in assigned:
+                if "*" in resources or "*" in earlier_resources or _resources_overlap(resources, earlier_resources):
+                    wave = max(wave, earlier_wave + 1)
+            assigned.append((call, resources, wave))
+            if wave == len(waves):
+                waves.append([])
+            waves[wave].append(call)
+        return waves
+
+    def _execute(self, state, call):
+        with tracing.span(f"tool.{call.spec.name}") as span:
+            try:
+                call.result = str(call.spec.handler(state, **call.args))
+            except Exception as e:
+                call.result = f"Error: {call.spec.name} failed: {e}"
+            if call.result.startswith("Error"):
+                span.error = call.result
+
+    def dispatch(self, state, tool_calls, overrides=None, allowed=None):
+        """Runs a response's tool calls and returns one ToolResult per call, in call order.
+
+        Invalid calls, unknown tools, duplicates and calls made redundant by another
+        call are answered without running. The rest run in waves; calls within a
+        wave touch disjoint state and run concurrently.
+        """
+        planned, runnable = self._plan(tool_calls, overrides, allowed)
+        for wave in self._waves(runnable):
+            if len(wave) == 1:
+                self._execute(state, wave[0])
+                continue
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(wave))) as pool:
+                list(pool.map(lambda call: self._execute(state, call), wave))
+        return [ToolResult(call.tool_call.id, call.tool_call.function.name, call.result) for call in planned]
+
+
+def tool_messages(message, results):
+    """Returns the assistant tool-call message and tool replies for a follow-up request."""
+    assistant = {
+        "role": "assistant",
+        "content": message.content,
+        "tool_calls": [
+            {"id": call.id, "type": "function", "function": {"name": call.function.name, "arguments": call.function.arguments}}
+            for call in message.tool_calls
+        ],
+    }
+    return [assistant] + [
+        {"role": "tool", "tool_call_id": result.tool_call_id, "content": result.content} for result in results
+    ]
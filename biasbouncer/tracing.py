@@ -0,0 +1,224 @@
+"""Lightweight in-process tracing: timed spans, rolling percentiles and local JSONL/Prometheus export."""
+import functools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+QUANTILES = (0.50, 0.95, 0.99)
+
+logger = logging.getLogger(__name__)
+
+_current_span = ContextVar("current_span", default=None)
+
+
+def percentile(values, fraction):
+    """Returns the nearest-rank percentile of `values`, or 0.0 when empty."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+@dataclass
+class Span:
+    name: str
+    start: float
+    duration_s: float = 0.0
+    parent: str = None
+    error: str = None
+    # model, prompt_tokens, completion_tokens, cache ("hit", "miss" or "off") and anything else useful
+    attrs: dict = field(default_factory=dict)
+
+    def set(self, **attrs):
+        self.attrs.update((key, value) for key, value in attrs.items() if value is not None)
+
+
+@dataclass
+class _SpanStats:
+    durations: deque
+    count: int = 0
+    errors: int = 0
+    total_s: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cache_hits: int = 0
+
+
+class Tracer:
+    """Records spans into per-name rolling windows and optionally appends them to local files.
+
+    Percentiles cover the last `window` spans of each name; counts, errors, tokens
+    and total time cover the whole process lifetime.
+    """
+
+    def __init__(self, window=1000, recent=200):
+        self.window = window
+        self._stats = {}
+        self._recent = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._prometheus_path = None
+        self._prometheus_interval_s = 10.0
+        self._prometheus_written = 0.0
+
+    def configure(self, jsonl_path=None, prometheus_path=None, prometheus_interval_s=10.0):
+        """Sets where spans (one JSON object per line) and Prometheus text metrics are written."""
+        with self._lock:
+            if self._jsonl is not None:
+                self._jsonl.close()
+            self._jsonl = open(jsonl_path, "a", encoding="utf-8") if jsonl_path else None
+            self._prometheus_path = prometheus_path
+            self._prometheus_interval_s = prometheus_interval_s
+        return self
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Times the enclosed block as a span; exceptions are recorded on the span and re-raised.
+
+        Control-flow exceptions that derive from BaseException only (such as Streamlit's
+        rerun and stop) end the span without marking it as an error.
+        """
+        parent = _current_span.get()
+        current = Span(name, time.time(), parent=parent.name if parent else None)
+        current.set(**attrs)
+        token = _current_span.set(current)
+        start = time.perf_counter()
+        try:
+            yield current
+        except Exception as e:
+            current.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            current.duration_s = time.perf_counter() - start
+            _current_span.reset(token)
+            self.record(current)
+
+    def record(self, span):
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = _SpanStats(deque(maxlen=self.window))
+            stats.durations.append(span.duration_s)
+            stats.count += 1
+            stats.total_s += span.duration_s
+            stats.errors += span.error is not None
+            stats.prompt_tokens += span.attrs.get("prompt_tokens", 0)
+            stats.completion_tokens += span.attrs.get("completion_tokens", 0)
+            stats.cache_hits += span.attrs.get("cache") == "hit"
+            self._recent.append(span)
+            if self._jsonl is not None:
+                self._jsonl.write(json.dumps(asdict(span), default=str) + "\n")
+                self._jsonl.flush()
+            now = time.time()
+            due = self._prometheus_path and now - self._prometheus_written >= self._prometheus_interval_s
+            if due:
+                # Claimed under the lock, so only one of the spans ending now writes the file
+                self._prometheus_written = now
+        if due:
+            try:
+                self.write_prometheus()
+            except OSError as e:
+                # Exporting metrics must never fail the operation being traced
+                logger.warning("Writing Prometheus metrics failed: %s", e)
+
+    def summary(self):
+        """Returns one row per span name with counts, p50/p95/p99 latency and token totals."""
+        with self._lock:
+            rows = []
+            for name, stats in sorted(self._stats.items()):
+                durations = list(stats.durations)
+                row = {"span": name, "count": stats.count, "errors": stats.errors}
+                for quantile in QUANTILES:
+                    row[f"p{int(quantile * 100)}_s"] = percentile(durations, quantile)
+                row.update(
+                    prompt_tokens=stats.prompt_tokens,
+                    completion_tokens=stats.completion_tokens,
+                    cache_hits=stats.cache_hits,
+                )
+                rows.append(row)
+            return rows
+
+    def recent(self, limit=20):
+        """Returns the most recent spans, newest first."""
+        with self._lock:
+            return list(self._recent)[::-1][:limit]
+
+    def prometheus_text(self):
+        """Renders the aggregates in the Prometheus text exposition format."""
+        lines = [
+            "# HELP biasbouncer_span_duration_seconds Span durations; quantiles cover the rolling window.",
+            "# TYPE biasbouncer_span_duration_seconds summary",
+        ]
+        with self._lock:
+            stats_by_name = sorted(self._stats.items())
+            for name, stats in stats_by_name:
+                durations = list(stats.durations)
+                for quantile in QUANTILES:
+                    lines.append(
+                        f'biasbouncer_span_duration_seconds{{span="{name}",quantile="{quantile}"}} '
+                        f"{percentile(durations, quantile):.6f}"
+                    )
+                lines.append(f'biasbouncer_span_duration_seconds_sum{{span="{name}"}} {stats.total_s:.6f}')
+                lines.append(f'biasbouncer_span_duration_seconds_count{{span="{name}"}} {stats.count}')
+            lines += ["# HELP biasbouncer_span_errors_total Spans that ended with an error.",
+                      "# TYPE biasbouncer_span_errors_total counter"]
+            lines += [f'biasbouncer_span_errors_total{{span="{name}"}} {stats.errors}' for name, stats in stats_by_name]
+            lines += ["# HELP biasbouncer_tokens_total Prompt and completion tokens reported by the API.",
+                      "# TYPE biasbouncer_tokens_total counter"]
+            for name, stats in stats_by_name:
+                if stats.prompt_tokens or stats.completion_tokens:
+                    lines.append(f'biasbouncer_tokens_total{{span="{name}",kind="prompt"}} {stats.prompt_tokens}')
+                    lines.append(f'biasbouncer_tokens_total{{span="{name}",kind="completion"}} {stats.completion_tokens}')
+            lines += ["# HELP biasbouncer_cache_hits_total Spans answered from the response cache.",
+                      "# TYPE biasbouncer_cache_hits_total counter"]
+            lines += [f'biasbouncer_cache_hits_total{{span="{name}"}} {stats.cache_hits}' for name, stats in stats_by_name]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Atomically rewrites the Prometheus text file, e.g. for node_exporter's textfile collector."""
+        path = path or self._prometheus_path
+        if not path:
+            return
+        with self._lock:
+            self._prometheus_written = time.time()
+        # A temp file of its own per write, so concurrent writers never replace each other's
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".metrics-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+
+
+# The process-wide tracer used by the engine, the completion helpers and the app
+tracer = Tracer()
+
+
+def span(name, **attrs):
+    """Opens a span on the process-wide tracer."""
+    return tracer.span(name, **attrs)
+
+
+def traced(name):
+    """Decorates a function so every call is recorded as a span on the process-wide tracer."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
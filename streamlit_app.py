@@ -1,10 +1,21 @@
 import streamlit as st
-import json
 import openai
-from openai import OpenAI
-import asyncio
+import uuid
+from contextlib import nullcontext
+from dataclasses import asdict
+from biasbouncer import engine, tracing
+from biasbouncer.client_pool import ClientPool, ScheduledClient, key_fingerprint
+from biasbouncer.engine import TeamState
+from biasbouncer.history import HistoryManager, model_summarizer
+from biasbouncer.response_cache import ResponseCache
+from biasbouncer.routing import ModelRouter
+from biasbouncer.scheduler import RequestScheduler
+from biasbouncer.sessions import SessionRegistry
+from biasbouncer.store import SessionStore
+from biasbouncer.task_cache import TaskResultCache
+from biasbouncer.team_runner import run_team_task_sync
 try:
-    from agents import Agent, Runner
+    from agents import OpenAIProvider, RunConfig
     AGENTS_SDK_AVAILABLE = True
 except ImportError:
     AGENTS_SDK_AVAILABLE = False
@@ -14,333 +25,460 @@ except ImportError:
 st.set_page_config(page_title="BiasBouncer", layout="centered")
 st.markdown("<h1 style='text-align: center; color: red;'>BiasBouncer<span style='text-align: center; color: white;'> 3</span></h1>", unsafe_allow_html=True)
 
-# --- System Prompts for the AI ---
-MAIN_SYSTEM_PROMPT = """
-You are BiasBouncer, an expert AI team creation assistant. 
-Your primary goal is to help users build a diversified team of AI agents to accomplish a specific task.
-When a user wants to create a team, you must gently guide them. Ask them at most two relatively simple clarifying questions to understand their goal if you can. 
-You should not ask questions if they do not seem necessary or want to immediately create a team.
-Once you have enough information, you MUST call the `create_team` function to generate the team members.
 
-For each team member, you must provide a detailed description formatted as a bulleted list (using markdown like `- Point 1`). This description must cover at least three points:
-1.  A more detailed explanation of its role and core responsibilities.
-2.  How it will go about accomplishing its tasks (its methodology or process).
-3.  What the ideal end product or outcome of its specific role is.
+# --- Shared Resources ---
+@st.cache_resource
+def get_response_cache():
+    """Returns the process-wide completion cache shared by every session."""
+    return ResponseCache(
+        max_entries=st.secrets.get("RESPONSE_CACHE_ENTRIES", 256),
+        disk_path=st.secrets.get("RESPONSE_CACHE_PATH", ".biasbouncer_cache.sqlite3"),
+        ttl_seconds=st.secrets.get("RESPONSE_CACHE_TTL_SECONDS", 7 * 24 * 3600),
+        max_bytes=st.secrets.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+    )
+
+@st.cache_resource
+def get_client_pool():
+    """Returns the process-wide pool holding one OpenAI client per API key."""
+    return ClientPool(timeout=st.secrets.get("OPENAI_TIMEOUT_SECONDS", 60.0))
+
+@st.cache_resource
+def get_scheduler(api_key_fingerprint):
+    """Returns the request scheduler for one API key, shared by every session using it."""
+    return RequestScheduler(
+        requests_per_minute=st.secrets.get("OPENAI_REQUESTS_PER_MINUTE", 500),
+        tokens_per_minute=st.secrets.get("OPENAI_TOKENS_PER_MINUTE", 30000),
+        max_retries=st.secrets.get("OPENAI_MAX_RETRIES", 5),
+    )
+
+@st.cache_resource
+def get_session_store():
+    """Returns the process-wide store that keeps sessions and teams across restarts."""
+    return SessionStore(st.secrets.get("SESSION_STORE_PATH", ".biasbouncer_store.sqlite3"))
+
+@st.cache_resource
+def get_session_registry():
+    """Returns the process-wide registry that saves idle sessions to the store and releases their memory."""
+    return SessionRegistry(
+        get_session_store(),
+        idle_seconds=st.secrets.get("SESSION_IDLE_SECONDS", 1800),
+        max_sessions=st.secrets.get("MAX_LIVE_SESSIONS"),
+    )
+
+@st.cache_resource
+def get_tracer():
+    """Configures the process-wide tracer's local exports once per server."""
+    return tracing.tracer.configure(
+        jsonl_path=st.secrets.get("TRACE_JSONL_PATH"),
+        prometheus_path=st.secrets.get("TRACE_PROMETHEUS_PATH", ".biasbouncer_metrics.prom"),
+    )
+
+@st.cache_resource
+def get_task_cache():
+    """Returns the process-wide cache of agent task outputs, keyed by instructions, model and task."""
+    return TaskResultCache(max_entries=st.secrets.get("TASK_CACHE_ENTRIES", 256))
+
+@st.cache_resource
+def get_model_router():
+    """Returns the process-wide model router, or None when MODEL_ROUTING is off and every call uses gpt-4o."""
+    if not st.secrets.get("MODEL_ROUTING", True):
+        return None
+    return ModelRouter.from_config(
+        st.secrets.get("MODEL_ROUTES", {}),
+        cooldown_s=st.secrets.get("MODEL_FALLBACK_COOLDOWN_SECONDS", 120.0),
+    )
+
+def active_response_cache():
+    """Returns the shared cache, or None when caching is switched off in the sidebar."""
+    return get_response_cache() if st.session_state.get("cache_responses", True) else None
+
+
+tracer = get_tracer()
 
-Do not just list the team members in text; you must use the provided tool to create them. Also, do not name agents with personal names unless excplicitly instructed by the user.
 
-After creating the team, you should also call the `create_agents` function to instantiate the actual AI agents based on the team details.
-"""
+# --- Session State Initialization ---
+# The session id lives in the URL, so reopening the link or restarting the server resumes the session
+if "session_id" not in st.session_state:
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+    st.query_params["session"] = st.session_state.session_id
+def load_team_state():
+    """Loads this session's TeamState from the store, or starts a new one."""
+    max_fanout = st.secrets.get("MANAGER_MAX_FANOUT", 10)
+    st.session_state.team_state = (
+        get_session_store().load_session(st.session_state.session_id, max_fanout=max_fanout)
+        or TeamState(max_fanout=max_fanout)
+    )
+    st.session_state.agent_history_managers = {}
+    st.session_state.pop("history_manager", None)
+
+if "agent_history_managers" not in st.session_state:
+    st.session_state.agent_history_managers = {}
+
+# A state evicted while this session sat idle is reloaded the same way as a resumed session.
+# touch() checks for eviction and registers the state in one step, so another session's
+# eviction cannot empty it after the check.
+session_registry = get_session_registry()
+while "team_state" not in st.session_state or not session_registry.touch(
+    st.session_state.session_id, st.session_state.team_state, st.session_state.agent_history_managers
+):
+    load_team_state()
+session_registry.evict_idle()
+
+# All conversation and team data lives on this object; the engine operates on it directly
+state = st.session_state.team_state
+
+def ensure_live_state():
+    """Reruns the whole page, which reloads the state, if it was evicted since the page last ran.
+
+    Fragment reruns skip the top of the script, so each fragment that reads the state calls this first.
+    """
+    if not session_registry.touch(st.session_state.session_id, state, st.session_state.agent_history_managers):
+        st.rerun()
+
+def session_running():
+    """Keeps this session from being evicted until the model calls or team task inside it finish."""
+    return session_registry.running(st.session_state.session_id, state, st.session_state.agent_history_managers)
+
+def persist_session():
+    """Writes whatever changed in this session since its last save."""
+    get_session_store().save(st.session_state.session_id, state)
+
+# Rebuild agents for members edited by hand since the last run, then save the previous run's changes
+engine.sync_agents(state)
+persist_session()
+
+
+# --- Fragments Rendered Before the Main Flow ---
+# Chat messages shown per page; older messages are only rendered on request
+HISTORY_PAGE_SIZE = st.secrets.get("HISTORY_PAGE_SIZE", 20)
+
+@st.fragment
+def render_agent_details_panel():
+    """Renders the sidebar agent details; toggling them only reruns this panel."""
+    ensure_live_state()
+    with tracing.span("render.agent_details"):
+        if st.button("View Agent Details"):
+            st.session_state.show_agent_details = not st.session_state.get("show_agent_details", False)
+
+        if st.session_state.get("show_agent_details", False):
+            for idx, agent in enumerate(state.agent_objects):
+                with st.expander(f"Agent {idx+1}: {agent['name']}"):
+                    st.markdown(f"**Role:** {agent['role']}\n\n**Instructions:**")
+                    st.code(agent['instructions'], language='text')
 
-EDIT_SYSTEM_PROMPT = """
-You are an AI assistant impersonating and temporarily taking on the role of a specific team member who helps with informing the user and editing details.
-Your primary goal is to refine the agent's details based on the user's requests; mention at the end of your response that you can edit details from the chat if necessary.
-When the user asks for a change, you MUST call the `update_agent_details` function with all the new details (name, role, and description).
-Do not just provide the updated text in your response; you must call the function to apply the changes.
-If you are just answering a question, you can respond with text as normal.
-"""
+@st.fragment
+def render_diagnostics():
+    """Shows rolling latency percentiles, errors and tokens per traced span; refreshing only reruns this panel."""
+    with st.expander("Diagnostics"):
+        rows = tracer.summary()
+        if not rows:
+            st.caption("Nothing traced yet.")
+            return
+        st.button("Refresh", key="refresh_diagnostics")
+        st.dataframe(
+            [
+                {
+                    "span": row["span"],
+                    "calls": row["count"],
+                    "errors": row["errors"],
+                    "p50 ms": round(row["p50_s"] * 1000),
+                    "p95 ms": round(row["p95_s"] * 1000),
+                    "p99 ms": round(row["p99_s"] * 1000),
+                    "tokens": row["prompt_tokens"] + row["completion_tokens"],
+                    "cache hits": row["cache_hits"],
+                }
+                for row in rows
+            ],
+            hide_index=True,
+        )
+        if get_model_router() is not None:
+            st.caption("Model routes")
+            st.dataframe(
+                [
+                    {
+                        "route": row["route"],
+                        "model": row["model"] + (" (fallback active)" if row["degraded"] else ""),
+                        "calls": row["calls"],
+                        "errors": row["errors"],
+                        "p95 s": round(row["p95_s"], 2),
+                        "cost $": round(row["cost_usd"], 4),
+                    }
+                    for row in get_model_router().stats()
+                ],
+                hide_index=True,
+            )
+        sessions = session_registry.stats()
+        st.caption(
+            f"Sessions: {sessions['live_sessions']} live, {sessions['evicted_sessions']} evicted · "
+            f"this session holds {session_registry.session_bytes(st.session_state.session_id) / 1024:.0f} KiB"
+        )
+        st.download_button("Download metrics", tracer.prometheus_text(), file_name="biasbouncer_metrics.prom")
 
 
 # --- API Key and Client Initialization ---
 openai_api_key = st.secrets.get("OPENAI_API_KEY")
 
-with st.sidebar:
+with st.sidebar, tracing.span("render.sidebar"):
     st.header("Chat Controls")
     if not openai_api_key:
         openai_api_key = st.text_input("Enter your OpenAI API Key:", type="password", key="api_key_input")
-    
+
     if st.button("Clear Chat History & Team"):
-        # Preserve the API key and client if they exist
+        # Preserve the API key if it exists; the client itself is shared across sessions
         api_key = st.session_state.get("OPENAI_API_KEY") or openai_api_key
-        client_obj = st.session_state.get("client")
-        
-        # Clear all session state
+
+        # Keep the session id, so the session's saved teams stay listed, but clear its chat and team in the store too
+        session_id = st.session_state.session_id
+        fresh_state = TeamState(max_fanout=state.max_fanout)
+        get_session_store().save(session_id, fresh_state)
         st.session_state.clear()
-        
-        # Restore API key and client if they existed
+        st.session_state.session_id = session_id
+        st.session_state.team_state = fresh_state
+
+        # Restore API key if it existed
         if api_key:
             st.session_state["OPENAI_API_KEY"] = api_key
-        if client_obj:
-            st.session_state["client"] = client_obj
-        
+
         st.rerun()
-    
+
+    st.toggle("Stream responses", value=True, key="stream_responses", help="Show replies and team members as they are generated.")
+    st.toggle("Cache responses", value=True, key="cache_responses", help="Reuse replies for identical conversations instead of calling the API again.")
+    if st.session_state.cache_responses:
+        cache_stats = get_response_cache().stats()
+        st.caption(
+            f"Cache: {cache_stats['memory_hits']} memory hits · {cache_stats['disk_hits']} disk hits · "
+            f"{cache_stats['misses']} misses ({cache_stats['hit_rate']:.0%} hit rate)"
+        )
+    if "last_stream_stats" in st.session_state:
+        stats = st.session_state.last_stream_stats
+        timings = ["served from cache" if stats["cached"] else f"total {stats['elapsed_s']:.1f}s"]
+        if stats["first_token_s"] is not None:
+            timings.insert(0, f"first token {stats['first_token_s']:.2f}s")
+        if stats["first_member_s"] is not None:
+            timings.insert(1, f"first member {stats['first_member_s']:.2f}s")
+        st.caption("Last response: " + " · ".join(timings))
+    if "last_prompt_tokens" in st.session_state:
+        st.caption(f"Last prompt size: {st.session_state.last_prompt_tokens:,} tokens")
+
     # Display agent creation status
-    if "agents_created" in st.session_state and st.session_state.agents_created:
-        st.success(f"✅ {len(st.session_state.agent_objects)} agents created")
-        if st.button("View Agent Details"):
-            st.session_state.show_agent_details = not st.session_state.get("show_agent_details", False)
-        
-        if st.session_state.get("show_agent_details", False):
-            for idx, agent in enumerate(st.session_state.agent_objects):
-                with st.expander(f"Agent {idx+1}: {agent['name']}"):
-                    st.write(f"**Role:** {agent['role']}")
-                    st.write("**Instructions:**")
-                    st.code(agent['instructions'], language='text')
+    if state.agents_created:
+        st.success(f"✅ {len(state.agent_objects)} agents created")
+        render_agent_details_panel()
+
+        if AGENTS_SDK_AVAILABLE and (state.sdk_agents_pending or any(agent["sdk_created"] for agent in state.agent_objects)):
+            st.subheader("Execute Task")
+            team_task = st.text_area("Task for the whole team", key="team_task_input")
+            st.checkbox("Ignore cached results", key="refresh_task_results", help="Re-run every agent, even those whose instructions and task are unchanged.")
+            if st.button("Run Task", disabled=not team_task):
+                st.session_state.pending_task = team_task
+            task_cache_stats = get_task_cache().stats()
+            if task_cache_stats["entries"]:
+                st.caption(f"Task cache: {task_cache_stats['entries']} results · {task_cache_stats['hits']} reused")
+                if st.button("Clear Task Cache"):
+                    get_task_cache().clear()
+
+    saved_teams = [team for team in get_session_store().list_teams(st.session_state.session_id) if team["id"] != state.team_id]
+    if saved_teams:
+        with st.expander(f"Saved teams ({len(saved_teams)})"):
+            saved_team = st.selectbox(
+                "Team",
+                saved_teams,
+                format_func=lambda team: f"{team['title']} ({team['size']} members)",
+                label_visibility="collapsed",
+            )
+            if st.button("Load Team"):
+                if get_session_store().load_team(state, saved_team["id"], st.session_state.session_id):
+                    state.chat_history.append({"role": "assistant", "content": {"type": "team_creation"}})
+                    st.session_state.agent_history_managers = {}
+                    st.rerun()
+                st.error("That team is no longer in the store.")
 
-# Cache the OpenAI client in session state to avoid recreating it on every rerun
+# Every session with the same key shares one pooled client; requests are queued by that key's scheduler
+client = None
 if openai_api_key:
-    if "client" not in st.session_state:
-        st.session_state.client = OpenAI(api_key=openai_api_key)
+    scheduler = get_scheduler(key_fingerprint(openai_api_key))
+    client = ScheduledClient(get_client_pool().get(openai_api_key), scheduler, st.session_state.session_id)
+    with st.sidebar:
+        queue_stats = scheduler.stats()
+        st.caption(
+            f"API queue: {queue_stats['queue_depth']} waiting · wait p95 {queue_stats['wait_p95_s']:.2f}s · "
+            f"{queue_stats['requests_last_minute']} req/min · {queue_stats['retries']} retries"
+        )
 else:
     st.info("Please enter your OpenAI API key in the sidebar to start.")
 
-client = st.session_state.get("client")
-
-# --- Tool & Function Definitions ---
-def create_team(team_members):
-    """Stores the generated team member details in the session state."""
-    st.session_state.team_details = team_members
-    st.session_state.agents_created = False  # Reset agent creation status
-    return f"Successfully created a team with {len(team_members)} members."
-
-def update_agent_details(index, name, role, description):
-    """Updates the details of a specific agent in the session state."""
-    if 0 <= index < len(st.session_state.team_details):
-        st.session_state.team_details[index] = {"name": name, "role": role, "description": description}
-        # If agents were already created, update the corresponding agent object
-        if "agent_objects" in st.session_state and st.session_state.agents_created:
-            st.session_state.agent_objects[index] = create_single_agent(name, role, description)
-        return "Agent details updated successfully."
-    return "Error: Invalid agent index."
-
-def create_single_agent(name, role, description):
-    """Helper function to create a single agent object with instructions based on team details."""
-    # Combine role and description into comprehensive instructions
-    instructions = f"""You are {name}, a specialist AI agent with the role of {role}.
-
-Your core responsibilities and approach:
-{description}
-
-You should:
-1. Focus on your specific area of expertise as defined by your role
-2. Provide detailed, actionable insights and recommendations
-3. Collaborate effectively with other team members when needed
-4. Use web research tools when necessary to gather current information
-5. Maintain a professional and helpful demeanor while fulfilling your responsibilities
-
-Remember to stay within your defined role and expertise area while being thorough and comprehensive in your approach."""
-    
-    # Create agent object (or dict representation if SDK not available)
-    if AGENTS_SDK_AVAILABLE:
-        try:
-            agent = Agent(
-                name=name,
-                instructions=instructions,
-                handoff_description=f"Specialist agent for {role}",
-                # Tools will be added here when web research tool is configured
-                # tools=[web_research_tool] 
-            )
-            return {
-                "name": name,
-                "role": role,
-                "instructions": instructions,
-                "agent_object": agent,
-                "sdk_created": True
-            }
-        except Exception as e:
-            st.warning(f"Could not create SDK agent for {name}: {str(e)}")
-            return {
-                "name": name,
-                "role": role,
-                "instructions": instructions,
-                "agent_object": None,
-                "sdk_created": False
-            }
-    else:
-        return {
-            "name": name,
-            "role": role,
-            "instructions": instructions,
-            "agent_object": None,
-            "sdk_created": False
-        }
-
-def create_agents():
-    """Creates actual AI agents based on the team details in session state."""
-    if "team_details" not in st.session_state or not st.session_state.team_details:
-        return "Error: No team details found. Please create a team first."
-    
-    agent_objects = []
-    for member in st.session_state.team_details:
-        agent_obj = create_single_agent(
-            member["name"],
-            member["role"],
-            member["description"]
-        )
-        agent_objects.append(agent_obj)
-    
-    st.session_state.agent_objects = agent_objects
-    st.session_state.agents_created = True
-    
-    # Create a manager agent if SDK is available
-    if AGENTS_SDK_AVAILABLE and any(a["sdk_created"] for a in agent_objects):
-        try:
-            sdk_agents = [a["agent_object"] for a in agent_objects if a["sdk_created"]]
-            manager_agent = Agent(
-                name="Team Manager",
-                instructions="You coordinate the team of specialist agents and determine which agent should handle each task based on their expertise.",
-                handoffs=sdk_agents
-            )
-            st.session_state.manager_agent = manager_agent
-            return f"Successfully created {len(agent_objects)} AI agents with a Team Manager for coordination."
-        except Exception as e:
-            return f"Created {len(agent_objects)} agent configurations. Manager creation failed: {str(e)}"
-    
-    return f"Successfully created {len(agent_objects)} agent configurations (SDK agents will be created when the Agents SDK is properly installed)."
-
-# Schemas for the AI tools
-tools = [
-    {
-        "type": "function",
-        "function": {
-            "name": "create_team",
-            "description": "Creates a team of AI agents with specified names, roles, and descriptions.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "team_members": {
-                        "type": "array",
-                        "description": "A list of team members.",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "name": {"type": "string", "description": "The name of the team member."},
-                                "role": {"type": "string", "description": "The specific role or job title of the member."},
-                                "description": {"type": "string", "description": "A detailed, multi-point description formatted as a markdown bulleted list."},
-                                "epilogue": {"type": "string", "description": "A brief 2-3 sentence description of the team that has been created, with team names and roles specified along with their intended team dynamics."}
-                            }, "required": ["name", "role", "description", "epilogue"]
-                        }
-                    }
-                }, "required": ["team_members"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "update_agent_details",
-            "description": "Updates the details for a single agent.",
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "index": {"type": "integer", "description": "The index of the agent to update."},
-                    "name": {"type": "string", "description": "The new name of the team member."},
-                    "role": {"type": "string", "description": "The new role of the team member."},
-                    "description": {"type": "string", "description": "The new detailed description of the team member, as a markdown bulleted list."}
-                }, "required": ["index", "name", "role", "description"]
-            }
-        }
-    },
-    {
-        "type": "function",
-        "function": {
-            "name": "create_agents",
-            "description": "Creates actual AI agent objects based on the team details that have been defined.",
-            "parameters": {
-                "type": "object",
-                "properties": {},
-                "required": []
-            }
-        }
-    }
-]
+with st.sidebar:
+    render_diagnostics()
+
+def new_history_manager():
+    """Creates a history manager using the configured token budget."""
+    return HistoryManager(
+        budget_tokens=st.secrets.get("HISTORY_TOKEN_BUDGET", 8000),
+        keep_recent=st.secrets.get("HISTORY_KEEP_RECENT", 6),
+        summarize=model_summarizer(client, st.secrets.get("HISTORY_SUMMARY_MODEL", "gpt-4o-mini")),
+    )
+
 
 # --- UI Helper Functions ---
+def render_member_details(member):
+    """Renders the name, role and description of a single team member."""
+    st.subheader(member["name"])
+    st.divider()
+    # One markdown element per member rather than three keeps each rerun's delta small
+    st.markdown(f"**Role:** {member.get('role', '')}\n\n**Description:**\n\n{member.get('description', '')}")
+
+def render_streamed_members(placeholder, members):
+    """Re-renders the preview tabs for team members that have finished streaming."""
+    with placeholder.container():
+        tabs = st.tabs([member.get("name", "...") for member in members])
+        for tab, member in zip(tabs, members):
+            with tab:
+                render_member_details(member)
+
+# Placeholders inside each team tab that task results are written into as agents finish
+task_result_slots = {}
+
+def render_task_result(result):
+    """Renders one agent's contribution to the latest team task."""
+    if result["status"] == "done":
+        st.markdown("**Task result** (cached)" if result.get("cached") else f"**Task result** ({result['elapsed_s']:.1f}s)")
+        st.markdown(result["output"])
+    else:
+        st.warning(f"Task {result['status']} after {result['elapsed_s']:.1f}s: {result['error']}")
+
+def forget_task_result(agent_index):
+    """Drops an agent's cached output so the next run re-runs that agent."""
+    if state.evicted:
+        return
+    result = state.task_results[agent_index]
+    get_task_cache().invalidate([result["cache_key"]])
+    result["cached"] = False
+
+def render_task_summary(summary):
+    """Renders the manager's synthesis of a team task in the main chat."""
+    st.markdown(f"**Task:** {summary['task']}" + (f"\n\n{summary['synthesis']}" if summary["synthesis"] else ""))
+    if summary.get("synthesis_error"):
+        st.warning(f"The Team Manager could not combine the results: {summary['synthesis_error']}")
+    reused = sum(result.get("cached", False) for result in summary["results"])
+    st.caption(
+        f"{len(summary['results'])} agents finished in {summary['elapsed_s']:.1f}s "
+        f"({summary['agent_time_s']:.1f}s of combined agent time"
+        + (f", {reused} reused from cache" if reused else "")
+        + (", cached synthesis" if summary.get("synthesis_cached") else "")
+        + ")"
+    )
+
 def handle_agent_detail_change(agent_index, field):
-    """Callback to update session state when a text field is changed in the dialog."""
+    """Callback to update the team state when a text field is changed in the dialog."""
+    if state.evicted:
+        return
     new_value = st.session_state[f"edit_{agent_index}_{field}"]
-    st.session_state.team_details[agent_index][field] = new_value
+    state.team_details[agent_index][field] = new_value
+    engine.mark_agent_dirty(state, agent_index)
 
+@st.fragment
 def create_team_tabs():
     """Renders team member tabs and the edit button for each."""
-    if "team_details" in st.session_state and st.session_state.team_details:
-        team_members = st.session_state.team_details
-        tabs = st.tabs([member["name"] for member in team_members])
-        for i, member in enumerate(team_members):
-            with tabs[i]:
-                st.subheader(member["name"])
-                st.divider()
-                st.markdown(f"**Role:** {member['role']}")
-                st.markdown("**Description:**")
-                st.markdown(member["description"])
-                
-                # Show agent status if agents have been created
-                if "agent_objects" in st.session_state and st.session_state.agents_created:
-                    agent_obj = st.session_state.agent_objects[i]
-                    if agent_obj["sdk_created"]:
-                        st.success("✅ Agent created with SDK")
-                    else:
-                        st.info("📋 Agent configuration ready")
-                
-                if st.button("Edit Agent", key=f"edit_btn_{i}"):
-                    st.session_state.editing_agent_index = i
-                    st.rerun()
-        st.divider()
-        if len(team_members) > 0 and "epilogue" in team_members[0]:
-            st.write(team_members[0].get("epilogue", ""))
+    ensure_live_state()
+    with tracing.span("render.team_tabs"):
+        if state.team_details:
+            team_members = state.team_details
+            tabs = st.tabs([member["name"] for member in team_members])
+            for i, member in enumerate(team_members):
+                with tabs[i]:
+                    render_member_details(member)
+
+                    # Show agent status if agents have been created
+                    if state.agents_created:
+                        agent_obj = state.agent_objects[i]
+                        if agent_obj["sdk_created"]:
+                            st.success("✅ Agent created with SDK")
+                        else:
+                            st.info("📋 Agent configuration ready")
+
+                    task_result_slots[i] = st.empty()
+                    if i in state.task_results:
+                        with task_result_slots[i].container():
+                            render_task_result(state.task_results[i])
+                        if state.task_results[i].get("cached"):
+                            st.button("Forget Cached Result", key=f"forget_result_{i}", on_click=forget_task_result, args=(i,))
+
+                    if st.button("Edit Agent", key=f"edit_btn_{i}"):
+                        st.session_state.editing_agent_index = i
+                        st.rerun()
+            st.divider()
+            if len(team_members) > 0 and "epilogue" in team_members[0]:
+                st.write(team_members[0].get("epilogue", ""))
 
 def render_edit_dialog():
     """Renders the dialog for editing an agent by defining and then calling a decorated function."""
     agent_index = st.session_state.editing_agent_index
-    agent = st.session_state.team_details[agent_index]
+    agent = state.team_details[agent_index]
 
     @st.dialog(f"{agent['name']}", width="large")
     def show_edit_dialog():
         """Defines and displays the content of the edit dialog."""
+        ensure_live_state()
+        # Read on every run: an AI edit replaces the member's dict before the fragment reruns
+        agent = state.team_details[agent_index]
+        # The fields otherwise keep what the browser last sent, e.g. the details from before an AI edit
+        for field in ("name", "role", "description"):
+            if st.session_state.get(f"edit_{agent_index}_{field}") != agent[field]:
+                st.session_state[f"edit_{agent_index}_{field}"] = agent[field]
         col1, col2 = st.columns([1,1.5], gap="medium")
         with col1:
             st.subheader("Edit Agent Details")
-            
+
             # Manual editing fields with auto-saving
-            st.text_input("Name", value=agent["name"], key=f"edit_{agent_index}_name", on_change=handle_agent_detail_change, args=(agent_index, "name"))
-            st.text_input("Role", value=agent["role"], key=f"edit_{agent_index}_role", on_change=handle_agent_detail_change, args=(agent_index, "role"))
-            st.text_area("Description", value=agent["description"], key=f"edit_{agent_index}_description", height=285, on_change=handle_agent_detail_change, args=(agent_index, "description"))
-        
+            st.text_input("Name", key=f"edit_{agent_index}_name", on_change=handle_agent_detail_change, args=(agent_index, "name"))
+            st.text_input("Role", key=f"edit_{agent_index}_role", on_change=handle_agent_detail_change, args=(agent_index, "role"))
+            st.text_area("Description", key=f"edit_{agent_index}_description", height=285, on_change=handle_agent_detail_change, args=(agent_index, "description"))
+
         with col2:
             st.subheader(f"Chat with {agent['name']}")
             chat_container = st.container(height=400, border=True)
             with chat_container:
-                
+
                 # Display agent-specific chat history
-                for message in st.session_state.agent_chat_histories.get(agent_index, []):
+                for message in state.agent_chat_histories.get(agent_index, []):
                     with st.chat_message(message["role"]):
                         st.markdown(message["content"])
+                stream_placeholder = st.empty()
 
                 # Agent-specific chat input
             if agent_prompt := st.chat_input("Ask AI to make changes..."):
-                st.session_state.agent_chat_histories[agent_index].append({"role": "user", "content": agent_prompt})
-                    
-                    # Construct the context for the editing AI
-                current_details = f"Current Agent Details:\nName: {agent['name']}\nRole: {agent['role']}\nDescription:\n{agent['description']}"
-                    
-                edit_api_messages = [
-                    {"role": "system", "content": f"{EDIT_SYSTEM_PROMPT}\n\n{current_details}"}
-                ] + st.session_state.agent_chat_histories[agent_index]
-
-                try:
-                    response = client.chat.completions.create(
-                        model="gpt-4o",
-                        messages=edit_api_messages,
-                        tools=tools[0:2],  # Only use update_agent_details tool for editing
-                        tool_choice="auto"
-                    )
-                    response_message = response.choices[0].message
-                        
-                    if response_message.tool_calls:
-                        tool_call = response_message.tool_calls[0]
-                        if tool_call.function.name == "update_agent_details":
-                            function_args = json.loads(tool_call.function.arguments)
-                            function_args['index'] = agent_index
-                            result = update_agent_details(**function_args)
-                            st.session_state.agent_chat_histories[agent_index].append({"role": "assistant", "content": result})
-                    else:
-                        st.session_state.agent_chat_histories[agent_index].append({"role": "assistant", "content": response_message.content})
-                        
-                    st.rerun()
-
-                except Exception as e:
-                    st.error(f"An error occurred: {e}")
+                history_managers = st.session_state.agent_history_managers
+                if agent_index not in history_managers:
+                    history_managers[agent_index] = new_history_manager()
+
+                def show_streamed_text(text):
+                    with stream_placeholder.container():
+                        with st.chat_message("assistant"):
+                            st.markdown(text + "▌")
+
+                with session_running():
+                    try:
+                        response_message, _ = engine.edit_turn(
+                            state,
+                            client,
+                            agent_index,
+                            agent_prompt,
+                            history_manager=history_managers[agent_index],
+                            router=get_model_router(),
+                            stream=st.session_state.get("stream_responses", True),
+                            on_text=show_streamed_text,
+                            cache=active_response_cache(),
+                        )
+                        st.session_state.last_stream_stats = response_message.stats()
+                        st.session_state.last_prompt_tokens = history_managers[agent_index].last_prompt_tokens
+                        persist_session()
+                        # The dialog is a fragment; the page behind it catches up on Apply & Close
+                        st.rerun(scope="fragment")
+
+                    except openai.RateLimitError:
+                        st.error("The OpenAI API is busy right now. Please try again in a moment.")
+                    except Exception as e:
+                        st.error(f"An error occurred: {e}")
 
         if st.button("Apply Changes & Close", type="primary"):
             del st.session_state.editing_agent_index
@@ -350,84 +488,148 @@ def render_edit_dialog():
     show_edit_dialog()
 
 
-# --- Session State Initialization ---
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
-if "team_details" not in st.session_state:
-    st.session_state.team_details = []
-if "agent_chat_histories" not in st.session_state:
-    st.session_state.agent_chat_histories = {}
-if "agents_created" not in st.session_state:
-    st.session_state.agents_created = False
+# --- Main App Logic ---
 
+def show_earlier_messages():
+    st.session_state.history_window = st.session_state.get("history_window", HISTORY_PAGE_SIZE) + HISTORY_PAGE_SIZE
+
+@st.fragment
+def render_chat_log():
+    """Renders the newest page of the main chat; paging back only reruns this fragment."""
+    ensure_live_state()
+    with tracing.span("render.chat_log"):
+        history = state.chat_history
+        start = max(0, len(history) - st.session_state.get("history_window", HISTORY_PAGE_SIZE))
+        if start:
+            st.button(f"Show earlier messages ({start} hidden)", key="show_earlier", on_click=show_earlier_messages)
+
+        # Every team creation shows the current team, so only the latest one renders the full tabs
+        latest_team = max(
+            (i for i, message in enumerate(history)
+             if isinstance(message["content"], dict) and message["content"].get("type") == "team_creation"),
+            default=None,
+        )
+        for i in range(start, len(history)):
+            message = history[i]
+            with st.chat_message(message["role"]):
+                if isinstance(message["content"], dict):
+                    content_type = message["content"].get("type")
+                    if content_type == "team_creation":
+                        if i == latest_team:
+                            create_team_tabs()
+                        else:
+                            st.caption("Team created. The current team is shown further down.")
+                    elif content_type == "task_result":
+                        render_task_summary(message["content"])
+                else:
+                    st.markdown(message["content"])
 
-# --- Main App Logic ---
+        # The current team stays reachable, with its edit buttons and task result slots, however far back it was created
+        if latest_team is not None and latest_team < start:
+            with st.chat_message("assistant"):
+                st.caption("Current team")
+                create_team_tabs()
 
 # Display the main chat history
 chat_container = st.container(height=600, border=False)
 with chat_container:
-    for message in st.session_state.chat_history:
-        with st.chat_message(message["role"]):
-            if isinstance(message["content"], dict):
-                content_type = message["content"].get("type")
-                if content_type == "team_creation":
-                    create_team_tabs()
-            else:
-                st.markdown(message["content"])
+    render_chat_log()
 
 # If we are in editing mode, display the dialog
 if "editing_agent_index" in st.session_state:
     render_edit_dialog()
 
+# Run a pending team task; each agent's result streams into its tab rendered above
+if (team_task := st.session_state.pop("pending_task", None)) and not client:
+    st.warning("Please provide your OpenAI API key to run team tasks.")
+elif team_task:
+    with session_running(), chat_container:
+        with st.chat_message("assistant"):
+            # Teams loaded from the store build their SDK agents on first run
+            engine.ensure_sdk_agents(state)
+            agent_count = sum(agent["sdk_created"] for agent in state.agent_objects)
+            with st.status(f"Running task across {agent_count} agents...") as task_status:
+                def show_task_result(result):
+                    result = asdict(result)
+                    state.task_results[result["index"]] = result
+                    task_status.write(f"{result['name']}: cached" if result["cached"] else f"{result['name']}: {result['status']} in {result['elapsed_s']:.1f}s")
+                    if result["index"] in task_result_slots:
+                        with task_result_slots[result["index"]].container():
+                            render_task_result(result)
+
+                state.task_results = {}
+                try:
+                    team_run = run_team_task_sync(
+                        state.agent_objects,
+                        team_task,
+                        manager_agent=state.manager_agent,
+                        max_concurrency=st.secrets.get("TEAM_MAX_CONCURRENCY", 4),
+                        timeout=st.secrets.get("TEAM_AGENT_TIMEOUT_SECONDS", 120),
+                        on_result=show_task_result,
+                        run_config=RunConfig(model_provider=OpenAIProvider(
+                            openai_client=get_client_pool().get_async(openai_api_key, scheduler)
+                        )),
+                        session_id=st.session_state.session_id,
+                        cache=get_task_cache(),
+                        refresh=st.session_state.get("refresh_task_results", False),
+                    )
+                    state.chat_history.append({"role": "assistant", "content": {"type": "task_result", **team_run.to_dict()}})
+                    task_status.update(label=f"Task finished in {team_run.elapsed_s:.1f}s", state="complete")
+                except Exception as e:
+                    task_status.update(label="Task failed", state="error")
+                    st.error(f"An error occurred: {e}")
+                    st.stop()
+    st.rerun()
+
 # Handle new user input in the main chat
 if prompt := st.chat_input("Describe the team you want to create..."):
-    st.session_state.chat_history.append({"role": "user", "content": prompt})
-    
-    with st.chat_message("assistant"):
+    with session_running(), st.chat_message("assistant"):
         if not client:
+            state.chat_history.append({"role": "user", "content": prompt})
             st.warning("Please provide your OpenAI API key.")
             st.stop()
-        
-        with st.spinner("Thinking..."):
+
+        if "history_manager" not in st.session_state:
+            st.session_state.history_manager = new_history_manager()
+        streaming = st.session_state.get("stream_responses", True)
+        text_placeholder = st.empty()
+        members_placeholder = st.empty()
+        streamed_members = []
+
+        def show_streamed_member(member, position):
+            streamed_members.append(member)
+            render_streamed_members(members_placeholder, streamed_members)
+
+        # Streamed replies render themselves, so the spinner is only needed for blocking calls
+        with nullcontext() if streaming else st.spinner("Thinking..."):
             try:
-                api_messages = [{"role": "system", "content": MAIN_SYSTEM_PROMPT}] + [
-                    {"role": msg["role"], "content": msg["content"]}
-                    for msg in st.session_state.chat_history if isinstance(msg["content"], str)
-                ]
-
-                response = client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=api_messages,
-                    tools=tools,
-                    tool_choice="auto"
+                response_message, tool_results = engine.chat_turn(
+                    state,
+                    client,
+                    prompt,
+                    history_manager=st.session_state.history_manager,
+                    router=get_model_router(),
+                    stream=streaming,
+                    on_text=lambda text: text_placeholder.markdown(text + "▌"),
+                    on_member=show_streamed_member,
+                    cache=active_response_cache(),
                 )
-                response_message = response.choices[0].message
-
-                if response_message.tool_calls:
-                    for tool_call in response_message.tool_calls:
-                        if tool_call.function.name == "create_team":
-                            function_args = json.loads(tool_call.function.arguments)
-                            result = create_team(**function_args)
-                            
-                            num_members = len(function_args.get("team_members", []))
-                            st.session_state.agent_chat_histories = {i: [] for i in range(num_members)}
-
-                            st.session_state.chat_history.append({"role": "assistant", "content": {"type": "team_creation"}})
-                            
-                            # Automatically create agents after team creation
-                            agents_result = create_agents()
-                            st.success(agents_result)
-                            
-                        elif tool_call.function.name == "create_agents":
-                            agents_result = create_agents()
-                            st.success(agents_result)
-                else:
-                    full_response = response_message.content
-                    st.session_state.chat_history.append({"role": "assistant", "content": full_response})
+                st.session_state.last_stream_stats = response_message.stats()
+                st.session_state.last_prompt_tokens = st.session_state.history_manager.last_prompt_tokens
+
+                for tool_result in tool_results:
+                    if tool_result.name == "create_team":
+                        st.session_state.agent_history_managers = {}
+                    if tool_result.content.startswith("Error"):
+                        st.error(tool_result.content)
+                    elif not tool_result.content.startswith("Skipped"):
+                        st.success(tool_result.content)
 
             except openai.AuthenticationError:
                 st.error("Authentication Error: Please check your OpenAI API key.")
+            except openai.RateLimitError:
+                st.error("The OpenAI API is busy right now. Please try again in a moment.")
             except Exception as e:
                 st.error(f"An error occurred: {e}")
 
-    st.rerun()
\ No newline at end of file
+    st.rerun()
@@ -0,0 +1,94 @@
+import json
+from types import SimpleNamespace
+
+from biasbouncer.completions import TeamMemberParser, consume_stream
+
+MEMBERS = [
+    {"name": "Ada", "role": "Analyst", "description": "Says \"hi\" and uses C:\\path\\", "epilogue": "Done"},
+    {"name": "Bo", "role": "Lead", "description": "- one\n- two", "skills": [["a", "b"], {"nested": [1, 2]}]},
+    {"name": "Cy", "role": "Reviewer ]}", "description": "brackets {[ in strings", "epilogue": ""},
+]
+
+
+def arguments():
+    return json.dumps({"team_members": MEMBERS})
+
+
+def feed_all(fragments):
+    parser = TeamMemberParser()
+    members = []
+    for fragment in fragments:
+        members.extend(parser.feed(fragment))
+    return members
+
+
+def test_parser_whole_arguments():
+    assert feed_all([arguments()]) == MEMBERS
+
+
+def test_parser_single_character_fragments():
+    assert feed_all(list(arguments())) == MEMBERS
+
+
+def test_parser_splits_inside_escapes():
+    text = arguments()
+    # Split right after every backslash, so escapes straddle fragments
+    fragments, start = [], 0
+    for i, char in enumerate(text):
+        if char == "\\":
+            fragments.append(text[start:i + 1])
+            start = i + 1
+    fragments.append(text[start:])
+    assert len(fragments) > 1
+    assert feed_all(fragments) == MEMBERS
+
+
+def test_parser_reports_each_member_once_completed():
+    text = arguments()
+    parser = TeamMemberParser()
+    first_end = text.index("}") + 1
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [MEMBERS[0]]
+
+
+def test_parser_ignores_text_after_the_array():
+    text = json.dumps({"team_members": MEMBERS[:1], "other": [{"name": "not a member"}]})
+    assert feed_all(list(text)) == MEMBERS[:1]
+
+
+def test_parser_waits_for_split_key():
+    text = arguments()
+    assert feed_all([text[:5], text[5:12], text[12:]]) == MEMBERS
+
+
+def chunk(content=None, tool_calls=None, usage=None):
+    delta = SimpleNamespace(content=content, tool_calls=tool_calls)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=usage)
+
+
+def tool_delta(fragment, name=None, call_id=None, index=0):
+    return SimpleNamespace(index=index, id=call_id, function=SimpleNamespace(name=name, arguments=fragment))
+
+
+def test_consume_stream_reports_members_and_assembles_calls():
+    text = arguments()
+    chunks = [chunk(tool_calls=[tool_delta("", name="create_team", call_id="call_1")])]
+    chunks += [chunk(tool_calls=[tool_delta(text[i:i + 7])]) for i in range(0, len(text), 7)]
+    chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=10, completion_tokens=5, total_tokens=15)))
+    seen = []
+
+    message = consume_stream(chunks, on_member=lambda member, position: seen.append((position, member)))
+
+    assert seen == list(enumerate(MEMBERS))
+    assert message.tool_calls[0].id == "call_1"
+    assert json.loads(message.tool_calls[0].function.arguments) == {"team_members": MEMBERS}
+    assert message.usage == {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+    assert message.first_member_s is not None
+
+
+def test_consume_stream_text():
+    seen = []
+    message = consume_stream([chunk("Hel"), chunk("lo")], on_text=seen.append)
+    assert message.content == "Hello"
+    assert seen == ["Hel", "Hello"]
+    assert message.tool_calls is None
@@ -0,0 +1,120 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from biasbouncer import engine, routing
+
+MEMBERS = [
+    {"name": "Ada", "role": "Data Analyst", "description": "- Reads the data", "epilogue": ""},
+    {"name": "Bo", "role": "Lawyer", "description": "- Checks the law", "epilogue": ""},
+    {"name": "Cy", "role": "Designer", "description": "- Draws", "epilogue": ""},
+]
+
+
+def built_team():
+    state = engine.TeamState(build_sdk_agents=False)
+    engine.create_team(state, [dict(member) for member in MEMBERS])
+    engine.create_agents(state)
+    return state
+
+
+def team_call():
+    arguments = json.dumps({"team_members": [dict(member) for member in MEMBERS[:2]]})
+    return SimpleNamespace(id="team", type="function", function=SimpleNamespace(name="create_team", arguments=arguments))
+
+
+class ScriptedClient:
+    """Answers chat completions from a list of (content, tool_calls) replies and records the models asked.
+
+    An exception in the list is raised instead.
+    """
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.models = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, **request):
+        self.models.append(model)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        content, tool_calls = reply
+        message = SimpleNamespace(content=content, tool_calls=tool_calls)
+        usage = SimpleNamespace(prompt_tokens=100, completion_tokens=10, total_tokens=110)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def test_chat_turn_that_builds_a_team_is_redone_on_the_team_creation_route():
+    state = engine.TeamState(build_sdk_agents=False)
+    client = ScriptedClient([(None, [team_call()]), (None, [team_call()]), ("Here is your team.", None)])
+    router = routing.ModelRouter()
+
+    engine.chat_turn(state, client, "It is about hiring bias", router=router)
+
+    clarify, team = routing.DEFAULT_ROUTES[routing.CLARIFY].model, routing.DEFAULT_ROUTES[routing.TEAM_CREATION].model
+    assert client.models == [clarify, team, team]
+    assert [member["name"] for member in state.team_details] == ["Ada", "Bo"]
+    assert state.chat_history[-1] == {"role": "assistant", "content": "Here is your team."}
+    calls = {(row["route"], row["model"]): row["calls"] for row in router.stats()}
+    assert calls == {(routing.CLARIFY, clarify): 1, (routing.TEAM_CREATION, team): 2}
+
+
+def test_chat_turn_without_a_team_keeps_the_fast_route():
+    state = engine.TeamState(build_sdk_agents=False)
+    client = ScriptedClient([("What kind of hiring?", None)])
+
+    engine.chat_turn(state, client, "It is about hiring bias", router=routing.ModelRouter())
+
+    assert client.models == [routing.DEFAULT_ROUTES[routing.CLARIFY].model]
+    assert state.team_details == []
+
+
+def test_failed_calls_count_towards_fallback():
+    state = engine.TeamState(build_sdk_agents=False)
+    router = routing.ModelRouter(min_samples=1)
+    client = ScriptedClient([RuntimeError("upstream down")])
+    with pytest.raises(RuntimeError):
+        engine.chat_turn(state, client, "Build the team", router=router)
+    assert router.stats()[0]["errors"] == 1
+    assert router.choose(routing.TEAM_CREATION).fell_back
+
+
+def update_call(call_id, index, name):
+    arguments = json.dumps({"index": index, "name": name, "role": MEMBERS[index]["role"], "description": "- New"})
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name="update_agent_details", arguments=arguments))
+
+
+def test_update_agent_details_only_marks_the_agent_dirty():
+    state = built_team()
+    before = state.agent_objects[0]["instructions"]
+
+    assert engine.update_agent_details(state, 0, "Ada Lovelace", "Data Analyst", "- New") == "Agent details updated successfully."
+    assert state.dirty_agents == {0}
+    assert state.agent_objects[0]["instructions"] == before
+
+    engine.sync_agents(state)
+    assert state.dirty_agents == set()
+    assert "Ada Lovelace" in state.agent_objects[0]["instructions"]
+
+
+def test_update_agent_details_rejects_bad_indices():
+    state = built_team()
+    assert engine.update_agent_details(state, 5, "X", "Y", "Z") == "Error: Invalid agent index."
+    assert state.dirty_agents == set()
+
+
+def test_concurrent_updates_are_all_rebuilt_after_dispatch():
+    state = built_team()
+    results = engine.run_tool_calls(state, [update_call("1", 0, "Ada 2"), update_call("2", 2, "Cy 2")])
+
+    assert [result.content for result in results] == ["Agent details updated successfully."] * 2
+    assert state.dirty_agents == set()
+    assert [agent["name"] for agent in state.agent_objects] == ["Ada 2", "Bo", "Cy 2"]
+
+
+def test_edit_chats_are_pinned_to_their_agent():
+    state = built_team()
+    engine.run_tool_calls(state, [update_call("1", 0, "Renamed")], agent_index=1)
+    assert [member["name"] for member in state.team_details] == ["Ada", "Renamed", "Cy"]
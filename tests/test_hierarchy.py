@@ -0,0 +1,65 @@
+import pytest
+
+from biasbouncer import engine
+from biasbouncer.hierarchy import chunk, group_by_role, role_key
+
+
+def test_role_key_picks_the_role_family():
+    assert role_key("Senior Data Analyst") == "analyst"
+    assert role_key("Lead AI Specialist") == "general"
+
+
+def test_group_by_role_keeps_families_together():
+    roles = ["Data Analyst", "Lawyer", "Policy Analyst", "Employment Lawyer", "Designer"]
+    groups = group_by_role(roles, 2)
+    assert sorted(tuple(positions) for _, positions in groups) == [(0, 2), (1, 3), (4,)]
+
+
+def test_group_by_role_splits_large_families():
+    groups = group_by_role(["Analyst"] * 5, 2)
+    assert [positions for _, positions in groups] == [[0, 1], [2, 3], [4]]
+
+
+@pytest.mark.parametrize("fanout", [1, 2, 3])
+def test_group_by_role_respects_small_fanouts(fanout):
+    roles = ["Analyst", "Lawyer", "Analyst", "Designer", "Lawyer", "Analyst", "Writer"]
+    groups = group_by_role(roles, fanout)
+    assert sorted(p for _, positions in groups for p in positions) == list(range(len(roles)))
+    assert all(len(positions) <= fanout for _, positions in groups)
+
+
+def test_chunk():
+    assert chunk([1, 2, 3, 4, 5], 2) == [[1, 2], [3, 4], [5]]
+
+
+def members(count):
+    roles = ["Data Analyst", "Lawyer", "Designer", "Writer"]
+    return [
+        {"name": f"Member {i}", "role": roles[i % len(roles)], "description": "- Helps", "epilogue": ""}
+        for i in range(count)
+    ]
+
+
+def fanouts(manager):
+    """Yields the handoff count of every manager in the tree."""
+    handoffs = [agent for agent in manager.handoffs if agent.handoffs]
+    yield len(manager.handoffs)
+    for agent in handoffs:
+        yield from fanouts(agent)
+
+
+@pytest.mark.parametrize("max_fanout,size", [(1, 3), (2, 3), (2, 9), (3, 20), (0, 5), (None, 5)])
+def test_build_manager_bounds_every_fanout(max_fanout, size):
+    if not engine.AGENTS_SDK_AVAILABLE:
+        pytest.skip("openai-agents is not installed")
+    state = engine.TeamState(max_fanout=max_fanout)
+    engine.create_team(state, members(size))
+    engine.create_agents(state)
+
+    manager = state.manager_agent
+    assert manager is not None
+    assert max(fanouts(manager)) <= (max(max_fanout, 2) if max_fanout else size)
+    # Every member is reachable through its recorded handoff slot
+    assert sorted(state.handoff_slots) == list(range(size))
+    for index, (lead, slot) in state.handoff_slots.items():
+        assert lead.handoffs[slot] is state.agent_objects[index]["agent_object"]
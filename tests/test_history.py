@@ -0,0 +1,61 @@
+from biasbouncer.history import SUMMARY_PREFIX, HistoryManager
+
+
+def turns(count, start=0, words=50):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * words}
+        for i in range(start, start + count)
+    ]
+
+
+def recording_summarizer(calls):
+    def summarize(previous, messages):
+        calls.append([message["content"].split()[1] for message in messages])
+        return (previous + " " if previous else "") + ",".join(message["content"].split()[1] for message in messages)
+    return summarize
+
+
+def test_history_within_budget_is_sent_verbatim():
+    history = turns(4)
+    messages = HistoryManager(budget_tokens=10_000).build("system", history)
+    assert [m["content"] for m in messages] == ["system"] + [m["content"] for m in history]
+
+
+def test_older_turns_fold_into_summary_and_recent_turns_stay():
+    calls = []
+    manager = HistoryManager(budget_tokens=400, keep_recent=2, summarize=recording_summarizer(calls))
+    history = turns(12)
+    messages = manager.build("system", history)
+
+    assert manager.summarized_turns > 0
+    assert messages[1]["content"].startswith(SUMMARY_PREFIX)
+    assert [m["content"] for m in messages[2:]] == [m["content"] for m in history[manager.summarized_turns:]]
+    assert len(history) - manager.summarized_turns >= 2
+    assert manager.last_prompt_tokens <= 400
+
+
+def test_summary_is_reused_until_more_turns_must_fold():
+    calls = []
+    manager = HistoryManager(budget_tokens=400, keep_recent=2, summarize=recording_summarizer(calls))
+    history = turns(12)
+    manager.build("system", history)
+    folds = len(calls)
+
+    history.append({"role": "user", "content": "turn 12"})
+    manager.build("system", history)
+    assert len(calls) == folds
+
+    history.extend(turns(8, start=13))
+    manager.build("system", history)
+    assert len(calls) == folds + 1
+    # Each fold only summarizes turns not folded before
+    assert not set(calls[-1]) & {turn for fold in calls[:-1] for turn in fold}
+
+
+def test_replaced_history_resets_the_summary():
+    manager = HistoryManager(budget_tokens=400, keep_recent=2, summarize=recording_summarizer([]))
+    manager.build("system", turns(12))
+    fresh = turns(2)
+    messages = manager.build("system", fresh)
+    assert manager.summarized_turns == 0
+    assert [m["content"] for m in messages[1:]] == [m["content"] for m in fresh]
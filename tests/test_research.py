@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+import pytest
+
+from biasbouncer import research as research_module
+from biasbouncer.research import ResearchService, SearchResult, dedupe, normalize_query, normalize_url
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubBackend:
+    """Answers from a fixed table; a query can be held until released, or set to fail."""
+
+    def __init__(self, results=None, failing=()):
+        self.results = results or {}
+        self.failing = set(failing)
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.started = threading.Event()
+
+    def __call__(self, query, max_results):
+        self.calls.append(query)
+        self.started.set()
+        assert self.release.wait(5)
+        if query in self.failing:
+            raise RuntimeError(f"search failed for {query}")
+        return self.results.get(query, [])[:max_results]
+
+
+def page(url, title="page"):
+    return SearchResult(title, url, "snippet")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(research_module.time, "monotonic", clock)
+    return clock
+
+
+def test_normalize_query_and_url():
+    assert normalize_query("  What is  BIAS?\n") == "what is bias"
+    assert normalize_query('"bias"') == "bias"
+    assert normalize_url("HTTPS://www.Example.com/a/#intro") == "https://example.com/a"
+    assert normalize_url("https://example.com/a?b=1") != normalize_url("https://example.com/a?b=2")
+
+
+def test_dedupe_keeps_the_first_result_for_each_url():
+    first, duplicate, other = page("https://example.com/a"), page("https://www.example.com/a/", "dup"), page("https://b.org")
+    assert dedupe([[first, other], [duplicate], [page("")]]) == [first, other]
+
+
+def test_concurrent_identical_queries_share_one_search():
+    backend = StubBackend({"bias": [page("https://example.com")]})
+    backend.release.clear()
+    service = ResearchService(backend=backend)
+    first = service.submit("Bias")
+    assert backend.started.wait(5)
+    second = service.submit("bias?")
+    assert second is first
+    backend.release.set()
+    assert first.result(5) == [page("https://example.com")]
+    assert backend.calls == ["bias"]
+    assert service.stats()["coalesced"] == 1
+
+
+def test_results_are_cached_until_the_ttl_passes(clock):
+    backend = StubBackend({"bias": [page("https://example.com")]})
+    service = ResearchService(backend=backend, ttl_seconds=60)
+    service.submit("bias").result(5)
+    clock.now += 59
+    assert service.submit("BIAS").result(5) == [page("https://example.com")]
+    assert len(backend.calls) == 1
+    clock.now += 2
+    service.submit("bias").result(5)
+    assert len(backend.calls) == 2
+    stats = service.stats()
+    assert (stats["searches"], stats["cache_hits"], stats["backend_calls"]) == (3, 1, 2)
+
+
+def test_cache_is_size_bounded():
+    backend = StubBackend()
+    service = ResearchService(backend=backend, max_entries=2)
+    for query in ("a", "b", "a", "c"):
+        service.submit(query).result(5)
+    assert service.stats()["cached_queries"] == 2
+    service.submit("a").result(5)
+    service.submit("b").result(5)
+    assert backend.calls == ["a", "b", "c", "b"]
+
+
+def test_failed_query_is_reported_without_losing_the_others():
+    backend = StubBackend({"good": [page("https://example.com/x")], "other": [page("https://example.com/x/")]},
+                          failing={"bad"})
+    service = ResearchService(backend=backend)
+    results, failures = service.research(["good", "bad", "other"])
+    assert results == [page("https://example.com/x")]
+    assert failures == [("bad", "search failed for bad")]
+    assert service.stats()["errors"] == 1
+    # Failures are not cached, so the next attempt searches again
+    service.research(["bad"])
+    assert backend.calls.count("bad") == 2
+
+
+def test_research_async_matches_research():
+    backend = StubBackend({"good": [page("https://a.org"), page("https://b.org")]}, failing={"bad"})
+    service = ResearchService(backend=backend, max_results=1)
+    results, failures = asyncio.run(service.research_async(["good", "bad"]))
+    assert results == [page("https://a.org")]
+    assert [query for query, _ in failures] == ["bad"]
@@ -0,0 +1,90 @@
+import pytest
+
+from biasbouncer import response_cache
+from biasbouncer.completions import ChatMessage, FunctionCall, ToolCall
+from biasbouncer.response_cache import DiskCache, MemoryLRU, ResponseCache, request_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def message(text="hi"):
+    return ChatMessage(
+        content=text,
+        tool_calls=[ToolCall(id="call_1", function=FunctionCall("create_team", '{"team_members": []}'))],
+        usage={"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+    )
+
+
+def test_request_key_ignores_dict_order():
+    first = request_key("gpt-4o", [{"role": "user", "content": "hi"}], tools=[{"a": 1, "b": 2}])
+    second = request_key("gpt-4o", [{"content": "hi", "role": "user"}], tools=[{"b": 2, "a": 1}])
+    assert first == second
+    assert first != request_key("gpt-4o-mini", [{"role": "user", "content": "hi"}])
+
+
+def test_round_trip_marks_message_cached(clock):
+    cache = ResponseCache()
+    cache.set("k", message())
+    cached = cache.get("k")
+    assert cached.cached
+    assert (cached.content, cached.tool_calls[0].function.name, cached.usage) == ("hi", "create_team", message().usage)
+    assert cache.get("missing") is None
+    assert cache.stats()["memory_hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_memory_entries_expire(clock):
+    cache = ResponseCache(ttl_seconds=60)
+    cache.set("k", message())
+    clock.now += 59
+    assert cache.get("k") is not None
+    clock.now += 2
+    assert cache.get("k") is None
+    assert len(cache.memory) == 0
+
+
+def test_entries_copied_from_disk_keep_their_age(clock, tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    ResponseCache(disk_path=path, ttl_seconds=60).set("k", message())
+    clock.now += 50
+
+    cache = ResponseCache(disk_path=path, ttl_seconds=60)
+    assert cache.get("k") is not None
+    assert cache.stats()["disk_hits"] == 1
+    clock.now += 20
+    assert cache.get("k") is None
+
+
+def test_memory_lru_evicts_least_recently_used():
+    lru = MemoryLRU(max_entries=2)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    lru.get("a")
+    lru.set("c", 3)
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+
+
+def test_disk_cache_evicts_least_recently_accessed_over_max_bytes(clock, tmp_path):
+    disk = DiskCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    disk.set("a", "x" * 10)
+    clock.now += 1
+    disk.set("b", "y" * 10)
+    clock.now += 1
+    disk.get("a")
+    clock.now += 1
+    disk.set("c", "z" * 10)
+    assert disk.get("b") is None
+    assert disk.get("a")[0] == "x" * 10
+    assert disk.get("c")[0] == "z" * 10
@@ -0,0 +1,100 @@
+import pytest
+
+from biasbouncer import routing
+from biasbouncer.routing import ModelRouter, Route, RouteDecision, classify_chat_turn, classify_edit_turn
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(routing.time, "monotonic", clock)
+    return clock
+
+
+def router_for(route, **kwargs):
+    return ModelRouter({routing.QA: route}, min_samples=kwargs.pop("min_samples", 3), **kwargs)
+
+
+def record_calls(router, latencies, failed=False):
+    for latency in latencies:
+        router.record(router.choose(routing.QA), latency, failed=failed)
+
+
+def test_classify_chat_turn():
+    assert classify_chat_turn("Please build the team", False, 0) == routing.TEAM_CREATION
+    assert classify_chat_turn("It is about hiring bias", False, 0) == routing.CLARIFY
+    assert classify_chat_turn("Mostly interviews", False, routing.CLARIFYING_TURNS) == routing.TEAM_CREATION
+    assert classify_chat_turn("Who covers the law?", True, 5) == routing.QA
+
+
+def test_classify_edit_turn():
+    assert classify_edit_turn("Rename her to Grace") == routing.AGENT_EDIT
+    assert classify_edit_turn("Change the role to Statistician") == routing.AGENT_EDIT
+    assert classify_edit_turn("Rename her and rewrite the description") == routing.AGENT_REWRITE
+    assert classify_edit_turn("Make them more skeptical") == routing.AGENT_REWRITE
+    assert classify_edit_turn("Change the role " + "x" * routing.MAX_SINGLE_FIELD_EDIT_CHARS) == routing.AGENT_REWRITE
+
+
+def test_from_config():
+    router = ModelRouter.from_config({
+        "qa": "gpt-4.1-mini",
+        "team_creation": {"model": "gpt-4.1", "fallback": "gpt-4.1-nano", "p95_threshold_s": 10},
+    })
+    assert router.routes[routing.QA] == Route("gpt-4.1-mini")
+    assert router.routes[routing.TEAM_CREATION] == Route("gpt-4.1", "gpt-4.1-nano", p95_threshold_s=10)
+    assert router.routes[routing.CLARIFY] == routing.DEFAULT_ROUTES[routing.CLARIFY]
+    with pytest.raises(ValueError, match="Unknown request class"):
+        ModelRouter.from_config({"chitchat": "gpt-4o"})
+
+
+def test_slow_primary_falls_back_until_the_cooldown_ends(clock):
+    router = router_for(Route("big", fallback="small", p95_threshold_s=5.0), cooldown_s=60)
+    record_calls(router, [1.0, 1.0])
+    assert router.choose(routing.QA) == RouteDecision(routing.QA, "big")
+    record_calls(router, [9.0])
+
+    assert router.choose(routing.QA) == RouteDecision(routing.QA, "small", fell_back=True)
+    clock.now += 59
+    assert router.choose(routing.QA).model == "small"
+    clock.now += 2
+    # The primary's window was cleared, so old slow calls do not trip it again
+    assert router.choose(routing.QA) == RouteDecision(routing.QA, "big")
+
+
+def test_failing_primary_falls_back():
+    router = router_for(Route("big", fallback="small", max_error_rate=0.25))
+    record_calls(router, [0.5, 0.5])
+    record_calls(router, [0.5], failed=True)
+    assert router.choose(routing.QA).fell_back
+
+
+def test_no_fallback_before_min_samples_or_without_a_fallback_model():
+    router = router_for(Route("big", fallback="small", p95_threshold_s=1.0))
+    record_calls(router, [9.0, 9.0])
+    assert router.choose(routing.QA).model == "big"
+
+    router = router_for(Route("big", p95_threshold_s=1.0))
+    record_calls(router, [9.0] * 5)
+    assert router.choose(routing.QA) == RouteDecision(routing.QA, "big")
+
+
+def test_stats_track_calls_fallbacks_and_cost():
+    router = ModelRouter()
+    router.record(RouteDecision(routing.QA, "gpt-4o"), 2.0, usage={"prompt_tokens": 1000, "completion_tokens": 100})
+    router.record(RouteDecision(routing.QA, "gpt-4o-mini", fell_back=True), 1.0, failed=True)
+
+    rows = {row["model"]: row for row in router.stats()}
+    assert rows["gpt-4o"]["calls"] == 1
+    assert rows["gpt-4o"]["p95_s"] == 2.0
+    assert rows["gpt-4o"]["cost_usd"] == pytest.approx(routing.estimate_cost("gpt-4o", 1000, 100))
+    assert rows["gpt-4o"]["cost_usd"] == pytest.approx(0.0035)
+    assert (rows["gpt-4o-mini"]["errors"], rows["gpt-4o-mini"]["fallbacks"]) == (1, 1)
+    assert not rows["gpt-4o"]["degraded"]
@@ -0,0 +1,140 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import openai
+import pytest
+
+from biasbouncer import scheduler as scheduler_module
+from biasbouncer.scheduler import RequestScheduler, estimate_body_tokens, estimate_tokens
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(scheduler_module.time, "monotonic", clock)
+    return clock
+
+
+def advance(scheduler, clock, seconds):
+    """Moves the clock on and wakes waiting requests, as their wait timeouts would."""
+    clock.now += seconds
+    with scheduler._cond:
+        scheduler._cond.notify_all()
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def queue(scheduler, session_id, name, granted, tokens=1):
+    thread = threading.Thread(target=lambda: (scheduler.acquire(session_id, tokens), granted.append(name)))
+    depth = scheduler.stats()["queue_depth"]
+    thread.start()
+    wait_for(lambda: scheduler.stats()["queue_depth"] == depth + 1)
+    return thread
+
+
+def test_estimates():
+    request = {"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}
+    assert estimate_tokens(request) == 150
+    assert estimate_body_tokens(b'{"max_output_tokens": 20}') == len(b'{"max_output_tokens": 20}') // 4 + 20
+    assert estimate_body_tokens(b"not json") == 2 + scheduler_module.DEFAULT_COMPLETION_TOKENS
+
+
+def test_requests_wait_for_the_request_budget(clock):
+    scheduler = RequestScheduler(requests_per_minute=1)
+    scheduler.acquire("s1", 1)
+    granted = []
+    thread = queue(scheduler, "s1", "second", granted)
+    assert granted == []
+
+    advance(scheduler, clock, 61)
+    thread.join(5)
+    assert granted == ["second"]
+
+
+def test_sessions_take_turns(clock):
+    scheduler = RequestScheduler(requests_per_minute=1)
+    scheduler.acquire("other", 1)
+    granted = []
+    threads = [
+        queue(scheduler, "busy", "busy 1", granted),
+        queue(scheduler, "busy", "busy 2", granted),
+        queue(scheduler, "quiet", "quiet 1", granted),
+    ]
+    for expected in range(1, 4):
+        advance(scheduler, clock, 61)
+        wait_for(lambda: len(granted) == expected)
+    for thread in threads:
+        thread.join(5)
+    assert granted == ["busy 1", "quiet 1", "busy 2"]
+
+
+def test_reported_usage_frees_token_budget(clock):
+    scheduler = RequestScheduler(tokens_per_minute=100)
+    entry = scheduler.acquire("s1", 80)
+    granted = []
+    thread = queue(scheduler, "s2", "s2", granted, tokens=30)
+    assert granted == []
+
+    scheduler.record_usage(entry, 10)
+    thread.join(5)
+    assert granted == ["s2"]
+    assert scheduler.stats()["tokens_last_minute"] == 40
+
+
+def rate_limit_error(retry_after=None):
+    headers = {"retry-after": retry_after} if retry_after else {}
+    response = SimpleNamespace(status_code=429, headers=headers, request=None)
+    return openai.RateLimitError("slow down", response=response, body=None)
+
+
+def test_call_retries_with_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(scheduler_module.time, "sleep", delays.append)
+    scheduler = RequestScheduler(base_delay=0.5, max_delay=4.0)
+    outcomes = [rate_limit_error("2"), rate_limit_error(), "ok"]
+
+    def fn():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.call("s1", fn, 10) == "ok"
+    assert delays[0] >= 2.0  # Retry-After is honoured
+    assert 0.0 <= delays[1] <= 1.0  # full jitter under base_delay * 2
+    assert (scheduler.stats()["retries"], scheduler.stats()["throttled"], scheduler.granted) == (2, 2, 3)
+
+
+def test_call_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(scheduler_module.time, "sleep", lambda seconds: None)
+    scheduler = RequestScheduler(max_retries=2)
+    attempts = []
+
+    def fn():
+        attempts.append(1)
+        raise rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler.call("s1", fn, 10)
+    assert len(attempts) == 3
+
+
+def test_call_does_not_retry_other_errors():
+    scheduler = RequestScheduler()
+    with pytest.raises(ValueError):
+        scheduler.call("s1", lambda: (_ for _ in ()).throw(ValueError("bad request")), 10)
+    assert scheduler.retries == 0
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from biasbouncer.engine import TeamState
+from biasbouncer.sessions import SessionRegistry, deep_sizeof
+from biasbouncer.store import SessionStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "store.sqlite3"))
+
+
+def live_state(text="hello"):
+    state = TeamState(build_sdk_agents=False)
+    state.chat_history.append({"role": "user", "content": text})
+    return state
+
+
+def later(seconds):
+    return time.monotonic() + seconds
+
+
+def test_idle_sessions_are_saved_and_released(store):
+    registry = SessionRegistry(store, idle_seconds=10, check_interval_s=0)
+    state, extras = live_state(), {0: "history manager"}
+    registry.touch("s1", state, extras)
+
+    assert registry.evict_idle(now=later(5)) == []
+    assert registry.evict_idle(now=later(11)) == ["s1"]
+    assert state.evicted and state.chat_history == [] and extras == {}
+    assert store.load_session("s1").chat_history == [{"role": "user", "content": "hello"}]
+    assert registry.stats() == {"live_sessions": 0, "evicted_sessions": 1}
+
+
+def test_least_recently_seen_are_evicted_over_the_cap(store):
+    registry = SessionRegistry(store, max_sessions=2, min_idle_seconds=0, check_interval_s=0)
+    states = {session_id: live_state(session_id) for session_id in ("s1", "s2", "s3")}
+    for session_id, state in states.items():
+        registry.touch(session_id, state)
+    registry.touch("s1", states["s1"])
+
+    assert registry.evict_idle(now=later(1)) == ["s2"]
+
+
+def test_busy_sessions_are_never_evicted(store):
+    registry = SessionRegistry(store, idle_seconds=10, max_sessions=0, min_idle_seconds=0, check_interval_s=0)
+    state = live_state()
+
+    with registry.running("s1", state):
+        assert registry.evict_idle(now=later(100)) == []
+        assert not state.evicted
+
+    assert registry.evict_idle(now=later(100)) == ["s1"]
+    assert state.evicted
+
+
+def test_running_releases_on_error(store):
+    registry = SessionRegistry(store, idle_seconds=10, check_interval_s=0)
+    with pytest.raises(RuntimeError):
+        with registry.running("s1", live_state()):
+            raise RuntimeError("model call failed")
+    assert registry.evict_idle(now=later(11)) == ["s1"]
+
+
+def test_checks_are_rate_limited_unless_forced(store):
+    registry = SessionRegistry(store, idle_seconds=10, check_interval_s=30)
+    registry.touch("s1", live_state())
+    now = later(11)
+    assert registry.evict_idle(now=now - 5) == []
+    assert registry.evict_idle(now=now) == []
+    assert registry.evict_idle(now=now, force=True) == ["s1"]
+
+
+def test_deep_sizeof_counts_shared_objects_once():
+    shared = ["x" * 1000]
+    seen = set()
+    first = deep_sizeof({"a": shared}, seen)
+    second = deep_sizeof({"b": shared}, seen)
+    assert first > 1000 > second
+
+
+def test_evicted_states_are_not_registered_again(store):
+    registry = SessionRegistry(store, idle_seconds=10, check_interval_s=0)
+    state = live_state()
+    assert registry.touch("s1", state)
+    registry.evict_idle(now=later(11))
+
+    assert not registry.touch("s1", state)
+    with pytest.raises(RuntimeError):
+        with registry.running("s1", state):
+            pass
+    assert registry.stats()["live_sessions"] == 0
+    assert registry.touch("s1", store.load_session("s1"))
+
+
+def test_touch_waits_for_an_eviction_in_progress(store, monkeypatch):
+    registry = SessionRegistry(store, idle_seconds=10, check_interval_s=0)
+    state = live_state()
+    registry.touch("s1", state)
+    saving, release = threading.Event(), threading.Event()
+    save = store.save
+
+    def slow_save(session_id, saved_state):
+        saving.set()
+        release.wait(5)
+        return save(session_id, saved_state)
+
+    monkeypatch.setattr(store, "save", slow_save)
+    evictor = threading.Thread(target=registry.evict_idle, kwargs={"now": later(11)})
+    evictor.start()
+    saving.wait(5)
+    touched = []
+    toucher = threading.Thread(target=lambda: touched.append(registry.touch("s1", state)))
+    toucher.start()
+    toucher.join(0.2)
+    assert toucher.is_alive()
+
+    release.set()
+    evictor.join(5)
+    toucher.join(5)
+    assert touched == [False]
+    assert state.evicted
+
+
+def test_tabs_on_the_same_session_are_evicted_independently(store):
+    registry = SessionRegistry(store, idle_seconds=10, check_interval_s=0)
+    first, second = live_state("first tab"), live_state("second tab")
+    registry.touch("s1", first)
+    registry.touch("s1", second)
+    assert registry.stats()["live_sessions"] == 2
+
+    assert registry.evict_idle(now=later(11)) == ["s1", "s1"]
+    assert first.evicted and second.evicted
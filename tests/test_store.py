@@ -0,0 +1,155 @@
+import pytest
+
+from biasbouncer import engine
+from biasbouncer.engine import TeamState
+from biasbouncer.store import SessionStore
+
+MEMBERS = [
+    {"name": "Ada", "role": "Analyst", "description": "- Reads the data", "epilogue": "A team for auditing hiring"},
+    {"name": "Bo", "role": "Lawyer", "description": "- Checks the law", "epilogue": ""},
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / "store.sqlite3"))
+
+
+def team_state():
+    state = TeamState(build_sdk_agents=False)
+    state.chat_history.append({"role": "user", "content": "I need a team"})
+    state.chat_history.append({"role": "assistant", "content": {"type": "team_creation"}})
+    engine.create_team(state, [dict(member) for member in MEMBERS])
+    engine.create_agents(state)
+    state.agent_chat_histories[1].append({"role": "user", "content": "Make Bo the lead"})
+    return state
+
+
+def test_session_round_trip(store, tmp_path):
+    state = team_state()
+    assert store.save("s1", state) == 2 + 1 + 1
+
+    loaded = SessionStore(str(tmp_path / "store.sqlite3")).load_session("s1")
+
+    assert loaded.chat_history == state.chat_history
+    assert loaded.team_details == state.team_details
+    assert loaded.team_id == state.team_id
+    assert loaded.agent_chat_histories == {0: [], 1: [{"role": "user", "content": "Make Bo the lead"}]}
+    assert [agent["instructions"] for agent in loaded.agent_objects] == [agent["instructions"] for agent in state.agent_objects]
+    assert loaded.agents_created
+
+
+def test_unknown_session_is_none(store):
+    assert store.load_session("missing") is None
+
+
+def test_saves_are_incremental(store):
+    state = team_state()
+    store.save("s1", state)
+    assert store.save("s1", state) == 0
+
+    state.chat_history.append({"role": "user", "content": "thanks"})
+    state.agent_chat_histories[0].append({"role": "user", "content": "hi"})
+    assert store.save("s1", state) == 2
+
+    state.team_details[0]["role"] = "Lead Analyst"
+    engine.mark_agent_dirty(state, 0)
+    engine.sync_agents(state)
+    assert store.save("s1", state) == 1
+    assert store.load_session("s1").team_details[0]["role"] == "Lead Analyst"
+
+
+def test_replaced_chat_history_is_rewritten(store):
+    state = team_state()
+    store.save("s1", state)
+    state.chat_history = [{"role": "user", "content": "start over"}]
+    store.save("s1", state)
+    assert store.load_session("s1").chat_history == state.chat_history
+
+
+def test_loaded_session_does_not_rewrite_what_it_read(store, tmp_path):
+    store.save("s1", team_state())
+    reopened = SessionStore(str(tmp_path / "store.sqlite3"))
+    assert reopened.save("s1", reopened.load_session("s1")) == 0
+
+
+def test_teams_are_listed_per_session(store):
+    store.save("s1", team_state())
+    store.save("s2", team_state())
+
+    teams = store.list_teams("s1")
+
+    assert [(team["session_id"], team["title"], team["size"]) for team in teams] == [("s1", "A team for auditing hiring", 2)]
+    assert store.list_teams("nobody") == []
+
+
+def test_load_team_copies_under_a_new_id(store):
+    original = team_state()
+    store.save("s1", original)
+    state = TeamState(build_sdk_agents=False)
+
+    assert store.load_team(state, original.team_id, "s1")
+    assert state.team_id != original.team_id
+    assert state.team_details == original.team_details
+
+    state.team_details[0]["name"] = "Ada Edited"
+    engine.mark_agent_dirty(state, 0)
+    engine.sync_agents(state)
+    store.save("s1", state)
+
+    store.load_team(state, original.team_id, "s1")
+    assert state.team_details[0]["name"] == "Ada"
+    # The copy and the original differ now, so both are listed
+    assert len(store.list_teams("s1")) == 2
+
+
+def test_other_sessions_cannot_load_or_overwrite_a_team(store):
+    original = team_state()
+    store.save("s1", original)
+
+    assert not store.load_team(TeamState(build_sdk_agents=False), original.team_id, "s2")
+
+    # Even a state holding the same team id cannot write over another session's team
+    intruder = team_state()
+    intruder.team_id = original.team_id
+    intruder.team_details[0]["name"] = "Hijacked"
+    store.save("s2", intruder)
+    assert store.load_session("s1").team_details[0]["name"] == "Ada"
+
+
+def test_tabs_on_the_same_session_never_interleave_rows(store):
+    store.save("s1", team_state())
+    first, second = store.load_session("s1"), store.load_session("s1")
+
+    first.chat_history.append({"role": "user", "content": "first tab 1"})
+    store.save("s1", first)
+    second.chat_history.append({"role": "user", "content": "second tab 1"})
+    second.agent_chat_histories[1].append({"role": "user", "content": "second tab edit"})
+    store.save("s1", second)
+    assert store.load_session("s1").chat_history == second.chat_history
+
+    # The last tab to save wins, whole
+    first.chat_history.append({"role": "user", "content": "first tab 2"})
+    store.save("s1", first)
+    loaded = store.load_session("s1")
+    assert loaded.chat_history == first.chat_history
+    assert loaded.agent_chat_histories == first.agent_chat_histories
+
+
+def test_an_idle_tab_does_not_overwrite_a_newer_one(store):
+    store.save("s1", team_state())
+    idle, active = store.load_session("s1"), store.load_session("s1")
+    engine.create_team(active, [dict(member) for member in MEMBERS[:1]])
+    active.chat_history.append({"role": "user", "content": "new team"})
+    store.save("s1", active)
+
+    assert store.save("s1", idle) == 0
+    loaded = store.load_session("s1")
+    assert (loaded.team_id, loaded.chat_history) == (active.team_id, active.chat_history)
+
+
+def test_a_new_state_replaces_the_stored_session(store):
+    store.save("s1", team_state())
+    store.save("s1", TeamState(build_sdk_agents=False))
+    loaded = store.load_session("s1")
+    assert (loaded.chat_history, loaded.team_details) == ([], [])
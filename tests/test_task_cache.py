@@ -0,0 +1,112 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from biasbouncer import team_runner
+from biasbouncer.task_cache import TaskResultCache, task_key
+
+
+def test_task_key_covers_everything_the_output_depends_on():
+    key = task_key("You are A.", "gpt-4o", "Review")
+    assert key == task_key("You are A.", "gpt-4o", "Review")
+    assert len({key, task_key("You are B.", "gpt-4o", "Review"), task_key("You are A.", "gpt-4o-mini", "Review"),
+                task_key("You are A.", "gpt-4o", "Rewrite"), task_key("You are A.", "gpt-4o", "Review", "context")}) == 5
+
+
+def test_hits_misses_and_invalidation():
+    cache = TaskResultCache(max_entries=2)
+    assert cache.get("a") is None
+    cache.set("a", "output a")
+    assert cache.get("a") == "output a"
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5, "entries": 1}
+
+    cache.set("b", "output b")
+    assert cache.invalidate(["a", "missing"]) == 1
+    assert cache.get("a") is None
+    cache.set("c", "output c")
+    cache.set("d", "output d")
+    assert cache.stats()["entries"] == 2
+    assert cache.get("b") is None
+
+
+class CountingRunner:
+    """Stands in for `agents.Runner`, answering with the agent's instructions and counting runs per agent."""
+
+    def __init__(self):
+        self.runs = []
+
+    async def run(self, agent, input, run_config=None):
+        self.runs.append(agent.name)
+        return SimpleNamespace(final_output=f"{agent.instructions} on {input.splitlines()[0]}")
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    pytest.importorskip("agents")
+    runner = CountingRunner()
+    monkeypatch.setattr(team_runner, "Runner", runner)
+    return runner
+
+
+def agent_record(name, instructions):
+    from agents import Agent
+
+    return {
+        "name": name,
+        "instructions": instructions,
+        "agent_object": Agent(name=name, instructions=instructions, model="gpt-4o-mini"),
+        "sdk_created": True,
+    }
+
+
+def run(agents, cache, task="Review", refresh=False):
+    from agents import Agent
+
+    manager = Agent(name="Manager", instructions="Coordinate.", model="gpt-4o")
+    return asyncio.run(team_runner.run_team_task(agents, task, manager_agent=manager, cache=cache, refresh=refresh))
+
+
+def test_rerun_reuses_unchanged_outputs(runner):
+    cache = TaskResultCache()
+    first = run([agent_record("A", "You are A."), agent_record("B", "You are B.")], cache)
+    assert runner.runs == ["A", "B", "Manager"]
+    assert not any(result.cached for result in first.results)
+
+    again = run([agent_record("A", "You are A."), agent_record("B", "You are B.")], cache)
+    assert runner.runs == ["A", "B", "Manager"]
+    assert [result.cached for result in again.results] == [True, True]
+    assert again.synthesis_cached and again.synthesis == first.synthesis
+
+
+def test_changed_agent_reruns_alone_and_redoes_the_synthesis(runner):
+    cache = TaskResultCache()
+    run([agent_record("A", "You are A."), agent_record("B", "You are B.")], cache)
+    runner.runs.clear()
+
+    edited = run([agent_record("A", "You are A."), agent_record("B", "You are a new B.")], cache)
+    assert runner.runs == ["B", "Manager"]
+    assert [result.cached for result in edited.results] == [True, False]
+    assert not edited.synthesis_cached
+
+    runner.runs.clear()
+    run([agent_record("A", "You are A.")], cache, task="Another task")
+    assert runner.runs == ["A", "Manager"]
+
+
+def test_invalidated_and_refreshed_outputs_are_run_again(runner):
+    cache = TaskResultCache()
+    agents = [agent_record("A", "You are A."), agent_record("B", "You are B.")]
+    first = run(agents, cache)
+    runner.runs.clear()
+
+    assert cache.invalidate([first.results[0].cache_key]) == 1
+    run(agents, cache)
+    assert runner.runs == ["A"]
+
+    runner.runs.clear()
+    refreshed = run(agents, cache, refresh=True)
+    assert sorted(runner.runs) == ["A", "B", "Manager"]
+    assert not any(result.cached for result in refreshed.results)
+    # A refresh still stores what it produced
+    assert cache.get(refreshed.results[1].cache_key) == refreshed.results[1].output
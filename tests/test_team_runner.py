@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("agents")
+from agents import Agent
+
+from biasbouncer import team_runner
+from biasbouncer.team_runner import run_team_task, run_team_task_sync
+
+
+class FakeRunner:
+    """Stands in for `agents.Runner`: answers "<agent>: <input>" after `delay`, failing or stalling for chosen agents."""
+
+    def __init__(self, delay=0.01, failing=(), stalling=()):
+        self.delay = delay
+        self.failing = set(failing)
+        self.stalling = set(stalling)
+        self.inputs = []
+        self.running = 0
+        self.max_running = 0
+
+    async def run(self, agent, input, run_config=None):
+        self.inputs.append((agent.name, input))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(60 if agent.name in self.stalling else self.delay)
+            if agent.name in self.failing:
+                raise RuntimeError(f"{agent.name} failed")
+            return SimpleNamespace(final_output=f"{agent.name}: {input.splitlines()[0]}")
+        finally:
+            self.running -= 1
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    runner = FakeRunner()
+    monkeypatch.setattr(team_runner, "Runner", runner)
+    return runner
+
+
+def agent_record(name, sdk_created=True):
+    instructions = f"You are {name}."
+    return {
+        "name": name,
+        "instructions": instructions,
+        "agent_object": Agent(name=name, instructions=instructions, model="gpt-4o-mini"),
+        "sdk_created": sdk_created,
+    }
+
+
+def team(*names):
+    return [agent_record(name) for name in names]
+
+
+MANAGER = Agent(name="Manager", instructions="Coordinate.", model="gpt-4o")
+
+
+def test_agents_run_concurrently_within_the_limit(runner):
+    finished = []
+    agents = team("A", "B", "C", "D") + [agent_record("No SDK", sdk_created=False)]
+
+    run = asyncio.run(run_team_task(agents, "Review the plan", max_concurrency=2, on_result=finished.append))
+
+    assert [result.name for result in run.results] == ["A", "B", "C", "D"]
+    assert all(result.status == "done" for result in run.results)
+    assert run.results[0].output == "A: Review the plan"
+    assert sorted(result.name for result in finished) == ["A", "B", "C", "D"]
+    assert runner.max_running == 2
+    assert run.synthesis is None
+
+
+def test_failures_and_timeouts_do_not_stop_the_others(runner):
+    runner.failing, runner.stalling = {"B"}, {"C"}
+
+    run = asyncio.run(run_team_task(team("A", "B", "C"), "Review", manager_agent=MANAGER, timeout=0.2))
+
+    assert [(result.status, result.error) for result in run.results] == [
+        ("done", None), ("error", "B failed"), ("timeout", "Timed out after 0s."),
+    ]
+    assert run.synthesis.startswith("Manager: Task: Review")
+    manager_input = runner.inputs[-1][1]
+    assert "## A\nA: Review" in manager_input
+    assert "## B\n(no contribution: B failed)" in manager_input
+
+
+def test_failed_synthesis_keeps_the_specialists_results(runner):
+    runner.failing = {"Manager"}
+
+    run = asyncio.run(run_team_task(team("A", "B"), "Review", manager_agent=MANAGER))
+
+    assert [result.status for result in run.results] == ["done", "done"]
+    assert run.synthesis is None
+    assert run.synthesis_error == "Manager failed"
+    assert run.to_dict()["synthesis_error"] == "Manager failed"
+
+
+def test_no_synthesis_when_every_agent_failed(runner):
+    runner.failing = {"A"}
+    run = asyncio.run(run_team_task(team("A"), "Review", manager_agent=MANAGER))
+    assert run.synthesis is None and run.synthesis_error is None
+    assert [name for name, _ in runner.inputs] == ["A"]
+
+
+def test_run_team_task_sync_reports_results_on_the_calling_thread(runner):
+    threads = []
+
+    run = run_team_task_sync(team("A", "B"), "Review", on_result=lambda result: threads.append(threading.current_thread()))
+
+    assert threads == [threading.current_thread()] * 2
+    assert run.to_dict()["agent_time_s"] == pytest.approx(sum(result.elapsed_s for result in run.results))
@@ -0,0 +1,99 @@
+from types import SimpleNamespace
+
+from biasbouncer.tool_registry import ToolRegistry, validate
+
+
+def schema(name, properties, required=None):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "parameters": {"type": "object", "properties": properties, "required": required or list(properties)},
+        },
+    }
+
+
+def call(call_id, name, arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+def make_registry(log):
+    registry = ToolRegistry()
+    registry.register(
+        schema("update", {"index": {"type": "integer"}, "name": {"type": "string"}}),
+        lambda state, index, name: log.append(("update", index, name)) or f"updated {index}",
+        resources=lambda args: {f"agent:{args['index']}"},
+        dedupe_key=lambda args: args["index"],
+    )
+    registry.register(
+        schema("create", {"members": {"type": "array", "items": {"type": "object", "properties": {"name": {"type": "string"}}, "required": ["name"]}}}),
+        lambda state, members: log.append(("create", len(members))) or "created",
+        supersedes=("update",),
+    )
+    return registry
+
+
+def test_validate_reports_nested_paths():
+    parameters = schema("create", {"members": {"type": "array", "items": {"type": "object", "properties": {"name": {"type": "string"}}, "required": ["name"]}}})
+    errors = validate({"members": [{"name": 1}, {}]}, parameters["function"]["parameters"])
+    assert errors == ["arguments.members[0].name should be of type string", "arguments.members[1].name is required"]
+
+
+def test_validate_rejects_bool_as_integer():
+    assert validate(True, {"type": "integer"}) == ["arguments should be of type integer"]
+
+
+def test_dispatch_rejects_invalid_calls_without_running():
+    log = []
+    results = make_registry(log).dispatch(None, [
+        call("1", "update", '{"index": "0", "name": "A"}'),
+        call("2", "update", "{not json"),
+        call("3", "missing", "{}"),
+    ])
+    assert log == []
+    assert results[0].content.startswith("Error: Invalid arguments for update: arguments.index should be of type integer")
+    assert results[1].content.startswith("Error: Arguments for update are not valid JSON")
+    assert results[2].content == "Error: Unknown tool missing."
+
+
+def test_dispatch_keeps_the_latest_of_duplicate_calls():
+    log = []
+    results = make_registry(log).dispatch(None, [
+        call("1", "update", '{"index": 0, "name": "A"}'),
+        call("2", "update", '{"index": 1, "name": "B"}'),
+        call("3", "update", '{"index": 0, "name": "C"}'),
+    ])
+    assert sorted(log) == [("update", 0, "C"), ("update", 1, "B")]
+    assert [result.tool_call_id for result in results] == ["1", "2", "3"]
+    assert results[0].content.startswith("Skipped: replaced")
+    assert results[2].content == "updated 0"
+
+
+def test_dispatch_skips_superseded_calls():
+    log = []
+    results = make_registry(log).dispatch(None, [
+        call("1", "update", '{"index": 0, "name": "A"}'),
+        call("2", "create", '{"members": [{"name": "A"}]}'),
+    ])
+    assert log == [("create", 1)]
+    assert results[0].content == "Skipped: already handled by create in this response."
+
+
+def test_dispatch_respects_allowed_and_overrides():
+    log = []
+    registry = make_registry(log)
+    results = registry.dispatch(
+        None,
+        [call("1", "update", '{"index": 5, "name": "A"}'), call("2", "create", '{"members": []}')],
+        overrides={"update": {"index": 0}},
+        allowed={"update"},
+    )
+    assert log == [("update", 0, "A")]
+    assert results[1].content == "Error: Unknown tool create."
+
+
+def test_handler_errors_become_results():
+    registry = ToolRegistry()
+    registry.register(schema("boom", {}), lambda state: 1 / 0)
+    [result] = registry.dispatch(None, [call("1", "boom", "{}")])
+    assert result.content == "Error: boom failed: division by zero"
@@ -0,0 +1,60 @@
+import os
+import threading
+
+import pytest
+
+from biasbouncer.tracing import Tracer
+
+
+def test_spans_are_aggregated_per_name():
+    tracer = Tracer()
+    with tracer.span("llm.chat", prompt_tokens=10, completion_tokens=2):
+        pass
+    with pytest.raises(ValueError):
+        with tracer.span("llm.chat", cache="hit"):
+            raise ValueError("bad")
+
+    [row] = tracer.summary()
+    assert row["span"] == "llm.chat"
+    assert (row["count"], row["errors"], row["prompt_tokens"], row["cache_hits"]) == (2, 1, 10, 1)
+    assert tracer.recent(1)[0].error == "ValueError: bad"
+
+
+def test_nested_spans_record_their_parent():
+    tracer = Tracer()
+    with tracer.span("outer"):
+        with tracer.span("inner"):
+            pass
+    outer, inner = tracer.recent()
+    assert (inner.name, inner.parent, outer.parent) == ("inner", "outer", None)
+
+
+def test_concurrent_prometheus_export_never_fails_spans(tmp_path):
+    path = tmp_path / "metrics.prom"
+    tracer = Tracer().configure(prometheus_path=str(path), prometheus_interval_s=0)
+    errors = []
+
+    def work():
+        for _ in range(200):
+            try:
+                with tracer.span("tool.search"):
+                    pass
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert "biasbouncer_span_duration_seconds_count" in path.read_text()
+    assert os.listdir(tmp_path) == ["metrics.prom"]
+
+
+def test_export_errors_are_logged_not_raised(tmp_path, caplog):
+    tracer = Tracer().configure(prometheus_path=str(tmp_path / "missing" / "metrics.prom"), prometheus_interval_s=0)
+    with tracer.span("llm.chat"):
+        pass
+    assert "Writing Prometheus metrics failed" in caplog.text